@@ -0,0 +1,41 @@
+"""plan versions and indexes
+
+Revision ID: 5f1c2a9d7e43
+Revises: ce254ba02d0d
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f1c2a9d7e43'
+down_revision: Union[str, None] = 'ce254ba02d0d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('plan_versions',
+    sa.Column('name', sa.String(length=16), nullable=False),
+    sa.Column('actual_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_index(op.f('ix_vessels_actual_id'), 'vessels', ['actual_id'], unique=False)
+    op.create_index('ix_vessel_schedule_entries_actual_berth_start', 'vessel_schedule_entries', ['actual_id', 'berth_id', 'start_time'], unique=False)
+    op.create_index(op.f('ix_prediction_logs_timestamp'), 'prediction_logs', ['timestamp'], unique=False)
+    # start the pointers at the batches already in the database
+    op.execute("INSERT INTO plan_versions (name, actual_id) SELECT 'vessels', MAX(actual_id) FROM vessels HAVING MAX(actual_id) IS NOT NULL")
+    op.execute("INSERT INTO plan_versions (name, actual_id) SELECT 'schedule', MAX(actual_id) FROM vessel_schedule_entries HAVING MAX(actual_id) IS NOT NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_prediction_logs_timestamp'), table_name='prediction_logs')
+    op.drop_index('ix_vessel_schedule_entries_actual_berth_start', table_name='vessel_schedule_entries')
+    op.drop_index(op.f('ix_vessels_actual_id'), table_name='vessels')
+    op.drop_table('plan_versions')
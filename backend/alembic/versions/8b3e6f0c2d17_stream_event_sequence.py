@@ -0,0 +1,28 @@
+"""stream event sequence
+
+Revision ID: 8b3e6f0c2d17
+Revises: 5f1c2a9d7e43
+Create Date: 2026-10-18 11:02:15.530871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b3e6f0c2d17'
+down_revision: Union[str, None] = '5f1c2a9d7e43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.schema.CreateSequence(sa.Sequence('stream_event_id_seq')))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(sa.schema.DropSequence(sa.Sequence('stream_event_id_seq')))
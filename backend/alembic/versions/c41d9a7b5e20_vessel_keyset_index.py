@@ -0,0 +1,28 @@
+"""vessel keyset index
+
+Revision ID: c41d9a7b5e20
+Revises: 8b3e6f0c2d17
+Create Date: 2026-10-18 11:47:03.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d9a7b5e20'
+down_revision: Union[str, None] = '8b3e6f0c2d17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_vessels_actual_eta_id', 'vessels', ['actual_id', 'eta', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_vessels_actual_eta_id', table_name='vessels')
@@ -0,0 +1,33 @@
+"""stream events
+
+Revision ID: e7a4c1f93b58
+Revises: c41d9a7b5e20
+Create Date: 2026-10-18 16:20:41.337902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a4c1f93b58'
+down_revision: Union[str, None] = 'c41d9a7b5e20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stream_events',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('stream_event_id_seq')"), nullable=False),
+    sa.Column('channel', sa.String(length=16), nullable=False),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('stream_events')
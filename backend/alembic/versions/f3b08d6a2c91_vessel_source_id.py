@@ -0,0 +1,30 @@
+"""vessel source id
+
+Revision ID: f3b08d6a2c91
+Revises: e7a4c1f93b58
+Create Date: 2026-10-18 18:05:12.480113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b08d6a2c91'
+down_revision: Union[str, None] = 'e7a4c1f93b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('vessels', sa.Column('source_id', sa.Integer(), nullable=True))
+    op.create_index('ix_vessels_actual_source_id', 'vessels', ['actual_id', 'source_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_vessels_actual_source_id', table_name='vessels')
+    op.drop_column('vessels', 'source_id')
@@ -0,0 +1,126 @@
+import datetime
+import os
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+from app.intervals import OPEN_END, OPEN_START, IntervalSet, epoch_micros
+from app.tide_windows import TideWindows
+
+# MaintenanceLog only records when work starts; the berth is down this long from then
+MAINTENANCE_DURATION = datetime.timedelta(hours=float(os.getenv("MAINTENANCE_DURATION_HOURS", "8")))
+
+Booking = Tuple[Optional[datetime.datetime], Optional[datetime.datetime]]
+
+
+class BerthCalendar:
+    """When each berth is closed: planned maintenance and outages, one IntervalSet per berth.
+
+    Keys are whatever the caller names berths by (planner ids, simulator
+    names). Bookings change on every placement, so they are not stored here;
+    callers either pass them in or, like the planner, keep them in an
+    OccupancyIndex and alternate it with a BerthAvailability.
+    """
+
+    def __init__(self):
+        self.closed: Dict[Hashable, IntervalSet] = {}
+        self._open: Dict[Hashable, IntervalSet] = {}
+        # bumped on every change, so sets derived from this calendar know to rebuild
+        self.version = 0
+
+    def close(self, key: Hashable, periods: Iterable[Booking]):
+        closed = IntervalSet.from_times(periods)
+        if key in self.closed:
+            closed = self.closed[key].union(closed)
+        self.closed[key] = closed
+        self._open.pop(key, None)
+        self.version += 1
+
+    def add_maintenance(self, records: Iterable[Tuple[Hashable, datetime.datetime]],
+                        duration: datetime.timedelta = MAINTENANCE_DURATION):
+        by_berth = defaultdict(list)
+        for key, performed_at in records:
+            if performed_at is not None:
+                by_berth[key].append((performed_at, performed_at + duration))
+        for key, periods in by_berth.items():
+            self.close(key, periods)
+
+    def add_outage(self, key: Hashable, since: Optional[datetime.datetime] = None,
+                   until: Optional[datetime.datetime] = None):
+        # no end means the berth stays closed
+        self.close(key, [(since, until)])
+
+    def open_periods(self, key: Hashable, bookings: Iterable[Booking] = ()) -> IntervalSet:
+        available = self._open.get(key)
+        if available is None:
+            available = IntervalSet.everything()
+            if key in self.closed:
+                available = available.subtract(self.closed[key])
+            self._open[key] = available
+        bookings = list(bookings)
+        return available.subtract(IntervalSet.from_times(bookings)) if bookings else available
+
+    def busy(self, key: Hashable, bookings: Iterable[Booking] = ()) -> IntervalSet:
+        return self.closed.get(key, IntervalSet()).union(IntervalSet.from_times(bookings))
+
+    def first_fit(self, key: Hashable, not_before: datetime.datetime, duration: datetime.timedelta,
+                  bookings: Iterable[Booking] = ()) -> Optional[datetime.datetime]:
+        """Earliest start from `not_before` on with the berth open for `duration`, None if it never is."""
+        bookings = list(bookings)
+        if key not in self.closed and not bookings:
+            return not_before
+        return self.open_periods(key, bookings).next_fit(not_before, duration)
+
+    def is_open(self, key: Hashable, start: datetime.datetime, end: datetime.datetime,
+                bookings: Iterable[Booking] = ()) -> bool:
+        bookings = list(bookings)
+        if key not in self.closed and not bookings:
+            return True
+        return self.open_periods(key, bookings).covers(epoch_micros(start, OPEN_START), epoch_micros(end, OPEN_END))
+
+    def __len__(self):
+        return len(self.closed)
+
+    def __repr__(self):
+        return f"BerthCalendar(berths={len(self.closed)}, closures={sum(len(c) for c in self.closed.values())})"
+
+
+class BerthAvailability:
+    """When a vessel can lie at a berth: the berth open on the calendar and enough water on the tide.
+
+    Both are IntervalSets, intersected once per berth and tide level and kept,
+    so every schedule decoded from the same inputs (each candidate order in
+    schedule_optimized) shares them.
+    """
+
+    def __init__(self, tide: Optional[TideWindows] = None, calendar: Optional[BerthCalendar] = None):
+        self.tide = tide
+        self.calendar = calendar
+        self._periods: Dict[Tuple[Hashable, Optional[float]], Optional[IntervalSet]] = {}
+        self._version = calendar.version if calendar is not None else 0
+
+    def periods(self, key: Hashable, depth: Optional[float], draft: Optional[float]) -> Optional[IntervalSet]:
+        # None when neither the calendar nor the tide restricts this berth for this draft
+        if self.calendar is not None and self.calendar.version != self._version:
+            self._periods.clear()
+            self._version = self.calendar.version
+        level = self.tide.level(depth, draft) if self.tide is not None else None
+        cache_key = (key, level)
+        if cache_key in self._periods:
+            return self._periods[cache_key]
+        periods = None
+        if self.calendar is not None and key in self.calendar.closed:
+            periods = self.calendar.open_periods(key)
+        if level is not None:
+            water = self.tide.windows(level)
+            periods = water if periods is None else periods.intersect(water)
+        self._periods[cache_key] = periods
+        return periods
+
+    def first_fit(self, key: Hashable, depth: Optional[float], draft: Optional[float],
+                  not_before: datetime.datetime, duration: datetime.timedelta) -> Optional[datetime.datetime]:
+        """Earliest start from `not_before` on with the berth open and enough water for all of `duration`."""
+        periods = self.periods(key, depth, draft)
+        return not_before if periods is None else periods.next_fit(not_before, duration)
+
+    def __repr__(self):
+        return f"BerthAvailability(tide={self.tide is not None}, calendar={self.calendar is not None}, cached={len(self._periods)})"
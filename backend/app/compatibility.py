@@ -0,0 +1,92 @@
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Union
+import numpy as np
+
+
+def parse_allowed_types(value: Union[str, Iterable[str], None]) -> List[str]:
+    # berths store allowed types as a comma string ("CONTAINER,BULK")
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [t.strip().upper() for t in value if t and t.strip()]
+
+
+# (berth limit, vessel measure) pairs; the measure must not exceed the limit
+LIMITS = (("max_loa", "loa_m"), ("max_beam", "beam_m"), ("max_draft", "draft_m"), ("max_dwt", "dwt_t"))
+
+
+def within_limit(limit: Optional[float], value: Optional[float]) -> bool:
+    # the pairwise form of the matrix rule: no limit constrains nothing, no measure fits any limit
+    return limit is None or value is None or value <= limit
+
+
+def _column(values: Iterable[Optional[float]], missing: float) -> np.ndarray:
+    return np.array([missing if v is None else v for v in values], dtype=np.float64)
+
+
+def berth_columns(berths: Sequence) -> Dict[str, np.ndarray]:
+    # a missing berth limit does not constrain anything
+    return {
+        "max_loa": _column((b.max_loa for b in berths), np.inf),
+        "max_beam": _column((b.max_beam for b in berths), np.inf),
+        "max_draft": _column((b.max_draft for b in berths), np.inf),
+        "max_dwt": _column((b.max_dwt for b in berths), np.inf),
+    }
+
+
+def vessel_columns(vessels: Sequence) -> Dict[str, np.ndarray]:
+    return {
+        "loa_m": _column((v.loa_m for v in vessels), 0.0),
+        "beam_m": _column((v.beam_m for v in vessels), 0.0),
+        "draft_m": _column((v.draft_m for v in vessels), 0.0),
+        "dwt_t": _column((v.dwt_t for v in vessels), 0.0),
+    }
+
+
+class CompatibilityMatrix:
+    """Boolean vessel x berth suitability, computed in one broadcast."""
+
+    def __init__(self, berths: Sequence, vessels: Sequence):
+        self.berths = list(berths)
+        self.vessels = list(vessels)
+        self.berth_index: Dict[Hashable, int] = {b.id: i for i, b in enumerate(self.berths)}
+        self.vessel_index: Dict[Hashable, int] = {v.id: i for i, v in enumerate(self.vessels)}
+
+        # type codes; the extra last column stands for "type no berth knows"
+        allowed = [parse_allowed_types(b.allowed_types) for b in self.berths]
+        self.types = sorted({t for types in allowed for t in types})
+        codes = {t: i for i, t in enumerate(self.types)}
+        type_mask = np.zeros((len(self.berths), len(self.types) + 1), dtype=bool)
+        for i, types in enumerate(allowed):
+            type_mask[i, [codes[t] for t in types]] = True
+        unknown = len(self.types)
+        self.vessel_type_codes = np.array(
+            [codes.get((v.type or "").upper(), unknown) for v in self.vessels], dtype=np.int64)
+
+        b = berth_columns(self.berths)
+        v = vessel_columns(self.vessels)
+        self.matrix = (
+            (v["loa_m"][:, None] <= b["max_loa"][None, :])
+            & (v["beam_m"][:, None] <= b["max_beam"][None, :])
+            & (v["draft_m"][:, None] <= b["max_draft"][None, :])
+            & (v["dwt_t"][:, None] <= b["max_dwt"][None, :])
+            & type_mask[:, self.vessel_type_codes].T
+        )
+        self._suitable: Dict[int, List] = {}
+
+    def suitable_berths(self, vessel) -> List:
+        i = self.vessel_index[vessel.id]
+        berths = self._suitable.get(i)
+        if berths is None:
+            berths = self._suitable[i] = [self.berths[j] for j in np.flatnonzero(self.matrix[i])]
+        return berths
+
+    def is_suitable(self, berth, vessel) -> bool:
+        return bool(self.matrix[self.vessel_index[vessel.id], self.berth_index[berth.id]])
+
+    def to_dict(self) -> dict:
+        return {
+            "berth_ids": [b.id for b in self.berths],
+            "vessel_ids": [v.id for v in self.vessels],
+            "matrix": self.matrix.astype(np.uint8).tolist(),
+        }
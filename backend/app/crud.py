@@ -0,0 +1,110 @@
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import PlanVersion, PredictionScheduleEntry, Vessel
+from app.plan_diff import plan_row
+
+# asyncpg and psycopg refuse statements with more bind parameters than this
+MAX_BIND_PARAMS = 32767
+# below this a multi-row INSERT is as fast as COPY
+COPY_MIN_ROWS = 1000
+
+VERSION_SOURCES = {
+    "vessels": Vessel.actual_id,
+    "schedule": PredictionScheduleEntry.actual_id,
+}
+# INSERT ... ON CONFLICT for the databases we run on
+UPSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+
+async def fetch_by_ids(db: AsyncSession, model, ids: Iterable[int]) -> Dict[int, object]:
+    # one IN query instead of a lookup per id
+    ids = set(ids)
+    if not ids:
+        return {}
+    rows = (await db.execute(select(model).where(model.id.in_(ids)))).scalars()
+    return {row.id: row for row in rows}
+
+
+async def existing_ids(db: AsyncSession, model, ids: Iterable[int]) -> set:
+    ids = set(ids)
+    if not ids:
+        return set()
+    return set((await db.execute(select(model.id).where(model.id.in_(ids)))).scalars())
+
+
+async def bulk_insert(db: AsyncSession, model, rows: List[dict]) -> int:
+    # rows must all have the same keys; nothing is committed here
+    if not rows:
+        return 0
+    columns = list(rows[0])
+    conn = await db.connection()
+    if conn.dialect.driver == "asyncpg" and len(rows) >= COPY_MIN_ROWS:
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            model.__tablename__,
+            records=[tuple(row[c] for c in columns) for row in rows],
+            columns=columns,
+        )
+        return len(rows)
+    step = max(1, MAX_BIND_PARAMS // len(columns))
+    for i in range(0, len(rows), step):
+        await db.execute(insert(model).values(rows[i:i + step]))
+    return len(rows)
+
+
+async def load_plan_rows(db: AsyncSession, actual_id: int) -> List[dict]:
+    result = await db.execute(
+        select(PredictionScheduleEntry.vessel_id, PredictionScheduleEntry.berth_id,
+               PredictionScheduleEntry.start_time, PredictionScheduleEntry.end_time)
+        .where(PredictionScheduleEntry.actual_id == actual_id)
+    )
+    return [plan_row(*row) for row in result]
+
+
+async def bulk_update_by_id(db: AsyncSession, model, rows: List[dict]):
+    # executemany UPDATE keyed on each row's "id"
+    if rows:
+        await db.execute(update(model), rows)
+
+
+def latest_version_queries(name: str):
+    # pointer lookup first; MAX() over the indexed actual_id column if the pointer was never written
+    return (
+        select(PlanVersion.actual_id).where(PlanVersion.name == name),
+        select(func.max(VERSION_SOURCES[name])),
+    )
+
+
+async def latest_version(db: AsyncSession, name: str) -> Optional[int]:
+    pointer, fallback = latest_version_queries(name)
+    actual_id = (await db.execute(pointer)).scalar()
+    if actual_id is None:
+        actual_id = (await db.execute(fallback)).scalar()
+    return actual_id
+
+
+def version_upsert(dialect: str, name: str, actual_id: int):
+    # one statement, so two first writers can't both INSERT the pointer; it only
+    # ever moves forward, so an older batch written late can't hide a newer one
+    stmt = UPSERTS[dialect](PlanVersion).values(name=name, actual_id=actual_id)
+    return stmt.on_conflict_do_update(
+        index_elements=[PlanVersion.name],
+        set_={"actual_id": stmt.excluded.actual_id},
+        where=PlanVersion.actual_id < stmt.excluded.actual_id,
+    )
+
+
+async def bump_version(db: AsyncSession, name: str, actual_id: int):
+    # caller commits, so the pointer moves in the same transaction as the rows
+    await db.execute(version_upsert(db.bind.dialect.name, name, actual_id))
+
+
+async def next_sequence(db: AsyncSession, name: str) -> int:
+    # a counter kept in plan_versions, shared by every API process; caller commits
+    stmt = UPSERTS[db.bind.dialect.name](PlanVersion).values(name=name, actual_id=1)
+    stmt = stmt.on_conflict_do_update(index_elements=[PlanVersion.name],
+                                      set_={"actual_id": PlanVersion.actual_id + 1})
+    return (await db.execute(stmt.returning(PlanVersion.actual_id))).scalar_one()
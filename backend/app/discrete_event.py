@@ -0,0 +1,127 @@
+import heapq
+import random
+from datetime import timedelta
+
+from .simulator import as_timeline, berth_availability, parse_time, simulate_arrival, vessel_conditions, wait_to_dock
+
+ARRIVAL, SLOT_END, DOCK, DEPART = 0, 1, 2, 3
+
+
+def simulate_schedule_events(vessels, berth_plan, berth_info, weather="calm", seed=None, calendar=None):
+    """Replay a plan as arrival/dock/depart events, queueing each berth in plan order.
+
+    A vessel docks at max(actual arrival, planned start, previous vessel on the
+    berth leaving), so a late vessel pushes back everyone planned after it. A
+    vessel still at sea when its slot ends has missed it and gives up its turn.
+    `weather` is one condition string, a WeatherTimeline or a sequence of hourly Weather rows;
+    with the latter a vessel also waits at its berth until the tide gives it enough water.
+    A BerthCalendar keyed by berth name holds a vessel back while its berth is closed.
+    """
+    rng = random.Random(seed)
+    timeline = as_timeline(weather)
+    availability = berth_availability(timeline, calendar)
+    tide = availability.tide if availability is not None else None
+    vessels, conditions = vessel_conditions(vessels, timeline if timeline is not None else weather)
+
+    results = {}
+    calls = []  # (vessel_id, berth, plan_start, plan_end, arrival, delay)
+    water = []  # (berth depth, draft) per call
+    for vessel, condition in zip(vessels, conditions):
+        vessel_id = vessel["id"]
+        plan = berth_plan.get(vessel_id)
+        if not plan:
+            results[vessel_id] = {"vessel_id": vessel_id, "status": "no_plan"}
+            continue
+        berth = plan["berth"]
+        berth_data = berth_info.get(berth)
+        if not berth_data:
+            results[vessel_id] = {"vessel_id": vessel_id, "status": "invalid_berth"}
+            continue
+        too_shallow = (vessel["draft"] > berth_data["depth"] if tide is None
+                       else not tide.ever_navigable(berth_data["depth"], vessel["draft"]))
+        if too_shallow:
+            results[vessel_id] = {"vessel_id": vessel_id, "status": "rejected_depth_too_shallow", "berth": berth}
+            continue
+        arrival, delay = simulate_arrival(parse_time(vessel["eta"]), condition, rng)
+        calls.append((vessel_id, berth, parse_time(plan["start_time"]), parse_time(plan["end_time"]), arrival, delay))
+        water.append((berth_data["depth"], vessel["draft"]))
+
+    queues = {}
+    for i, call in enumerate(calls):
+        queues.setdefault(call[1], []).append(i)
+    for queue in queues.values():
+        queue.sort(key=lambda i: calls[i][2])
+    position = {berth: 0 for berth in queues}
+    busy = {berth: False for berth in queues}
+    arrived = [False] * len(calls)
+    missed = [False] * len(calls)
+    tide_wait = [0.0] * len(calls)
+    closed_wait = [0.0] * len(calls)
+
+    events = [(call[4], ARRIVAL, i) for i, call in enumerate(calls)]
+    events += [(call[3], SLOT_END, i) for i, call in enumerate(calls)]
+    heapq.heapify(events)
+
+    def try_dock(berth, now):
+        queue = queues[berth]
+        while not busy[berth] and position[berth] < len(queue):
+            i = queue[position[berth]]
+            if missed[i]:
+                position[berth] += 1
+                continue
+            if not arrived[i]:
+                return
+            dock, tide_wait[i], closed_wait[i], rejected = wait_to_dock(
+                berth, *water[i], calls[i][3] - calls[i][2], max(now, calls[i][2]), availability)
+            if rejected:
+                # the water never comes back up within the tide series, or the berth never reopens
+                results[calls[i][0]] = {"vessel_id": calls[i][0], "status": rejected, "berth": berth}
+                position[berth] += 1
+                continue
+            busy[berth] = True
+            heapq.heappush(events, (dock, DOCK, i))
+
+    while events:
+        now, kind, i = heapq.heappop(events)
+        vessel_id, berth, plan_start, plan_end, arrival, delay = calls[i]
+        if kind == ARRIVAL:
+            arrived[i] = True
+            if missed[i]:
+                results[vessel_id] = {
+                    "vessel_id": vessel_id,
+                    "status": "missed_slot_due_to_delay",
+                    "scheduled_start": plan_start,
+                    "actual_arrival": arrival,
+                    "delay_minutes": delay,
+                    "berth": berth,
+                }
+            else:
+                try_dock(berth, now)
+        elif kind == SLOT_END:
+            if not arrived[i]:
+                missed[i] = True
+                try_dock(berth, now)
+        elif kind == DOCK:
+            docking_end = now + (plan_end - plan_start)
+            results[vessel_id] = {
+                "vessel_id": vessel_id,
+                "status": "docked",
+                "berth": berth,
+                "scheduled_start": plan_start,
+                "scheduled_end": plan_end,
+                "actual_start": now,
+                "actual_end": docking_end,
+                "delay_minutes": delay,
+                "knock_on_minutes": (now - max(arrival, plan_start)) / timedelta(minutes=1) - tide_wait[i] - closed_wait[i],
+            }
+            if tide is not None:
+                results[vessel_id]["tide_wait_minutes"] = tide_wait[i]
+            if calendar is not None:
+                results[vessel_id]["maintenance_wait_minutes"] = closed_wait[i]
+            heapq.heappush(events, (docking_end, DEPART, i))
+        else:
+            busy[berth] = False
+            position[berth] += 1
+            try_dock(berth, now)
+
+    return [results[v["id"]] for v in vessels]
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.async_db import async_engine
+from app.models import StreamEvent
+
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "100"))  # events buffered per client
+STREAM_HISTORY = int(os.getenv("STREAM_HISTORY", "1000"))  # events kept for Last-Event-ID resume
+STREAM_HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT", "15"))  # seconds between keep-alive comments
+
+# one Postgres channel carries every stream; NOTIFY payloads are capped at ~8000
+# bytes, so the payload is only the event id and the event is read from stream_events
+NOTIFY_CHANNEL = "port_events"
+
+logger = logging.getLogger(__name__)
+
+
+def format_event(event_id: int, data: str, event: Optional[str] = None) -> str:
+    lines = [f"data: {data}"]
+    if event:
+        lines.append(f"event: {event}")
+    if event_id:
+        lines.append(f"id: {event_id}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscriber:
+    def __init__(self, channel: str, max_size: int = STREAM_QUEUE_SIZE):
+        self.channel = channel
+        self.queue = asyncio.Queue(max_size)
+        self.dropped = 0
+
+    def offer(self, message: str):
+        # a slow client loses its oldest events instead of holding up the publisher
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    def __repr__(self):
+        return f"Subscriber(channel='{self.channel}', queued={self.queue.qsize()}, dropped={self.dropped})"
+
+
+class EventBroker:
+    """Fans each published event out to every subscriber of its channel."""
+
+    def __init__(self, history: int = STREAM_HISTORY):
+        self.last_id = 0
+        self.history = deque(maxlen=history)  # (id, channel, formatted message)
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+        self.listening = False
+        self.listener: Optional[asyncio.Task] = None
+        self.notified: List[int] = []  # event ids announced but not read yet
+        self.wakeup = asyncio.Event()
+
+    def publish_local(self, channel: str, data: str, event_id: Optional[int] = None) -> int:
+        if event_id is None:
+            event_id = self.last_id + 1
+        self.last_id = max(self.last_id, event_id)
+        message = format_event(event_id, data)
+        self.history.append((event_id, channel, message))
+        for subscriber in self.subscribers.get(channel, ()):
+            subscriber.offer(message)
+        return event_id
+
+    def subscribe(self, channel: str, last_event_id: Optional[int] = None) -> Subscriber:
+        subscriber = Subscriber(channel)
+        if last_event_id is not None:
+            if (self.history and last_event_id < self.history[0][0] - 1) or last_event_id > self.last_id:
+                # the cursor is older than what we kept (or from before a restart),
+                # tell the client to refetch
+                subscriber.dropped += 1
+            for event_id, event_channel, message in self.history:
+                if event_id > last_event_id and event_channel == channel:
+                    subscriber.offer(message)
+        self.subscribers.setdefault(channel, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.get(subscriber.channel, set()).discard(subscriber)
+
+    def subscriber_count(self) -> int:
+        return sum(len(s) for s in self.subscribers.values())
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self.notified.append(json.loads(payload)["id"])
+        self.wakeup.set()
+
+    async def load(self, conn: AsyncConnection, condition):
+        # publish the stored events matching `condition` here, in id order
+        rows = await conn.execute(
+            select(StreamEvent.id, StreamEvent.channel, StreamEvent.data).where(condition).order_by(StreamEvent.id)
+        )
+        for event_id, channel, data in rows.all():
+            self.publish_local(channel, data, event_id)
+        await conn.commit()
+
+    async def listen(self):
+        # keep one connection LISTENing and reconnect if it drops
+        while True:
+            try:
+                async with async_engine.connect() as conn:
+                    raw = (await conn.get_raw_connection()).driver_connection
+                    await raw.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                    self.listening = True
+                    # whatever was published while we weren't listening (after a start, what is kept)
+                    await self.load(conn, StreamEvent.id > self.last_id)
+                    while not raw.is_closed():
+                        try:
+                            await asyncio.wait_for(self.wakeup.wait(), STREAM_HEARTBEAT)
+                        except asyncio.TimeoutError:
+                            continue
+                        self.wakeup.clear()
+                        ids, self.notified = self.notified, []
+                        await self.load(conn, StreamEvent.id.in_(ids))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Event listener lost its connection, reconnecting", exc_info=True)
+            finally:
+                self.listening = False
+            await asyncio.sleep(1)
+
+    def __repr__(self):
+        return f"EventBroker(last_id={self.last_id}, subscribers={self.subscriber_count()})"
+
+
+broker = EventBroker()
+
+
+def uses_notify(db: AsyncSession) -> bool:
+    return db.bind.dialect.name == "postgresql"
+
+
+async def publish(db: AsyncSession, channel: str, data: str):
+    # on Postgres the event is stored and its id goes through NOTIFY so every API
+    # process sees it, elsewhere (sqlite, local runs) it is fanned out in this
+    # process only; commits whatever the caller wrote with it
+    if not uses_notify(db):
+        broker.publish_local(channel, data)
+        await db.commit()
+        return
+    event_id = (await db.execute(
+        insert(StreamEvent).values(channel=channel, data=data).returning(StreamEvent.id)
+    )).scalar_one()
+    # no process resumes from further back than its history
+    await db.execute(delete(StreamEvent).where(StreamEvent.id <= event_id - STREAM_HISTORY))
+    await db.execute(text("SELECT pg_notify(:notify, :payload)"),
+                     {"notify": NOTIFY_CHANNEL, "payload": json.dumps({"id": event_id})})
+    await db.commit()
+
+
+def start_listener() -> Optional[asyncio.Task]:
+    if async_engine.dialect.name == "postgresql" and broker.listener is None:
+        broker.listener = asyncio.get_running_loop().create_task(broker.listen())
+    return broker.listener
+
+
+async def stop_listener():
+    listener, broker.listener = broker.listener, None
+    if listener is None:
+        return
+    listener.cancel()
+    try:
+        await listener
+    except asyncio.CancelledError:
+        pass
@@ -0,0 +1,188 @@
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import train_test_split
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import Berth, HumanFix, MaintenanceLog, PredictionScheduleEntry, Vessel, Weather
+from app.intervals import as_seconds
+from app.weather_index import WeatherTimeline
+
+VESSEL_TYPES = ("CONTAINER", "BULK", "RORO", "TANKER", "OTHER")
+WEATHER_CONDITIONS = ("RAIN", "STORM")  # CLEAR is the baseline
+# days since maintenance for a berth with no record of any
+MAINTENANCE_AGE_UNKNOWN = 365.0
+MIN_TRAINING_ROWS = 10
+
+FEATURE_NAMES = (
+    ["loa_m", "beam_m", "draft_m", "dwt_t", "depth_m", "max_loa", "max_beam", "max_draft", "max_dwt"]
+    + [f"type_{t.lower()}" for t in VESSEL_TYPES]
+    + ["wind_speed_knots", "tide_height_m"]
+    + [f"weather_{c.lower()}" for c in WEATHER_CONDITIONS]
+    + ["maintenance_age_days"]
+)
+
+VESSEL_COLUMNS = (Vessel.loa_m, Vessel.beam_m, Vessel.draft_m, Vessel.dwt_t, Vessel.type, Vessel.eta)
+BERTH_COLUMNS = (Berth.name, Berth.depth_m, Berth.max_loa, Berth.max_beam, Berth.max_draft, Berth.max_dwt)
+
+
+def floats(values) -> np.ndarray:
+    # None -> nan
+    return np.array(values, dtype=float)
+
+
+class MaintenanceArrays:
+    """Maintenance dates per berth, read as-of a batch of (berth, timestamp) pairs."""
+
+    def __init__(self, records: Sequence[Tuple[str, object]]):
+        records = [(name, ts) for name, ts in records if name is not None and ts is not None]
+        self.codes: Dict[str, int] = {name: i for i, name in enumerate(sorted({name for name, _ in records}))}
+        codes = np.array([self.codes[name] for name, _ in records], dtype=np.int64)
+        times = as_seconds([ts for _, ts in records])
+        order = np.lexsort((times, codes))
+        self.berth_codes, self.times = codes[order], times[order]
+        self.keys = self._keys(self.berth_codes, self.times)
+
+    @staticmethod
+    def _keys(codes: np.ndarray, times: np.ndarray) -> np.ndarray:
+        # one sortable key per (berth, time); epoch seconds within +-2**39 (17k years) fit below the code bits
+        return (codes << 40) + times + (1 << 39)
+
+    def age_days(self, berth_names: Sequence[str], ts: np.ndarray) -> np.ndarray:
+        codes = np.array([self.codes.get(name, -1) for name in berth_names], dtype=np.int64)
+        ages = np.full(len(codes), MAINTENANCE_AGE_UNKNOWN)
+        if len(self.keys) == 0:
+            return ages
+        i = np.searchsorted(self.keys, self._keys(codes, ts), side="right") - 1
+        found = (i >= 0) & (codes >= 0)
+        found[found] &= self.berth_codes[i[found]] == codes[found]
+        ages[found] = (ts[found] - self.times[i[found]]) / 86400
+        return ages
+
+
+def build_features(vessels: Dict[str, np.ndarray], berths: Dict[str, np.ndarray],
+                   weather: WeatherTimeline, maintenance: MaintenanceArrays) -> np.ndarray:
+    """Row-aligned vessel and berth columns (one row per vessel/berth pair) -> feature matrix."""
+    eta = vessels["eta"]
+    types = np.array([(t or "").upper() for t in vessels["type"]], dtype=object)
+    conditions = weather.conditions(eta)
+    return np.nan_to_num(np.column_stack([
+        vessels["loa_m"], vessels["beam_m"], vessels["draft_m"], vessels["dwt_t"],
+        berths["depth_m"], berths["max_loa"], berths["max_beam"], berths["max_draft"], berths["max_dwt"],
+        *[(types == t).astype(float) for t in VESSEL_TYPES],
+        weather.wind_at(eta),
+        weather.tide_at(eta),
+        *[(conditions == c).astype(float) for c in WEATHER_CONDITIONS],
+        maintenance.age_days(berths["name"], eta),
+    ]))
+
+
+def columns_from_rows(rows: Sequence):
+    # rows laid out as VESSEL_COLUMNS + BERTH_COLUMNS + anything else
+    cols = list(zip(*rows)) if rows else [()] * (len(VESSEL_COLUMNS) + len(BERTH_COLUMNS))
+    vessels = {
+        "loa_m": floats(cols[0]), "beam_m": floats(cols[1]), "draft_m": floats(cols[2]), "dwt_t": floats(cols[3]),
+        "type": list(cols[4]), "eta": as_seconds(cols[5]),
+    }
+    berths = {
+        "name": list(cols[6]), "depth_m": floats(cols[7]), "max_loa": floats(cols[8]),
+        "max_beam": floats(cols[9]), "max_draft": floats(cols[10]), "max_dwt": floats(cols[11]),
+    }
+    return vessels, berths, cols
+
+
+def load_maintenance(db: Session) -> MaintenanceArrays:
+    logs = db.execute(select(MaintenanceLog.berth_name, MaintenanceLog.performed_at)).all()
+    last = db.execute(select(Berth.name, Berth.last_maintenance)).all()
+    return MaintenanceArrays(list(logs) + list(last))
+
+
+def load_training_set(db: Session) -> Tuple[np.ndarray, np.ndarray]:
+    """Berth time in minutes as executed (actual start/end) and as corrected by planners (HumanFix).
+
+    A human fix also rewrites its entry's actual start/end, so corrected
+    calls are counted twice and weigh more than plain history.
+    """
+    executed = db.execute(
+        select(*VESSEL_COLUMNS, *BERTH_COLUMNS,
+               PredictionScheduleEntry.actual_start_time, PredictionScheduleEntry.actual_end_time)
+        .join(Vessel, Vessel.id == PredictionScheduleEntry.vessel_id)
+        .join(Berth, Berth.id == PredictionScheduleEntry.berth_id)
+        .where(PredictionScheduleEntry.actual_start_time.is_not(None),
+               PredictionScheduleEntry.actual_end_time.is_not(None))
+    ).all()
+    fixed = db.execute(
+        select(*VESSEL_COLUMNS, *BERTH_COLUMNS, HumanFix.start_time, HumanFix.end_time)
+        .join(Vessel, Vessel.id == HumanFix.vessel_id)
+        .join(Berth, Berth.id == HumanFix.berth_id)
+        .where(HumanFix.start_time.is_not(None), HumanFix.end_time.is_not(None))
+    ).all()
+    rows = list(executed) + list(fixed)
+    vessels, berths, cols = columns_from_rows(rows)
+    if not rows:
+        return np.zeros((0, len(FEATURE_NAMES))), np.zeros(0)
+
+    y = (as_seconds(cols[-1]) - as_seconds(cols[-2])) / 60
+    eta = vessels["eta"]
+    # only the weather around the etas we have, a day early so the first as-of lookup finds a row
+    since = np.datetime64(int(eta.min()) - 86400, "s").item()
+    until = np.datetime64(int(eta.max()), "s").item()
+    weather_rows = db.execute(
+        select(Weather.timestamp, Weather.condition, Weather.wind_speed_knots, Weather.tide_height_m)
+        .where(Weather.timestamp.between(since, until))
+    ).all()
+    X = build_features(vessels, berths, WeatherTimeline(weather_rows), load_maintenance(db))
+    keep = y > 0
+    return X[keep], y[keep]
+
+
+class BerthTimeModel:
+    """Berth time in minutes from FEATURE_NAMES."""
+
+    def __init__(self):
+        self.regression: Optional[LinearRegression] = None
+        self.mse: Optional[float] = None
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> float:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        self.regression = LinearRegression().fit(X_train, y_train)
+        self.mse = float(mean_squared_error(y_test, self.regression.predict(X_test)))
+        return self.mse
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return np.clip(self.regression.predict(X), 0, None)
+
+    def __repr__(self):
+        return f"BerthTimeModel(trained={self.regression is not None}, mse={self.mse})"
+
+
+def predict_berth_times(model: BerthTimeModel, vessels: Sequence, berths: Sequence,
+                        weather: Union[WeatherTimeline, Sequence] = (),
+                        maintenance: Optional[MaintenanceArrays] = None) -> np.ndarray:
+    """Predicted minutes for every planner vessel x berth pair, shape (len(vessels), len(berths)), one predict call."""
+    n_v, n_b = len(vessels), len(berths)
+    if n_v == 0 or n_b == 0:
+        return np.zeros((n_v, n_b))
+    if maintenance is None:
+        maintenance = MaintenanceArrays([(b.name, b.last_maintenance) for b in berths])
+    vessel_cols = {
+        "loa_m": floats([v.loa_m for v in vessels]), "beam_m": floats([v.beam_m for v in vessels]),
+        "draft_m": floats([v.draft_m for v in vessels]), "dwt_t": floats([v.dwt_t for v in vessels]),
+        "type": [v.type for v in vessels], "eta": as_seconds([v.eta for v in vessels]),
+    }
+    berth_cols = {
+        "name": [b.name for b in berths], "depth_m": floats([b.depth_m for b in berths]),
+        "max_loa": floats([b.max_loa for b in berths]), "max_beam": floats([b.max_beam for b in berths]),
+        "max_draft": floats([b.max_draft for b in berths]), "max_dwt": floats([b.max_dwt for b in berths]),
+    }
+    # vessel-major pairs: vessel i, berth j is row i * n_b + j
+    pairs_v = {k: (np.repeat(v, n_b) if isinstance(v, np.ndarray) else [x for x in v for _ in range(n_b)])
+               for k, v in vessel_cols.items()}
+    pairs_b = {k: (np.tile(v, n_v) if isinstance(v, np.ndarray) else list(v) * n_v) for k, v in berth_cols.items()}
+    if not isinstance(weather, WeatherTimeline):
+        weather = WeatherTimeline(weather)
+    X = build_features(pairs_v, pairs_b, weather, maintenance)
+    return model.predict(X).reshape(n_v, n_b)
@@ -0,0 +1,260 @@
+import io
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.crud import latest_version_queries, version_upsert
+from app.models import Berth, PredictionScheduleEntry, Vessel
+
+IMPORT_CHUNK = int(os.getenv("IMPORT_CHUNK", "20000"))  # csv rows parsed, validated and loaded at a time
+MAX_REPORTED_REJECTS = 1000  # rejected rows listed in the report, the rest are only counted
+
+KINDS = ("vessels", "berths", "plan")
+
+# the database assigns vessel ids; the file's own id is kept as source_id, unique within the batch
+VESSEL_COLUMNS = ["source_id", "actual_id", "name", "type", "loa_m", "beam_m", "draft_m", "dwt_t", "eta", "ebt"]
+BERTH_COLUMNS = ["name", "depth_m", "max_loa", "max_beam", "max_draft", "max_dwt", "allowed_types", "last_maintenance"]
+PLAN_COLUMNS = ["actual_id", "vessel_id", "berth_id", "start_time", "end_time",
+                "actual_arrival_time", "actual_start_time", "actual_end_time"]
+
+
+class ImportReport:
+    def __init__(self, kind: str, actual_id: Optional[int] = None):
+        self.kind = kind
+        self.actual_id = actual_id
+        self.loaded = 0
+        self.rejected = 0
+        self.errors: List[dict] = []
+
+    def reject(self, lines: Iterable[int], reasons: Iterable[str]):
+        for line, reason in zip(lines, reasons):
+            self.rejected += 1
+            if len(self.errors) < MAX_REPORTED_REJECTS:
+                self.errors.append({"line": int(line), "reason": reason})
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "actual_id": self.actual_id,
+            "loaded": self.loaded,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+    def __repr__(self):
+        return f"ImportReport(kind='{self.kind}', loaded={self.loaded}, rejected={self.rejected})"
+
+
+def numbers(column: pd.Series) -> pd.Series:
+    return pd.to_numeric(column, errors="coerce")
+
+
+def timestamps(column: pd.Series, *formats: str) -> pd.Series:
+    # feeds mix "2025-03-30T09:30:43Z" and "2024-12-02 05:09:51"; stored as naive UTC.
+    # `formats` are tried, in order, on whatever ISO 8601 couldn't parse
+    parsed = pd.to_datetime(column, errors="coerce", utc=True, format="ISO8601")
+    for fmt in formats:
+        missing = parsed.isna() & column.notna()
+        if not missing.any():
+            break
+        parsed = parsed.mask(missing, pd.to_datetime(column[missing], errors="coerce", utc=True, format=fmt))
+    return parsed.dt.tz_convert(None)
+
+
+def blank(column: pd.Series) -> pd.Series:
+    return column.isna() | (column.str.strip() == "")
+
+
+def first_failure(index: pd.Index, checks: List[Tuple[pd.Series, str]]) -> pd.Series:
+    # the reason of the first failed check per row, NaN for rows that pass
+    reasons = pd.Series(np.nan, index=index, dtype=object)
+    for failed, reason in checks:
+        reasons = reasons.mask(reasons.isna() & failed.fillna(True).astype(bool), reason)
+    return reasons
+
+
+def optional_column(df: pd.DataFrame, name: str) -> pd.Series:
+    return df[name] if name in df else pd.Series(np.nan, index=df.index, dtype=object)
+
+
+def prepare_vessels(df: pd.DataFrame, actual_id: int, seen: set) -> Tuple[pd.DataFrame, pd.Series]:
+    ids = numbers(df["id"])
+    dims = {col: numbers(df[col]) for col in ("loa_m", "beam_m", "draft_m")}
+    eta = timestamps(df["eta"])
+    # optional: deadweight in tonnes, estimated berth time in whole minutes
+    extras = {col: optional_column(df, col) for col in ("dwt_t", "ebt")}
+    parsed = {col: numbers(values) for col, values in extras.items()}
+
+    checks = [
+        (ids.isna() | (ids <= 0) | (ids % 1 != 0), "invalid id"),
+        (ids.duplicated() | ids.isin(seen), "duplicate id in file"),
+        (blank(df["type"]), "missing type"),
+        (eta.isna(), "invalid eta"),
+    ]
+    checks += [(dims[col].isna() | (dims[col] <= 0), f"invalid {col}") for col in dims]
+    checks += [(~blank(extras[col]) & (parsed[col].isna() | (parsed[col] <= 0)), f"invalid {col}") for col in extras]
+    checks.append(((parsed["ebt"] % 1).fillna(0) != 0, "invalid ebt"))
+    reasons = first_failure(df.index, checks)
+    seen.update(ids.dropna().astype(int).tolist())
+
+    imo = df["imo"].fillna("").str.strip() if "imo" in df else pd.Series("", index=df.index)
+    frame = pd.DataFrame({
+        "source_id": ids,
+        "actual_id": actual_id,
+        "name": np.where(imo != "", "IMO " + imo, ""),
+        "type": df["type"].str.strip().str.upper(),
+        **dims,
+        "dwt_t": parsed["dwt_t"],
+        "eta": eta,
+        "ebt": parsed["ebt"],
+    }, index=df.index)
+    return frame[reasons.isna()].astype({"source_id": int, "ebt": "Int64"}), reasons
+
+
+def prepare_berths(df: pd.DataFrame, session: Session, seen: set) -> Tuple[pd.DataFrame, pd.Series]:
+    names = df["berthId"].str.strip()
+    limits = {
+        "depth_m": df["depth_m"],
+        "max_loa": df["maxLOA_m"],
+        "max_beam": df["maxBeam_m"],
+        "max_draft": df["maxDraft_m"],
+        "max_dwt": df["maxDWT_t"],
+    }
+    parsed = {col: numbers(values) for col, values in limits.items()}
+    last_maintenance = timestamps(df["lastMaintenance"], "%m/%d/%Y")
+    known = set(session.execute(select(Berth.name).where(Berth.name.in_(names.dropna().tolist()))).scalars())
+
+    checks = [
+        (blank(df["berthId"]), "missing berthId"),
+        (names.duplicated() | names.isin(seen), "duplicate berthId in file"),
+        (names.isin(known), "berth already exists"),
+        (~blank(df["lastMaintenance"]) & last_maintenance.isna(), "invalid lastMaintenance"),
+    ]
+    # limits are optional, but a value that is there has to be a positive number
+    checks += [(~blank(limits[col]) & (parsed[col].isna() | (parsed[col] <= 0)), f"invalid {col}") for col in limits]
+    reasons = first_failure(df.index, checks)
+    seen.update(names.dropna().tolist())
+
+    frame = pd.DataFrame({
+        "name": names,
+        **parsed,
+        "allowed_types": df["allowedTypes"].str.strip().str.upper(),
+        "last_maintenance": last_maintenance,
+    }, index=df.index)
+    return frame[reasons.isna()], reasons
+
+
+def prepare_plan(df: pd.DataFrame, actual_id: int, session: Session, vessel_batch: Optional[int],
+                 berth_ids: Dict[str, int], seen: set) -> Tuple[pd.DataFrame, pd.Series]:
+    # vesselId is the vessel feed's id, looked up in the latest vessel batch
+    vessel_ids = numbers(df["vesselId"])
+    berth_names = df["berthId"].str.strip()
+    start = timestamps(df["start"])
+    end = timestamps(df["end"])
+    known = dict(session.execute(
+        select(Vessel.source_id, Vessel.id)
+        .where(Vessel.actual_id == vessel_batch, Vessel.source_id.in_(vessel_ids.dropna().astype(int).tolist()))
+    ).all())
+
+    checks = [
+        (~vessel_ids.isin(list(known)), "unknown vesselId"),
+        (vessel_ids.duplicated() | vessel_ids.isin(seen), "vessel planned twice"),
+        (~berth_names.isin(berth_ids), "unknown berthId"),
+        (start.isna(), "invalid start"),
+        (end.isna(), "invalid end"),
+        (end <= start, "end before start"),
+    ]
+    reasons = first_failure(df.index, checks)
+    seen.update(vessel_ids.dropna().astype(int).tolist())
+
+    frame = pd.DataFrame({
+        "actual_id": actual_id,
+        "vessel_id": vessel_ids.map(known),
+        "berth_id": berth_names.map(berth_ids),
+        "start_time": start,
+        "end_time": end,
+        "actual_arrival_time": start - pd.Timedelta(minutes=15),
+        "actual_start_time": start,
+        "actual_end_time": end,
+    }, index=df.index)
+    return frame[reasons.isna()].astype({"vessel_id": int, "berth_id": int}), reasons
+
+
+def load_frame(session: Session, model, frame: pd.DataFrame, columns: List[str]):
+    if frame.empty:
+        return
+    frame = frame[columns]
+    if session.bind.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        frame.to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S.%f")
+        sql = f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        cursor = session.connection().connection.cursor()
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+        return
+    values = [frame[c].astype(object).where(frame[c].notna(), None).tolist() for c in columns]
+    session.execute(insert(model.__table__), [dict(zip(columns, row)) for row in zip(*values)])
+
+
+def next_actual_id(session: Session, *names: str) -> int:
+    latest = []
+    for name in names:
+        pointer, fallback = latest_version_queries(name)
+        latest.append(session.execute(pointer).scalar() or session.execute(fallback).scalar() or 0)
+    return max(latest) + 1
+
+
+def import_csv(source, kind: str, session: Session, actual_id: Optional[int] = None,
+               chunk_size: int = IMPORT_CHUNK) -> ImportReport:
+    """Load a MOCK_VESSEL / MOCK_BERTH / MOCK_PLAN style csv, rejecting bad rows instead of stopping.
+
+    `source` is a path or a file object. Vessels and plans are written as a new
+    batch (`actual_id`, next free one by default) and each chunk is committed
+    on its own, so a late bad row doesn't roll back the rows before it.
+    Vessel ids in the files are the feed's own: they are kept per batch, and a
+    plan's vesselIds are those of the latest vessel batch.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown import kind {kind}, expected one of {', '.join(KINDS)}")
+    if kind == "vessels" and actual_id is None:
+        actual_id = next_actual_id(session, "vessels")
+    if kind == "plan" and actual_id is None:
+        actual_id = next_actual_id(session, "vessels", "schedule")
+    report = ImportReport(kind, actual_id)
+    berth_ids = dict(session.execute(select(Berth.name, Berth.id)).all()) if kind == "plan" else {}
+    vessel_batch = None
+    if kind == "plan":
+        pointer, fallback = latest_version_queries("vessels")
+        vessel_batch = session.execute(pointer).scalar() or session.execute(fallback).scalar()
+    seen = set()
+
+    for df in pd.read_csv(source, dtype=str, chunksize=chunk_size, keep_default_na=False, na_values=[""]):
+        if kind == "vessels":
+            frame, reasons = prepare_vessels(df, actual_id, seen)
+            load_frame(session, Vessel, frame, VESSEL_COLUMNS)
+        elif kind == "berths":
+            frame, reasons = prepare_berths(df, session, seen)
+            load_frame(session, Berth, frame, BERTH_COLUMNS)
+        else:
+            frame, reasons = prepare_plan(df, actual_id, session, vessel_batch, berth_ids, seen)
+            load_frame(session, PredictionScheduleEntry, frame, PLAN_COLUMNS)
+        failed = reasons.dropna()
+        # csv line numbers: the header is line 1
+        report.reject(failed.index + 2, failed.tolist())
+        report.loaded += len(frame)
+        session.commit()
+
+    if report.loaded and kind == "vessels":
+        session.execute(version_upsert(session.bind.dialect.name, "vessels", actual_id))
+    if report.loaded and kind == "plan":
+        session.execute(version_upsert(session.bind.dialect.name, "schedule", actual_id))
+    session.commit()
+    return report
@@ -0,0 +1,202 @@
+import bisect
+import datetime
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# every epoch conversion in the app goes through here: arrays of readings in
+# seconds, IntervalSets in microseconds (planner times carry them)
+EPOCH = datetime.datetime(1970, 1, 1)
+MICROSECOND = datetime.timedelta(microseconds=1)
+MICROS_PER_SECOND = 1_000_000
+# open ends, e.g. an outage with no end date
+OPEN_START = np.iinfo(np.int64).min
+OPEN_END = np.iinfo(np.int64).max
+
+
+def as_seconds(ts) -> np.ndarray:
+    # datetimes, datetime64 or epoch seconds -> int64 epoch seconds, always 1-d; None -> NaT
+    ts = np.atleast_1d(np.asarray(ts))
+    if ts.dtype.kind in "iu":
+        return ts.astype(np.int64)
+    return ts.astype("datetime64[s]").astype(np.int64)
+
+
+def epoch_micros(ts: Optional[datetime.datetime], default: int) -> int:
+    if ts is None:
+        return default
+    return (ts - EPOCH) // MICROSECOND
+
+
+def from_epoch_micros(micros: int) -> Optional[datetime.datetime]:
+    if micros in (OPEN_START, OPEN_END):
+        return None
+    return EPOCH + datetime.timedelta(microseconds=int(micros))
+
+
+def lengths_tree(lengths: np.ndarray) -> List[list]:
+    """Max of `lengths` over each aligned power-of-two block, leaves first, for first_at_least.
+
+    Lists, since the search reads single values.
+    """
+    size = 1 << max(len(lengths) - 1, 0).bit_length()
+    level = np.concatenate([np.asarray(lengths, dtype=np.int64), np.full(size - len(lengths), -1, dtype=np.int64)])
+    levels = [level]
+    while len(level) > 1:
+        level = np.maximum(level[0::2], level[1::2])
+        levels.append(level)
+    return [level.tolist() for level in levels]
+
+
+def first_at_least(levels: List[list], i: int, n: int, value: int) -> Optional[int]:
+    # first of n leaves from i on with a length >= value: up past blocks too short, then down
+    if i >= n:
+        return None
+    node, depth = i, 0
+    while levels[depth][node] < value:
+        # past this block: climb while it is a right child, then step to the next block
+        while node & 1:
+            node >>= 1
+            depth += 1
+        node += 1
+        if node >= len(levels[depth]):
+            return None
+    while depth:
+        depth -= 1
+        node <<= 1
+        if levels[depth][node] < value:
+            node += 1
+    return node
+
+
+class IntervalSet:
+    """Sorted, disjoint half-open [start, end) intervals, in epoch microseconds.
+
+    Overlapping and touching intervals are merged on construction and every
+    operation returns a new set, so the arrays can be shared freely.
+    """
+
+    __slots__ = ("starts", "ends", "_lists", "_longest")
+
+    def __init__(self, starts=(), ends=()):
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        keep = ends > starts
+        starts, ends = starts[keep], ends[keep]
+        order = np.argsort(starts, kind="stable")
+        starts, ends = starts[order], ends[order]
+        if len(starts):
+            # a new block begins where a start is past every end before it
+            reach = np.maximum.accumulate(ends)
+            first = np.flatnonzero(np.concatenate([[True], starts[1:] > reach[:-1]]))
+            starts, ends = starts[first], np.maximum.reduceat(ends, first)
+        self.starts, self.ends = starts, ends
+        self._lists = self._longest = None
+
+    @classmethod
+    def _normalized(cls, starts: np.ndarray, ends: np.ndarray) -> "IntervalSet":
+        # already sorted, disjoint and non-touching: skip the merge
+        result = cls.__new__(cls)
+        result.starts, result.ends = starts, ends
+        result._lists = result._longest = None
+        return result
+
+    @classmethod
+    def from_times(cls, pairs: Iterable[Tuple[Optional[datetime.datetime], Optional[datetime.datetime]]]) -> "IntervalSet":
+        # None on either side leaves that side open
+        pairs = list(pairs)
+        return cls([epoch_micros(s, OPEN_START) for s, _ in pairs], [epoch_micros(e, OPEN_END) for _, e in pairs])
+
+    @classmethod
+    def everything(cls) -> "IntervalSet":
+        return cls([OPEN_START], [OPEN_END])
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Tuple[Optional[datetime.datetime], Optional[datetime.datetime]]]:
+        for start, end in zip(self.starts.tolist(), self.ends.tolist()):
+            yield from_epoch_micros(start), from_epoch_micros(end)
+
+    def contains_points(self, points: np.ndarray) -> np.ndarray:
+        i = np.searchsorted(self.starts, points, side="right") - 1
+        if len(self) == 0:
+            return np.zeros(len(points), dtype=bool)
+        return (i >= 0) & (points < self.ends[np.clip(i, 0, None)])
+
+    def _combine(self, other: "IntervalSet", op) -> "IntervalSet":
+        # cut both sets at every boundary; each piece is wholly in or out of either set
+        points = np.unique(np.concatenate([self.starts, self.ends, other.starts, other.ends]))
+        if len(points) < 2:
+            return IntervalSet()
+        lo, hi = points[:-1], points[1:]
+        keep = op(self.contains_points(lo), other.contains_points(lo))
+        return IntervalSet(lo[keep], hi[keep])
+
+    def union(self, other: "IntervalSet") -> "IntervalSet":
+        return IntervalSet(np.concatenate([self.starts, other.starts]), np.concatenate([self.ends, other.ends]))
+
+    def subtract(self, other: "IntervalSet") -> "IntervalSet":
+        if len(other) == 0:
+            return self
+        return self._combine(other, lambda a, b: a & ~b)
+
+    def intersect(self, other: "IntervalSet") -> "IntervalSet":
+        # every interval here overlaps a run [lo, hi) of the other's; one piece per overlapping pair,
+        # already in order and apart, since both sides are
+        lo = np.searchsorted(other.ends, self.starts, side="right")
+        hi = np.maximum(np.searchsorted(other.starts, self.ends, side="left"), lo)
+        counts = hi - lo
+        mine = np.repeat(np.arange(len(self)), counts)
+        theirs = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(lo, counts)
+        return IntervalSet._normalized(np.maximum(self.starts[mine], other.starts[theirs]),
+                                       np.minimum(self.ends[mine], other.ends[theirs]))
+
+    def _as_lists(self) -> Tuple[list, list]:
+        # point lookups bisect plain lists: numpy costs more per call than it saves on one value
+        if self._lists is None:
+            self._lists = (self.starts.tolist(), self.ends.tolist())
+        return self._lists
+
+    def _lengths_tree(self) -> List[list]:
+        if self._longest is None:
+            open_ended = (self.starts == OPEN_START) | (self.ends == OPEN_END)
+            self._longest = lengths_tree(np.where(open_ended, OPEN_END, self.ends - self.starts))
+        return self._longest
+
+    def first_at_least(self, i: int, duration: int) -> Optional[int]:
+        """Index of the first interval from `i` on lasting at least `duration`, in O(log n)."""
+        return first_at_least(self._lengths_tree(), i, len(self), duration)
+
+    def covers(self, start: int, end: int) -> bool:
+        starts, ends = self._as_lists()
+        i = bisect.bisect_right(starts, start) - 1
+        return i >= 0 and ends[i] >= end
+
+    def first_fit(self, not_before: int, duration: int) -> Optional[int]:
+        """Earliest start >= not_before of a `duration` long stretch inside the set, None if there is none.
+
+        A bisect for the interval holding (or following) not_before, then a
+        descent of the length tree for the first later one long enough.
+        """
+        starts, ends = self._as_lists()
+        i = bisect.bisect_right(ends, not_before)
+        if i == len(ends):
+            return None
+        start = max(starts[i], not_before)
+        if ends[i] - duration >= start:
+            return start
+        # later intervals start after not_before, so only their own length counts
+        j = self.first_at_least(i + 1, duration)
+        return None if j is None else starts[j]
+
+    def next_fit(self, not_before: datetime.datetime, duration: datetime.timedelta) -> Optional[datetime.datetime]:
+        # first_fit in datetimes
+        t = epoch_micros(not_before, OPEN_START)
+        start = self.first_fit(t, duration // MICROSECOND)
+        if start is None:
+            return None
+        return not_before if start == t else from_epoch_micros(start)
+
+    def __repr__(self):
+        return f"IntervalSet({list(self)})"
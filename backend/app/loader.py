@@ -0,0 +1,87 @@
+import datetime
+import os
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.planner as planner
+from app.berth_calendar import MAINTENANCE_DURATION, BerthCalendar
+from app.models import Berth, MaintenanceLog, Vessel, Weather
+
+LOAD_BATCH = int(os.getenv("LOAD_BATCH", "5000"))  # rows per cursor fetch when loading planner inputs
+# weather kept past the last eta: queueing can push a call well beyond its arrival
+WEATHER_HORIZON_PAD = datetime.timedelta(hours=float(os.getenv("WEATHER_HORIZON_PAD_HOURS", "72")))
+
+# only the columns the planner reads, so no ORM entity is built per row
+VESSEL_COLUMNS = (Vessel.id, Vessel.actual_id, Vessel.name, Vessel.type, Vessel.loa_m, Vessel.beam_m,
+                  Vessel.draft_m, Vessel.eta, Vessel.ebt, Vessel.dwt_t)
+BERTH_COLUMNS = (Berth.id, Berth.name, Berth.depth_m, Berth.max_loa, Berth.max_beam, Berth.max_draft,
+                 Berth.max_dwt, Berth.allowed_types, Berth.last_maintenance)
+WEATHER_COLUMNS = (Weather.id, Weather.timestamp, Weather.condition, Weather.temperature_c,
+                   Weather.wind_speed_knots, Weather.tide_height_m)
+
+
+async def stream_rows(db: AsyncSession, query, build) -> list:
+    result = await db.stream(query.execution_options(yield_per=LOAD_BATCH))
+    loaded = []
+    async for rows in result.partitions():
+        loaded.extend(build(row) for row in rows)
+    return loaded
+
+
+async def load_vessels(db: AsyncSession, actual_id: int) -> List[planner.Vessel]:
+    query = select(*VESSEL_COLUMNS).where(Vessel.actual_id == actual_id)
+    return await stream_rows(db, query, planner.vessel_from_row)
+
+
+async def load_berths(db: AsyncSession) -> List[planner.Berth]:
+    return await stream_rows(db, select(*BERTH_COLUMNS), planner.berth_from_row)
+
+
+def planning_horizon(vessels: List[planner.Vessel],
+                     now: Optional[datetime.datetime] = None) -> Tuple[datetime.datetime, datetime.datetime]:
+    if now is None:
+        now = datetime.datetime.now()
+    # nothing is placed before max(eta, now)
+    etas = [v.eta for v in vessels if v.eta is not None]
+    if not etas:
+        return now, now + WEATHER_HORIZON_PAD
+    return max(min(etas), now), max(max(etas), now) + WEATHER_HORIZON_PAD
+
+
+async def load_weather(db: AsyncSession, since: datetime.datetime, until: datetime.datetime) -> List[planner.Weather]:
+    """Readings in (since, until], led by the one in effect at `since`."""
+    current = (await db.execute(
+        select(*WEATHER_COLUMNS).where(Weather.timestamp <= since).order_by(Weather.timestamp.desc()).limit(1)
+    )).first()
+    query = (
+        select(*WEATHER_COLUMNS)
+        .where(Weather.timestamp > since, Weather.timestamp <= until)
+        .order_by(Weather.timestamp)
+    )
+    weather = await stream_rows(db, query, planner.weather_from_row)
+    return ([planner.weather_from_row(current)] if current else []) + weather
+
+
+async def load_berth_calendar(db: AsyncSession, since: datetime.datetime, until: datetime.datetime,
+                              keys: Optional[Dict[str, Hashable]] = None) -> BerthCalendar:
+    """Maintenance overlapping [since, until], keyed by berth name or by `keys[name]` (e.g. the planner's ids)."""
+    query = (
+        select(MaintenanceLog.berth_name, MaintenanceLog.performed_at)
+        .where(MaintenanceLog.performed_at > since - MAINTENANCE_DURATION, MaintenanceLog.performed_at <= until)
+    )
+    logs = await stream_rows(db, query, tuple)
+    calendar = BerthCalendar()
+    if keys is None:
+        calendar.add_maintenance(logs)
+    else:
+        calendar.add_maintenance((keys[name], performed_at) for name, performed_at in logs if name in keys)
+    return calendar
+
+
+async def load_planner_inputs(db: AsyncSession, actual_id: int, now: Optional[datetime.datetime] = None):
+    vessels = await load_vessels(db, actual_id)
+    berths = await load_berths(db)
+    weather = await load_weather(db, *planning_horizon(vessels, now))
+    return berths, vessels, weather
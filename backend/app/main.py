@@ -1,16 +1,30 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from app.models import Base
 from app.db import engine
 from app.routers import vessels
 from app.routers import metrics
 from app.routers import plan
+from app.routers import stream
+from app.routers import export
+from app.routers import imports
+from app.routers import training
+from app.events import start_listener, stop_listener
 from fastapi.routing import APIRouter
 from app.middleware.auth import APIKeyRoute
 from app.routers import auth
 from app.routers import mockBerthPlan
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_listener()
+    yield
+    await stop_listener()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],        
@@ -23,6 +37,10 @@ app.include_router(vessels.router)
 app.include_router(metrics.router)
 app.include_router(plan.router)
 app.include_router(auth.router)
+app.include_router(stream.router)
+app.include_router(export.router)
+app.include_router(imports.router)
+app.include_router(training.router)
 app.router.route_class = APIKeyRoute
 
 
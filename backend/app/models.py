@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Sequence
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Sequence, Index, Text
 from app.db import Base
 from datetime import datetime
 from app.db import Base
 
+# ids of live stream events, shared by every API process
+stream_event_id_seq = Sequence("stream_event_id_seq", metadata=Base.metadata)
+
 class Weather(Base):
     __tablename__ = "weather"
     id = Column(Integer, primary_key=True)
@@ -14,8 +17,15 @@ class Weather(Base):
 
 class Vessel(Base):
     __tablename__ = "vessels"
+    __table_args__ = (
+        # keyset pagination of one batch by (eta, id)
+        Index("ix_vessels_actual_eta_id", "actual_id", "eta", "id"),
+        # a feed's own vessel ids only mean something within the batch it was imported as
+        Index("ix_vessels_actual_source_id", "actual_id", "source_id", unique=True),
+    )
     id = Column(Integer, primary_key=True)
-    actual_id = Column(Integer, Sequence("vessel_id_seq"), nullable=False)
+    actual_id = Column(Integer, Sequence("vessel_id_seq"), nullable=False, index=True)
+    source_id = Column(Integer) # id in the imported csv, None for vessels created through the API
     name = Column(String(64))
     type = Column(String(16))
     loa_m = Column(Float)
@@ -39,6 +49,9 @@ class Berth(Base):
 
 class PredictionScheduleEntry(Base):
     __tablename__ = "vessel_schedule_entries"
+    __table_args__ = (
+        Index("ix_vessel_schedule_entries_actual_berth_start", "actual_id", "berth_id", "start_time"),
+    )
     id = Column(Integer, primary_key=True)
     actual_id = Column(Integer, ForeignKey("vessels.actual_id"))
     berth_id = Column(Integer, ForeignKey("berths.id"))
@@ -49,6 +62,18 @@ class PredictionScheduleEntry(Base):
     actual_end_time = Column(DateTime)
     actual_arrival_time = Column(DateTime)
 
+class PlanVersion(Base):
+    __tablename__ = "plan_versions"
+    name = Column(String(16), primary_key=True)  # "vessels", "schedule", or "plan_stream"
+    actual_id = Column(Integer, nullable=False)  # latest batch (for plan_stream the last update's sequence number)
+
+class StreamEvent(Base):
+    # NOTIFY only carries the id, every API process reads the event itself from here
+    __tablename__ = "stream_events"
+    id = Column(Integer, stream_event_id_seq, primary_key=True)
+    channel = Column(String(16), nullable=False)
+    data = Column(Text, nullable=False)
+
 class HumanFix(Base):
     __tablename__ = "human_fixes"
     id = Column(Integer, primary_key=True)
@@ -62,7 +87,7 @@ class PredictionLog(Base):
     __tablename__ = "prediction_logs"
     id = Column(Integer, primary_key=True)
     actual_id = Column(Integer, ForeignKey("vessels.actual_id"))
-    timestamp = Column(DateTime, default=datetime.now())
+    timestamp = Column(DateTime, default=datetime.now(), index=True)
     error = Column(Float, nullable=False)
     
 class User(Base):
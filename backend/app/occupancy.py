@@ -0,0 +1,147 @@
+import bisect
+import datetime
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.intervals import OPEN_END, epoch_micros, first_at_least, lengths_tree
+
+Booking = Tuple[datetime.datetime, datetime.datetime, object]
+# blocks stepped over one by one before the gap tree is (re)built and searched
+LINEAR_STEPS = 8
+
+
+class BerthTimeline:
+    """Bookings on one berth, kept as sorted, disjoint busy blocks.
+
+    Overlapping or back-to-back bookings (e.g. a queue, or a stored human plan
+    with conflicts) are merged into a single block, so `starts` and `ends` are
+    both sorted and a free-slot query jumps over a whole queue in one step.
+    Gaps between blocks too short for a call (left by tide or maintenance)
+    are skipped through a tree of gap lengths rather than one at a time.
+    """
+
+    def __init__(self):
+        self.starts: List[datetime.datetime] = []
+        self.ends: List[datetime.datetime] = []
+        self.members: List[List[Booking]] = []
+        # the block bounds again in epoch microseconds, for the gap tree
+        self._start_us: List[int] = []
+        self._end_us: List[int] = []
+        self._gaps: Optional[List[list]] = None
+
+    def __len__(self):
+        return sum(len(block) for block in self.members)
+
+    def __iter__(self) -> Iterator[Booking]:
+        for block in self.members:
+            yield from block
+
+    def _span(self, start: datetime.datetime, end: datetime.datetime) -> Tuple[int, int]:
+        # blocks [lo, hi) intersect the half-open interval [start, end)
+        lo = bisect.bisect_right(self.ends, start)
+        hi = bisect.bisect_left(self.starts, end)
+        return lo, max(lo, hi)
+
+    def overlaps(self, start: datetime.datetime, end: datetime.datetime) -> bool:
+        lo, hi = self._span(start, end)
+        return lo < hi
+
+    def bookings_between(self, start: datetime.datetime, end: datetime.datetime) -> List[Booking]:
+        lo, hi = self._span(start, end)
+        return [b for block in self.members[lo:hi] for b in block if b[0] < end and b[1] > start]
+
+    def _gap_tree(self) -> List[list]:
+        # gap after each block; the last one never closes
+        if self._gaps is None:
+            gaps = np.array(self._start_us[1:] + [OPEN_END], dtype=np.int64)
+            gaps[:-1] -= np.array(self._end_us[:-1], dtype=np.int64)
+            self._gaps = lengths_tree(gaps)
+        return self._gaps
+
+    def earliest_free(self, not_before: datetime.datetime, duration: datetime.timedelta) -> datetime.datetime:
+        t = not_before
+        i = bisect.bisect_right(self.ends, t)
+        for _ in range(LINEAR_STEPS):
+            if i == len(self.starts) or self.starts[i] >= t + duration:
+                return t
+            t = max(t, self.ends[i])
+            i += 1
+        if i == len(self.starts) or self.starts[i] >= t + duration:
+            return t
+        # block i is in the way too: free from the end of the first block after it with a long enough gap
+        j = first_at_least(self._gap_tree(), i, len(self.starts), duration // datetime.timedelta(microseconds=1))
+        return self.ends[j]
+
+    def add(self, start: datetime.datetime, end: datetime.datetime, item: object):
+        # also pick up blocks that merely touch the new booking
+        lo = bisect.bisect_left(self.ends, start)
+        hi = max(lo, bisect.bisect_right(self.starts, end))
+        if lo < hi:
+            block = self.members[lo]
+            for members in self.members[lo + 1:hi]:
+                block.extend(members)
+            block.append((start, end, item))
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        else:
+            block = [(start, end, item)]
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+        self.members[lo:hi] = [block]
+        self._start_us[lo:hi] = [epoch_micros(start, 0)]
+        self._end_us[lo:hi] = [epoch_micros(end, 0)]
+        self._gaps = None
+
+    def remove(self, start: datetime.datetime, item: object) -> bool:
+        i = bisect.bisect_right(self.starts, start) - 1
+        if i < 0 or not any(b[2] is item for b in self.members[i]):
+            return False
+        rest = sorted((b for b in self.members[i] if b[2] is not item), key=lambda b: b[0])
+        starts, ends, members = [], [], []
+        for b in rest:
+            if members and b[0] <= ends[-1]:
+                ends[-1] = max(ends[-1], b[1])
+                members[-1].append(b)
+            else:
+                starts.append(b[0])
+                ends.append(b[1])
+                members.append([b])
+        self.starts[i:i + 1] = starts
+        self.ends[i:i + 1] = ends
+        self.members[i:i + 1] = members
+        self._start_us[i:i + 1] = [epoch_micros(t, 0) for t in starts]
+        self._end_us[i:i + 1] = [epoch_micros(t, 0) for t in ends]
+        self._gaps = None
+        return True
+
+
+class OccupancyIndex:
+    """Per-berth timelines keyed by berth id."""
+
+    def __init__(self):
+        self.timelines: Dict[Hashable, BerthTimeline] = {}
+
+    def timeline(self, berth_id: Hashable) -> BerthTimeline:
+        timeline = self.timelines.get(berth_id)
+        if timeline is None:
+            timeline = self.timelines[berth_id] = BerthTimeline()
+        return timeline
+
+    def add(self, berth_id: Hashable, start: datetime.datetime, end: datetime.datetime, item: object):
+        self.timeline(berth_id).add(start, end, item)
+
+    def remove(self, berth_id: Hashable, start: datetime.datetime, item: object) -> bool:
+        timeline = self.timelines.get(berth_id)
+        return timeline is not None and timeline.remove(start, item)
+
+    def overlaps(self, berth_id: Hashable, start: datetime.datetime, end: datetime.datetime) -> bool:
+        timeline = self.timelines.get(berth_id)
+        return timeline is not None and timeline.overlaps(start, end)
+
+    def earliest_free(self, berth_id: Hashable, not_before: datetime.datetime,
+                      duration: datetime.timedelta) -> datetime.datetime:
+        timeline = self.timelines.get(berth_id)
+        if timeline is None:
+            return not_before
+        return timeline.earliest_free(not_before, duration)
@@ -0,0 +1,81 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "128"))  # cached plan responses
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "0"))  # seconds, 0 keeps entries until evicted
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+class PlanCache:
+    """LRU of serialized plan responses keyed by (actual_id, strategy, ...)."""
+
+    def __init__(self, max_size: int = PLAN_CACHE_SIZE, ttl: float = PLAN_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()  # key -> (expires_at, etag, body)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            expires_at, etag, body = hit
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return etag, body
+
+    def put(self, key: Hashable, body: bytes, generation: Optional[int] = None) -> Tuple[str, bytes]:
+        # pass the generation read before computing body, so a plan built while
+        # an invalidation ran is served once but never cached
+        etag = make_etag(body)
+        with self._lock:
+            if self.max_size <= 0 or (generation is not None and generation != self.generation):
+                return etag, body
+            expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+            self._entries[key] = (expires_at, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return etag, body
+
+    def invalidate(self, actual_id: Optional[int] = None):
+        # keys start with actual_id; None drops everything
+        with self._lock:
+            self.generation += 1
+            if actual_id is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == actual_id]:
+                    del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"PlanCache(max_size={self.max_size}, ttl={self.ttl}, entries={len(self)})"
+
+
+plan_cache = PlanCache()
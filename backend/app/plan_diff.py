@@ -0,0 +1,64 @@
+import os
+from typing import Dict, Iterable, Optional
+
+PLAN_FIELDS = ("berth_id", "start_time", "end_time")
+PLAN_SNAPSHOT_EVERY = int(os.getenv("PLAN_SNAPSHOT_EVERY", "20"))  # plan updates between full snapshots
+PLAN_SEQUENCE = "plan_stream"  # the plan_versions row numbering plan updates
+
+
+def plan_row(vessel_id: int, berth_id: int, start_time, end_time) -> dict:
+    return {
+        "vessel_id": vessel_id,
+        "berth_id": berth_id,
+        "start_time": start_time.isoformat() if start_time else None,
+        "end_time": end_time.isoformat() if end_time else None,
+    }
+
+
+def index_rows(rows: Iterable[dict]) -> Dict[int, dict]:
+    # a plan has at most one entry per vessel, so vessel_id identifies an entry across versions
+    return {row["vessel_id"]: row for row in rows}
+
+
+def diff_plans(old: Dict[int, dict], new: Dict[int, dict]) -> dict:
+    added = [row for vessel_id, row in new.items() if vessel_id not in old]
+    removed = [vessel_id for vessel_id in old if vessel_id not in new]
+    changed = []
+    for vessel_id, row in new.items():
+        before = old.get(vessel_id)
+        if before is None:
+            continue
+        fields = {f: row[f] for f in PLAN_FIELDS if row[f] != before[f]}
+        if fields:
+            changed.append({"vessel_id": vessel_id, **fields})
+    return {"added": added, "changed": changed, "removed": removed}
+
+
+class PlanDiffer:
+    """Turns plan updates into stream messages, a full snapshot every `snapshot_every` updates.
+
+    Updates are numbered by a sequence persisted in plan_versions, so every
+    API process agrees on which update is a snapshot.
+    """
+
+    def __init__(self, snapshot_every: int = PLAN_SNAPSHOT_EVERY):
+        self.snapshot_every = max(snapshot_every, 1)
+
+    def snapshot_due(self, sequence: int) -> bool:
+        # sequences start at 1, which is a snapshot
+        return (sequence - 1) % self.snapshot_every == 0
+
+    def snapshot(self, sequence: int, actual_id: int, rows: Iterable[dict]) -> dict:
+        return {"type": "snapshot", "sequence": sequence, "actual_id": actual_id, "entries": list(rows)}
+
+    def delta(self, sequence: int, actual_id: int, base_actual_id: Optional[int],
+              old: Dict[int, dict], new: Dict[int, dict]) -> dict:
+        # clients apply this to the plan they hold for base_actual_id
+        return {"type": "delta", "sequence": sequence, "actual_id": actual_id, "base_actual_id": base_actual_id,
+                **diff_plans(old, new)}
+
+    def __repr__(self):
+        return f"PlanDiffer(snapshot_every={self.snapshot_every})"
+
+
+plan_differ = PlanDiffer()
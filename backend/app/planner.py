@@ -1,26 +1,66 @@
 import datetime
-from typing import List, Optional, Tuple
+import math
+import random
+import time
+from typing import Dict, List, Optional, Tuple, TypeVar, Union
 import numpy as np
 import pandas as pd
 from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error
+from sqlalchemy import select
 from app.db import SessionLocal
 from app.models import PredictionLog, PredictionScheduleEntry
+from app.occupancy import OccupancyIndex
+from app.schedule_frame import ScheduleFrame
+from app.tide_windows import TideWindows
+from app.berth_calendar import BerthAvailability, BerthCalendar
+from app.weather_index import WeatherTimeline
+from app.compatibility import LIMITS, CompatibilityMatrix, parse_allowed_types, within_limit
+from app.crud import latest_version_queries
+from app.features import MIN_TRAINING_ROWS, BerthTimeModel, load_maintenance, load_training_set, predict_berth_times
 
 
-class Berth:
+class Record:
+    """Slotted and read-only; planners share these between schedules, use replace() for a changed copy."""
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only, use planner.replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    # pickling (scenarios run in worker processes) can't go through __setattr__
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            object.__setattr__(self, name, value)
+
+R = TypeVar("R", bound=Record)
+
+def replace(record: R, **changes) -> R:
+    unknown = set(changes) - set(record.__slots__)
+    if unknown:
+        raise TypeError(f"{type(record).__name__} has no field(s) {', '.join(sorted(unknown))}")
+    new = object.__new__(type(record))
+    new.__setstate__(tuple(changes.get(name, getattr(record, name)) for name in record.__slots__))
+    return new
+
+class Berth(Record):
+    __slots__ = ("id", "name", "depth_m", "max_loa", "max_beam", "max_draft", "max_dwt", "allowed_types", "last_maintenance")
+
     def __init__(self, id: str, name: str, depth_m: float, max_loa: float, max_beam: float, 
                  max_draft: float, max_dwt: float, allowed_types: List[str], last_maintenance: Optional[datetime.datetime]):
-        self.id = id
-        self.name = name
-        self.depth_m = depth_m
-        self.max_loa = max_loa
-        self.max_beam = max_beam
-        self.max_draft = max_draft
-        self.max_dwt = max_dwt
-        self.allowed_types = allowed_types
-        self.last_maintenance = last_maintenance
+        super().__init__(id=id, name=name, depth_m=depth_m, max_loa=max_loa, max_beam=max_beam, max_draft=max_draft,
+                         max_dwt=max_dwt, allowed_types=parse_allowed_types(allowed_types),
+                         last_maintenance=last_maintenance)
 
     def __str__(self):
         return f"Berth: {self.name}, Depth: {self.depth_m}m, Max LOA: {self.max_loa}m, Max Beam: {self.max_beam}m, Max Draft: {self.max_draft}m, Max DWT: {self.max_dwt}t, Allowed Types: {', '.join(self.allowed_types)}, Last Maintenance: {self.last_maintenance}"
@@ -29,24 +69,17 @@ class Berth:
         return f"Berth(id={self.id}, name='{self.name}', depth_m={self.depth_m}, max_loa={self.max_loa}, max_beam={self.max_beam}, max_draft={self.max_draft}, max_dwt={self.max_dwt}, allowed_types={self.allowed_types}, last_maintenance={self.last_maintenance})"
 
     def is_suitable_for_vessel(self, vessel: 'Vessel') -> bool:
-        return (self.max_loa >= vessel.loa_m and
-                self.max_beam >= vessel.beam_m and
-                self.max_draft >= vessel.draft_m and
-                vessel.type in self.allowed_types)
+        # same rule as CompatibilityMatrix: a limit or measure that is None doesn't rule the berth out
+        return (all(within_limit(getattr(self, limit), getattr(vessel, measure)) for limit, measure in LIMITS) and
+                (vessel.type or "").upper() in self.allowed_types)
+
+class Vessel(Record):
+    __slots__ = ("id", "name", "type", "loa_m", "beam_m", "draft_m", "eta", "est_berth_time", "actual_id", "dwt_t")
 
-class Vessel:
     def __init__(self, id: int, actual_id: int, name: str, type: str, loa_m: float, beam_m: float,
                  draft_m: float, eta: datetime.datetime, est_berth_time: datetime.timedelta, dwt: float):
-        self.id = id
-        self.name = name
-        self.type = type
-        self.loa_m = loa_m
-        self.beam_m = beam_m
-        self.draft_m = draft_m
-        self.eta = eta
-        self.est_berth_time = est_berth_time
-        self.actual_id = actual_id
-        self.dwt_t = dwt
+        super().__init__(id=id, name=name, type=type, loa_m=loa_m, beam_m=beam_m, draft_m=draft_m, eta=eta,
+                         est_berth_time=est_berth_time, actual_id=actual_id, dwt_t=dwt)
 
     def __str__(self):
         return f"Vessel: {self.name}, Type: {self.type}, LOA: {self.loa_m}m, Beam: {self.beam_m}m, Draft: {self.draft_m}m, ETA: {self.eta}, Estimated Berth Time: {self.est_berth_time}"
@@ -54,29 +87,33 @@ class Vessel:
     def __repr__(self):
         return f"Vessel(id={self.id}, name='{self.name}', type='{self.type}', loa_m={self.loa_m}, beam_m={self.beam_m}, draft_m={self.draft_m}, eta={self.eta}, est_berth_time={self.est_berth_time}, actual_id={self.actual_id}, dwt_t={self.dwt_t})"
 
-class VesselScheduleEntry:
+class VesselScheduleEntry(Record):
+    __slots__ = ("vessel", "start_time", "end_time", "berth")
 
     def __init__(self, vessel: Vessel, start_time: datetime.datetime, end_time: datetime.datetime, berth: Berth):
-        self.vessel = vessel
-        self.start_time = start_time
-        self.end_time = end_time
-        self.berth = berth
-        
+        super().__init__(vessel=vessel, start_time=start_time, end_time=end_time, berth=berth)
+
     def __str__(self):
         return f"Vessel: {self.vessel.name}, Start Time: {self.start_time}, End Time: {self.end_time}, Berth: {self.berth.name}"
 
     def __repr__(self):
         return f"VesselScheduleEntry(vessel={self.vessel}, start_time={self.start_time}, end_time={self.end_time}, berth={self.berth})"
 
-class Weather:
+    def to_dict(self) -> dict:
+        return {
+            "vessel_id": self.vessel.id,
+            "berth_id": self.berth.id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+        }
+
+class Weather(Record):
+    __slots__ = ("id", "timestamp", "condition", "temperature_c", "wind_speed_knots", "tide_height_m")
+
     def __init__(self, id: int, timestamp: datetime.datetime, condition: str, temperature_c: float,
                  wind_speed_knots: float, tide_height_m: float):
-        self.id = id
-        self.timestamp = timestamp
-        self.condition = condition
-        self.temperature_c = temperature_c
-        self.wind_speed_knots = wind_speed_knots
-        self.tide_height_m = tide_height_m
+        super().__init__(id=id, timestamp=timestamp, condition=condition, temperature_c=temperature_c,
+                         wind_speed_knots=wind_speed_knots, tide_height_m=tide_height_m)
 
     def __str__(self):
         return f"Weather: {self.condition}, Temperature: {self.temperature_c}°C, Wind Speed: {self.wind_speed_knots} knots, Tide Height: {self.tide_height_m}m"
@@ -84,37 +121,318 @@ class Weather:
     def __repr__(self):
         return f"Weather(id={self.id}, timestamp={self.timestamp}, condition='{self.condition}', temperature_c={self.temperature_c}, wind_speed_knots={self.wind_speed_knots}, tide_height_m={self.tide_height_m})"
 
+def placeholder_vessel(vessel_id: int, actual_id: Optional[int], start_time, end_time) -> Vessel:
+    # a stored entry whose vessel isn't in the planner's batch
+    return Vessel(id=vessel_id, actual_id=actual_id, name="", type="", loa_m=0, beam_m=0, draft_m=0,
+                  eta=start_time, est_berth_time=end_time - start_time, dwt=0)
+
+def placeholder_berth(berth_id: int) -> Berth:
+    return Berth(id=berth_id, name="", depth_m=0, max_loa=0, max_beam=0, max_draft=0, max_dwt=0,
+                 allowed_types=[], last_maintenance=None)
+
+class BerthTimes:
+    """Predicted berth time per vessel/berth pair (predict_berth_times output), looked up by ids."""
+
+    def __init__(self, minutes: np.ndarray, vessels: List[Vessel], berths: List[Berth]):
+        self.minutes = minutes
+        self.rows = {v.id: i for i, v in enumerate(vessels)}
+        self.columns = {b.id: j for j, b in enumerate(berths)}
+
+    def get(self, vessel: Vessel, berth: Berth) -> datetime.timedelta:
+        # vessels or berths the model wasn't asked about, and non-positive predictions, keep the vessel's own estimate
+        i, j = self.rows.get(vessel.id), self.columns.get(berth.id)
+        if i is None or j is None or not self.minutes[i, j] > 0:
+            return vessel.est_berth_time
+        return datetime.timedelta(minutes=float(self.minutes[i, j]))
+
+    def __repr__(self):
+        return f"BerthTimes(vessels={len(self.rows)}, berths={len(self.columns)})"
+
 class Schedule:
-    def __init__(self):
+    def __init__(self, tide: Optional[TideWindows] = None, calendar: Optional[BerthCalendar] = None,
+                 berth_times: Optional[BerthTimes] = None, availability: Optional[BerthAvailability] = None):
+        # a call only goes where the berth is open and the tide deep enough for its whole stay;
+        # schedules built from the same inputs can share one `availability` and its cached sets
+        self.availability = availability if availability is not None else BerthAvailability(tide, calendar)
+        # without predicted berth times every call takes the vessel's est_berth_time
+        self.berth_times = berth_times
         self.entries: List[VesselScheduleEntry] = []
+        self.occupancy = OccupancyIndex()
+        self.by_vessel: Dict[int, VesselScheduleEntry] = {}
+        # vessels place() found no berth, opening or tide for, reported with the plan
+        self.unplaced: Dict[int, Vessel] = {}
+        # ...and those the tide would take, just not within the readings (the queue ran past them)
+        self.beyond_tide: Dict[int, Vessel] = {}
+        # a schedule read as columns stays that way until something needs its entries
+        self._frame: Optional[ScheduleFrame] = None
+        self._source: Optional[Tuple[Dict[int, Vessel], Dict[int, Berth], Optional[int]]] = None
 
-    def add_entry(self, entry: VesselScheduleEntry):
+    @classmethod
+    def from_frame(cls, frame: ScheduleFrame, vessels: Dict[int, Vessel], berths: Dict[int, Berth],
+                   actual_id: Optional[int] = None, tide: Optional[TideWindows] = None,
+                   calendar: Optional[BerthCalendar] = None) -> "Schedule":
+        schedule = cls(tide, calendar)
+        schedule._frame = frame
+        schedule._source = (vessels, berths, actual_id)
+        return schedule
+
+    def _materialize(self):
+        if self._source is None:
+            return
+        vessels, berths, actual_id = self._source
+        self._source = None
+        frame = self._frame
+        for vessel_id, berth_id, start_time, end_time in zip(frame.vessel_id.tolist(), frame.berth_id.tolist(),
+                                                             frame.start.astype(object), frame.end.astype(object)):
+            vessel = vessels.get(vessel_id) or placeholder_vessel(vessel_id, actual_id, start_time, end_time)
+            berth = berths.get(berth_id) or placeholder_berth(berth_id)
+            self._add(VesselScheduleEntry(vessel, start_time, end_time, berth))
+
+    def frame(self) -> ScheduleFrame:
+        if self._frame is None:
+            self._frame = ScheduleFrame.from_entries(self.entries, list(self.unplaced), list(self.beyond_tide))
+        return self._frame
+
+    def __len__(self):
+        return len(self._frame) if self._source is not None else len(self.entries)
+
+    def _add(self, entry: VesselScheduleEntry):
         self.entries.append(entry)
+        self.by_vessel[entry.vessel.id] = entry
+        if entry.start_time is not None and entry.end_time is not None:
+            self.occupancy.add(entry.berth.id, entry.start_time, entry.end_time, entry)
+
+    def add_entry(self, entry: VesselScheduleEntry):
+        self._materialize()
+        self._frame = None
+        self.unplaced.pop(entry.vessel.id, None)
+        self.beyond_tide.pop(entry.vessel.id, None)
+        self._add(entry)
+
+    def remove_entry(self, entry: VesselScheduleEntry):
+        self._materialize()
+        self._frame = None
+        self.entries.remove(entry)
+        if self.by_vessel.get(entry.vessel.id) is entry:
+            del self.by_vessel[entry.vessel.id]
+        if entry.start_time is not None:
+            self.occupancy.remove(entry.berth.id, entry.start_time, entry)
+
+    def entry_for(self, vessel_id: int) -> Optional[VesselScheduleEntry]:
+        self._materialize()
+        return self.by_vessel.get(vessel_id)
+
+    def entries_on(self, berth_id: int, start: datetime.datetime, end: datetime.datetime) -> List[VesselScheduleEntry]:
+        self._materialize()
+        bookings = self.occupancy.timeline(berth_id).bookings_between(start, end)
+        return sorted((item for _, _, item in bookings), key=lambda e: e.start_time)
+
+    @property
+    def tide(self) -> Optional[TideWindows]:
+        return self.availability.tide
+
+    @property
+    def calendar(self) -> Optional[BerthCalendar]:
+        return self.availability.calendar
+
+    def berth_time(self, vessel: Vessel, berth: Berth) -> datetime.timedelta:
+        return vessel.est_berth_time if self.berth_times is None else self.berth_times.get(vessel, berth)
+
+    def earliest_start(self, berth: Berth, vessel: Vessel, not_before: datetime.datetime,
+                       before: Optional[datetime.datetime] = None) -> Optional[datetime.datetime]:
+        # None when the berth never reopens, or the tide never leaves enough water, for this vessel;
+        # also None as soon as the start is known not to come `before` the given time
+        self._materialize()
+        duration = self.berth_time(vessel, berth)
+        start = self.occupancy.earliest_free(berth.id, not_before, duration)
+        if before is not None and start >= before:
+            return None
+        # calendar and tide for this berth and draft, intersected once and cached
+        periods = self.availability.periods(berth.id, berth.depth_m, vessel.draft_m)
+        if periods is None:
+            return start
+        # bookings change with every placement and stay in the occupancy index; both
+        # only move forward, so each step jumps a busy block or a closed period
+        while True:
+            candidate = periods.next_fit(start, duration)
+            if candidate is None or candidate == start:
+                return candidate
+            if before is not None and candidate >= before:
+                return None
+            start = self.occupancy.earliest_free(berth.id, candidate, duration)
+
+    def beyond_tide_data(self, vessel: Vessel, berths: List[Berth]) -> bool:
+        # some berth needs the tide and has a long enough window in the readings, so the
+        # vessel could berth there on a later tide: more readings would place it
+        tide = self.tide
+        return tide is not None and any(
+            tide.needs_readings(berth.depth_m, vessel.draft_m)
+            and tide.ever_navigable(berth.depth_m, vessel.draft_m, self.berth_time(vessel, berth))
+            for berth in berths
+        )
+
+    def place(self, vessel: Vessel, berths: List[Berth], not_before: datetime.datetime) -> Optional[VesselScheduleEntry]:
+        # book the vessel on whichever of the given berths it would leave first: with predicted
+        # berth times a quicker berth can beat one that is free sooner
+        best: Optional[Tuple[datetime.datetime, datetime.datetime, Berth]] = None
+        for berth in berths:
+            duration = self.berth_time(vessel, berth)
+            # a berth that can't beat the best so far is dropped after its first busy block
+            start_time = self.earliest_start(berth, vessel, not_before, best and best[0] - duration)
+            if start_time is None:
+                continue
+            if best is None or start_time + duration < best[0]:
+                best = (start_time + duration, start_time, berth)
+                # every berth takes the same time without predictions, so no start beats not_before
+                if start_time == not_before and self.berth_times is None:
+                    break
+        if best is None:
+            self._materialize()
+            self._frame = None
+            if self.beyond_tide_data(vessel, berths):
+                self.beyond_tide[vessel.id] = vessel
+            else:
+                self.unplaced[vessel.id] = vessel
+            return None
+        end_time, start_time, berth = best
+        entry = VesselScheduleEntry(vessel, start_time, end_time, berth)
+        self.add_entry(entry)
+        return entry
 
     def get_schedule(self) -> List[VesselScheduleEntry]:
+        self._materialize()
         return self.entries
 
     def __str__(self):
-        return "\n".join(str(entry) for entry in self.entries)
+        return "\n".join(str(entry) for entry in self.get_schedule())
 
     def __repr__(self):
-        return f"Schedule(entries={self.entries})"
+        return f"Schedule(entries={self.get_schedule()})"
 
-def schedule_fcfs(berths: List[Berth], vessels: List[Vessel], weather: Weather) -> Schedule:
-    schedule = Schedule()
+STRATEGIES = ("stored", "fcfs", "optimized")
+
+def tide_windows(weather: Optional[WeatherTimeline]) -> Optional[TideWindows]:
+    return TideWindows(weather) if weather is not None and len(weather) else None
+
+def schedule_in_order(vessels: List[Vessel], compatibility: CompatibilityMatrix, now: datetime.datetime,
+                      availability: Optional[BerthAvailability] = None,
+                      berth_times: Optional[BerthTimes] = None) -> Schedule:
+    schedule = Schedule(berth_times=berth_times, availability=availability)
     for vessel in vessels:
-        for berth in berths:
-            if berth.is_suitable_for_vessel(vessel):
-                # check if berth available at time
-                for entry in schedule.get_schedule():
-                    if berth.id == entry.vessel.id and not (entry.end_time < vessel.eta or entry.start_time > vessel.eta + vessel.est_berth_time):
-                        break
-                start_time = max(vessel.eta, datetime.datetime.now())
-                end_time = start_time + vessel.est_berth_time
-                schedule.add_entry(VesselScheduleEntry(vessel, start_time, end_time, berth))
-                break
+        schedule.place(vessel, compatibility.suitable_berths(vessel), max(vessel.eta, now))
     return schedule
 
+# seconds of waiting one unplaced vessel costs a candidate the annealer might move to
+UNPLACED_PENALTY = 30 * 24 * 3600
+
+def plan_cost(schedule: Schedule, now: datetime.datetime) -> Tuple[int, float]:
+    # compared as a tuple, so dropping a vessel never pays for itself in waiting time
+    return len(schedule.unplaced) + len(schedule.beyond_tide), total_wait(schedule, now).total_seconds()
+
+def annealing_energy(cost: Tuple[int, float]) -> float:
+    unplaced, wait = cost
+    return unplaced * UNPLACED_PENALTY + wait
+
+def total_wait(schedule: Schedule, now: datetime.datetime) -> datetime.timedelta:
+    return sum((entry.start_time - max(entry.vessel.eta, now) for entry in schedule.get_schedule()),
+               datetime.timedelta())
+
+def schedule_fcfs(berths: List[Berth], vessels: List[Vessel], weather: Optional[WeatherTimeline],
+                  now: Optional[datetime.datetime] = None,
+                  compatibility: Optional[CompatibilityMatrix] = None,
+                  calendar: Optional[BerthCalendar] = None,
+                  berth_times: Optional[BerthTimes] = None) -> Schedule:
+    if now is None:
+        now = datetime.datetime.now()
+    if compatibility is None:
+        compatibility = CompatibilityMatrix(berths, vessels)
+    return schedule_in_order(sorted(vessels, key=lambda v: v.eta), compatibility, now,
+                             BerthAvailability(tide_windows(weather), calendar), berth_times)
+
+# simulated annealing over the service order, starting from FCFS; every
+# candidate order is decoded with the same earliest-free-berth rule, so berth
+# limits and ETAs always hold and only total waiting time is traded off, never
+# a vessel left unplaced
+def schedule_optimized(berths: List[Berth], vessels: List[Vessel], weather: Optional[WeatherTimeline],
+                       now: Optional[datetime.datetime] = None,
+                       compatibility: Optional[CompatibilityMatrix] = None,
+                       time_budget: float = 1.0, seed: int = 0, window: int = 8,
+                       calendar: Optional[BerthCalendar] = None,
+                       berth_times: Optional[BerthTimes] = None) -> Schedule:
+    if now is None:
+        now = datetime.datetime.now()
+    if compatibility is None:
+        compatibility = CompatibilityMatrix(berths, vessels)
+    order = sorted(vessels, key=lambda v: v.eta)
+    availability = BerthAvailability(tide_windows(weather), calendar)
+    best = schedule_in_order(order, compatibility, now, availability, berth_times)
+    best_cost = current_cost = plan_cost(best, now)
+    if len(order) < 2:
+        return best
+    # vessels no berth takes stay unplaced in every order
+    floor = (sum(1 for v in order if not compatibility.suitable_berths(v)), 0)
+
+    rng = random.Random(seed)
+    mean_berth_time = sum(v.est_berth_time.total_seconds() for v in order) / len(order)
+    started = time.monotonic()
+    deadline = started + time_budget
+    while best_cost > floor:
+        clock = time.monotonic()
+        if clock >= deadline:
+            break
+        i = rng.randrange(len(order))
+        j = min(len(order) - 1, max(0, i + rng.randint(-window, window)))
+        if i == j:
+            continue
+        candidate = order[:]
+        candidate.insert(j, candidate.pop(i))
+        schedule = schedule_in_order(candidate, compatibility, now, availability, berth_times)
+        cost = plan_cost(schedule, now)
+        temperature = 0.1 * mean_berth_time * (deadline - clock) / time_budget
+        worse = annealing_energy(cost) - annealing_energy(current_cost)
+        if cost <= current_cost or (temperature > 0 and rng.random() < math.exp(-worse / temperature)):
+            order, current_cost = candidate, cost
+            if cost < best_cost:
+                best, best_cost = schedule, cost
+    return best
+
+def vessel_from_row(v) -> Vessel:
+    return Vessel(
+        id=v.id,
+        actual_id=v.actual_id,
+        name=v.name,
+        type=v.type,
+        loa_m=v.loa_m,
+        beam_m=v.beam_m,
+        draft_m=v.draft_m,
+        eta=v.eta,
+        est_berth_time=datetime.timedelta(minutes=v.ebt or 0),
+        dwt=v.dwt_t,
+    )
+
+def berth_from_row(b) -> Berth:
+    return Berth(
+        id=b.id,
+        name=b.name,
+        depth_m=b.depth_m,
+        max_loa=b.max_loa,
+        max_beam=b.max_beam,
+        max_draft=b.max_draft,
+        max_dwt=b.max_dwt,
+        allowed_types=b.allowed_types,
+        last_maintenance=b.last_maintenance,
+    )
+
+def weather_from_row(w) -> Weather:
+    return Weather(
+        id=w.id,
+        timestamp=w.timestamp,
+        condition=w.condition,
+        temperature_c=w.temperature_c,
+        wind_speed_knots=w.wind_speed_knots,
+        tide_height_m=w.tide_height_m,
+    )
+
 # linear regression model for improving berth allocation
 def train_model(data: pd.DataFrame) -> Tuple[float,LinearRegression]:
     X = data[['max_loa', 'max_beam', 'max_draft', 'max_dwt']]
@@ -127,52 +445,96 @@ def train_model(data: pd.DataFrame) -> Tuple[float,LinearRegression]:
     print(f"Model Mean Squared Error: {mse}")
     return (mse, model)
 
-def predict_berth_time(model: LinearRegression, berth: Berth, vessel: Vessel) -> float:
+def predict_berth_time(model: Union[LinearRegression, BerthTimeModel], berth: Berth, vessel: Vessel) -> float:
+    if isinstance(model, BerthTimeModel):
+        # for more than one pair use predict_berth_times, it is one predict call for all of them
+        return float(predict_berth_times(model, [vessel], [berth])[0, 0])
     features = np.array([[berth.max_loa, berth.max_beam, berth.max_draft, berth.max_dwt]])
     est_berth_time = model.predict(features)
     return est_berth_time[0]
 
+# plan changes that Model.replan repairs without rebuilding the whole schedule
+class VesselAdded:
+    def __init__(self, vessel: Vessel):
+        self.vessel = vessel
+
+class EtaChanged:
+    def __init__(self, vessel_id: int, eta: datetime.datetime):
+        self.vessel_id = vessel_id
+        self.eta = eta
+
+class BerthOffline:
+    def __init__(self, berth_id: int):
+        self.berth_id = berth_id
+
+class EntryFixed:
+    def __init__(self, vessel_id: int, berth_id: int, start_time: datetime.datetime, end_time: datetime.datetime):
+        self.vessel_id = vessel_id
+        self.berth_id = berth_id
+        self.start_time = start_time
+        self.end_time = end_time
+
+Delta = Union[VesselAdded, EtaChanged, BerthOffline, EntryFixed]
+# (old, new) pairs; old is None for an added entry, new is None for a dropped one
+Change = Tuple[Optional[VesselScheduleEntry], Optional[VesselScheduleEntry]]
+
 class Model:
-    def __init__(self, berths: List[Berth], vessels: List[Vessel], weather: Weather):
+    def __init__(self, berths: List[Berth], vessels: List[Vessel], weather: Optional[WeatherTimeline],
+                 actual_id: Optional[int] = None, calendar: Optional[BerthCalendar] = None):
         self.berths = berths
         self.vessels = vessels
         self.weather = weather
+        self.actual_id = actual_id
         self.model: Optional[LinearRegression] = None
+        # a Model lives for one plan request; the fitted berth time model outlives it
+        self.berth_time_model: Optional[BerthTimeModel] = berth_time_model
+        self.current: Optional[Schedule] = None
+        self.offline_berths = set()
+        # maintenance and outages per berth id
+        self.calendar = calendar if calendar is not None else BerthCalendar()
+        self.pinned = set()
+        self._compatibility: Optional[CompatibilityMatrix] = None
 
-    def schedule(self) -> Schedule:
+    def compatibility(self) -> CompatibilityMatrix:
+        if self._compatibility is None:
+            self._compatibility = CompatibilityMatrix(self.berths, self.vessels)
+        return self._compatibility
+
+    def schedule(self, strategy: str = "stored", time_budget: float = 1.0) -> Schedule:
+        if strategy == "fcfs":
+            schedule = schedule_fcfs(self.berths, self.vessels, self.weather, compatibility=self.compatibility(),
+                                     calendar=self.calendar, berth_times=self.predicted_berth_times())
+        elif strategy == "optimized":
+            schedule = schedule_optimized(self.berths, self.vessels, self.weather,
+                                          compatibility=self.compatibility(), time_budget=time_budget,
+                                          calendar=self.calendar, berth_times=self.predicted_berth_times())
+        elif strategy == "stored":
+            schedule = self.stored_schedule()
+        else:
+            raise ValueError(f"Unknown scheduling strategy: {strategy}")
+        self.current = schedule
+        return schedule
+
+    def stored_schedule(self) -> Schedule:
+        vessels = {v.id: v for v in self.vessels}
+        berths = {b.id: b for b in self.berths}
         # get schedule from the db
         db = SessionLocal()
         try:
-            latest_actual_id = db.query(PredictionScheduleEntry.actual_id).order_by(PredictionScheduleEntry.actual_id.desc()).first()
+            pointer, fallback = latest_version_queries("schedule")
+            latest_actual_id = db.execute(pointer).scalar()
+            if latest_actual_id is None:
+                latest_actual_id = db.execute(fallback).scalar()
             if latest_actual_id is None:
                 raise Exception("No vessels found")
-            schedule = Schedule()
-            for entry in db.query(PredictionScheduleEntry).filter(PredictionScheduleEntry.actual_id == latest_actual_id[0]).all():
-                vessel = Vessel(
-                    id=entry.vessel_id,
-                    actual_id=entry.actual_id,
-                    name="",
-                    type="",
-                    loa_m=0,
-                    beam_m=0,
-                    draft_m=0,
-                    eta=entry.start_time,
-                    est_berth_time=entry.end_time - entry.start_time,
-                    dwt=0
-                )
-                berth = Berth(
-                    id=entry.berth_id,
-                    name="",
-                    depth_m=0,
-                    max_loa=0,
-                    max_beam=0,
-                    max_draft=0,
-                    max_dwt=0,
-                    allowed_types=[],
-                    last_maintenance=None
-                )
-                schedule.add_entry(VesselScheduleEntry(vessel, entry.start_time, entry.end_time, berth))
-            return schedule
+            # four columns per entry, no ORM objects
+            rows = db.execute(
+                select(PredictionScheduleEntry.vessel_id, PredictionScheduleEntry.berth_id,
+                       PredictionScheduleEntry.start_time, PredictionScheduleEntry.end_time)
+                .where(PredictionScheduleEntry.actual_id == latest_actual_id)
+            ).all()
+            return Schedule.from_frame(ScheduleFrame.from_rows(rows), vessels, berths, latest_actual_id,
+                                       tide_windows(self.weather), self.calendar)
         finally:
             db.close()
 
@@ -197,24 +559,153 @@ class Model:
         #             break
         # return schedule
 
+    def candidate_berths(self, vessel: Vessel) -> List[Berth]:
+        return [b for b in self.berths if b.id not in self.offline_berths and b.is_suitable_for_vessel(vessel)]
+
+    def _find_vessel(self, vessel_id: int) -> Optional[Vessel]:
+        entry = self.current.entry_for(vessel_id)
+        if entry is not None:
+            return entry.vessel
+        return next((v for v in self.vessels if v.id == vessel_id), None)
+
+    def _compact(self, berth_id: int, after: datetime.datetime, now: datetime.datetime, changes: List[Change]):
+        # pull waiting vessels on this berth forward into the slot that was freed
+        for old in self.current.entries_on(berth_id, after, datetime.datetime.max):
+            not_before = max(old.vessel.eta, now)
+            if old.start_time <= not_before or old.vessel.id in self.pinned:
+                continue
+            self.current.remove_entry(old)
+            new = self.current.place(old.vessel, [old.berth], not_before)
+            if new is None or new.start_time != old.start_time:
+                changes.append((old, new))
+
+    def _reseat(self, displaced: List[VesselScheduleEntry], now: datetime.datetime, changes: List[Change]):
+        for old in sorted(displaced, key=lambda e: e.vessel.eta):
+            new = self.current.place(old.vessel, self.candidate_berths(old.vessel), max(old.vessel.eta, now))
+            changes.append((old, new))
+
+    def check(self, delta: Delta):
+        """Raise the ValueError replan(delta) would, without changing anything."""
+        if self.current is None:
+            raise ValueError("No schedule to repair")
+        if isinstance(delta, EtaChanged):
+            if self._find_vessel(delta.vessel_id) is None:
+                raise ValueError(f"Vessel {delta.vessel_id} is not in the plan")
+        elif isinstance(delta, EntryFixed):
+            if self._find_vessel(delta.vessel_id) is None or not any(b.id == delta.berth_id for b in self.berths):
+                raise ValueError("Vessel or Berth not in the plan")
+            if delta.end_time <= delta.start_time:
+                raise ValueError(f"Fixed entry for vessel {delta.vessel_id} ends before it starts")
+        elif not isinstance(delta, (VesselAdded, BerthOffline)):
+            raise ValueError(f"Unknown plan change: {delta!r}")
+
+    def replan(self, delta: Delta, now: Optional[datetime.datetime] = None) -> List[Change]:
+        self.check(delta)
+        if now is None:
+            now = datetime.datetime.now()
+        schedule = self.current
+        changes: List[Change] = []
+
+        if isinstance(delta, VesselAdded):
+            self.vessels.append(delta.vessel)
+            self._compatibility = None
+            new = schedule.place(delta.vessel, self.candidate_berths(delta.vessel), max(delta.vessel.eta, now))
+            if new is not None:
+                changes.append((None, new))
+
+        elif isinstance(delta, EtaChanged):
+            vessel = self._find_vessel(delta.vessel_id)
+            moved = replace(vessel, eta=delta.eta)
+            self.vessels = [moved if v is vessel else v for v in self.vessels]
+            old = schedule.entry_for(delta.vessel_id)
+            if old is not None:
+                schedule.remove_entry(old)
+            new = schedule.place(moved, self.candidate_berths(moved), max(moved.eta, now))
+            changes.append((old, new))
+            if old is not None:
+                self._compact(old.berth.id, old.start_time, now, changes)
+
+        elif isinstance(delta, BerthOffline):
+            self.offline_berths.add(delta.berth_id)
+            self.calendar.add_outage(delta.berth_id, since=now)
+            displaced = schedule.entries_on(delta.berth_id, datetime.datetime.min, datetime.datetime.max)
+            for entry in displaced:
+                schedule.remove_entry(entry)
+            self._reseat(displaced, now, changes)
+
+        elif isinstance(delta, EntryFixed):
+            vessel = self._find_vessel(delta.vessel_id)
+            berth = next(b for b in self.berths if b.id == delta.berth_id)
+            old = schedule.entry_for(delta.vessel_id)
+            if old is not None:
+                schedule.remove_entry(old)
+            # a human fix is pinned; whoever it overlaps is moved instead
+            displaced = schedule.entries_on(berth.id, delta.start_time, delta.end_time)
+            for entry in displaced:
+                schedule.remove_entry(entry)
+            new = VesselScheduleEntry(vessel, delta.start_time, delta.end_time, berth)
+            schedule.add_entry(new)
+            self.pinned.add(vessel.id)
+            changes.append((old, new))
+            self._reseat(displaced, now, changes)
+            if old is not None:
+                self._compact(old.berth.id, old.start_time, now, changes)
+        return changes
+
+    def berth_times(self) -> Optional[np.ndarray]:
+        # predicted minutes, shape (len(self.vessels), len(self.berths)); None until trained
+        if self.berth_time_model is None:
+            return None
+        # same maintenance history the model was trained on
+        db = SessionLocal()
+        try:
+            maintenance = load_maintenance(db)
+        finally:
+            db.close()
+        # each vessel gets the weather at its own eta
+        return predict_berth_times(self.berth_time_model, self.vessels, self.berths,
+                                   self.weather if self.weather is not None else WeatherTimeline(), maintenance)
+
+    def predicted_berth_times(self) -> Optional[BerthTimes]:
+        minutes = self.berth_times()
+        return None if minutes is None else BerthTimes(minutes, self.vessels, self.berths)
+
+    def retrain(self, fixes: List[Tuple[VesselScheduleEntry, VesselScheduleEntry]]) -> float:
+        global berth_time_model
+        # one fit for a whole batch of fixes; a fix is committed to the entry's actual
+        # start/end before this runs, so the history tables already hold it
+        db = SessionLocal()
+        try:
+            X, y = load_training_set(db)
+        finally:
+            db.close()
+        if len(y) >= MIN_TRAINING_ROWS:
+            model = BerthTimeModel()
+            mse = model.fit(X, y)
+            self.berth_time_model = berth_time_model = model
+            return mse
+        berth_data = pd.DataFrame({
+            'max_loa': [berth.max_loa for berth in self.berths],
+            'max_beam': [berth.max_beam for berth in self.berths],
+            'max_draft': [berth.max_draft for berth in self.berths],
+            'max_dwt': [berth.max_dwt for berth in self.berths],
+            'est_berth_time': [1000] * len(self.berths),  # Placeholder for actual est_berth_time
+        })
+        (mse, self.model) = train_model(berth_data)
+        return mse
+
     def human_schedule_fix(self, actual_id: int, fixes: List[Tuple[VesselScheduleEntry, VesselScheduleEntry]]):
-        for fix in fixes:
-            original_entry, new_entry = fix
-            berth_data = pd.DataFrame({
-                'max_loa': [berth.max_loa for berth in self.berths],
-                'max_beam': [berth.max_beam for berth in self.berths],
-                'max_draft': [berth.max_draft for berth in self.berths],
-                'max_dwt': [berth.max_dwt for berth in self.berths],
-                'est_berth_time': [1000] * len(self.berths),  # Placeholder for actual est_berth_time
-            })
-            (mse, self.model) = train_model(berth_data)
-            db = SessionLocal()
-            try:
-                log_entry = PredictionLog(error=mse, actual_id=actual_id[0])
-                db.add(log_entry)
-                db.commit()
-                db.refresh(log_entry)
-            finally:
-                db.close()
-
-model: Optional[Model] = None
\ No newline at end of file
+        mse = self.retrain(fixes)
+        db = SessionLocal()
+        try:
+            log_entry = PredictionLog(error=mse, actual_id=actual_id)
+            db.add(log_entry)
+            db.commit()
+            db.refresh(log_entry)
+        finally:
+            db.close()
+        return mse
+
+model: Optional[Model] = None
+# last fitted berth time model, picked up by every Model built after it
+berth_time_model: Optional[BerthTimeModel] = None
\ No newline at end of file
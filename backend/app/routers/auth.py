@@ -1,18 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 from app.models import User
-from app.db import SessionLocal
+from app.db import get_db
 from app.security import hash_password, verify_password
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/register")
 def register(payload: dict, db: Session = Depends(get_db)):
     username = payload.get("username")
@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+import os
+import random
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from app.async_db import AsyncSessionLocal
+from app.berth_calendar import BerthCalendar
+from app.loader import WEATHER_HORIZON_PAD, load_berth_calendar, load_weather
+from app.models import Berth, PredictionScheduleEntry, Vessel
+from app.simulator import iter_simulate_schedule
+from app.weather_index import WeatherTimeline
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+EXPORT_BATCH = int(os.getenv("EXPORT_BATCH", "1000"))  # rows per cursor fetch and per written chunk
+
+SCHEDULE_FIELDS = ["id", "actual_id", "vessel_id", "berth_id", "start_time", "end_time",
+                   "actual_arrival_time", "actual_start_time", "actual_end_time"]
+SIMULATION_FIELDS = ["vessel_id", "status", "berth", "scheduled_start", "scheduled_end", "actual_arrival",
+                     "actual_start", "actual_end", "delay_minutes", "tide_wait_minutes",
+                     "maintenance_wait_minutes"]
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def encode_rows(rows: List[dict], fmt: str, fields: List[str], header: bool = False) -> str:
+    if fmt == "ndjson":
+        return "".join(json.dumps(row, default=json_default) + "\n" for row in rows)
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore", restval="")
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue()
+
+def export_response(chunks, fmt: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+def check_format(fmt: str):
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Unknown format, expected ndjson or csv")
+
+# the session is opened inside each generator: a Depends session is closed
+# before a StreamingResponse body starts
+
+async def schedule_chunks(from_actual_id: int, to_actual_id: int, fmt: str):
+    query = (
+        select(*(getattr(PredictionScheduleEntry, f) for f in SCHEDULE_FIELDS))
+        .where(PredictionScheduleEntry.actual_id.between(from_actual_id, to_actual_id))
+        .order_by(PredictionScheduleEntry.actual_id, PredictionScheduleEntry.id)
+        .execution_options(yield_per=EXPORT_BATCH)
+    )
+    if fmt == "csv":
+        yield encode_rows([], fmt, SCHEDULE_FIELDS, header=True)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            yield encode_rows([dict(zip(SCHEDULE_FIELDS, row)) for row in rows], fmt, SCHEDULE_FIELDS)
+
+async def simulation_chunks(actual_id: int, weather: str, seed: Optional[int], fmt: str):
+    query = (
+        select(PredictionScheduleEntry.vessel_id, Vessel.eta, Vessel.draft_m,
+               Berth.name, Berth.depth_m, PredictionScheduleEntry.start_time, PredictionScheduleEntry.end_time)
+        .join(Vessel, Vessel.id == PredictionScheduleEntry.vessel_id)
+        .join(Berth, Berth.id == PredictionScheduleEntry.berth_id)
+        .where(PredictionScheduleEntry.actual_id == actual_id)
+        .order_by(PredictionScheduleEntry.id)
+        .execution_options(yield_per=EXPORT_BATCH)
+    )
+    rng = random.Random(seed)
+    if fmt == "csv":
+        yield encode_rows([], fmt, SIMULATION_FIELDS, header=True)
+    async with AsyncSessionLocal() as db:
+        start, end = (await db.execute(
+            select(func.min(PredictionScheduleEntry.start_time), func.max(PredictionScheduleEntry.end_time))
+            .where(PredictionScheduleEntry.actual_id == actual_id)
+        )).one()
+        if weather == "recorded":
+            # the Weather table from the first eta through the stays, padded like the planner's
+            # horizon for late starts: past the last reading the tide is unknown
+            eta = (await db.execute(
+                select(func.min(Vessel.eta))
+                .join(PredictionScheduleEntry, PredictionScheduleEntry.vessel_id == Vessel.id)
+                .where(PredictionScheduleEntry.actual_id == actual_id)
+            )).scalar()
+            since = min(eta, start) if eta else start
+            weather = WeatherTimeline(await load_weather(db, since, end + WEATHER_HORIZON_PAD) if start else [])
+        # a vessel can't dock while its berth is down for maintenance
+        calendar = await load_berth_calendar(db, start, end) if start else BerthCalendar()
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            # each vessel is simulated against its own entry, so a batch needs only its own rows
+            vessels = [{"id": r[0], "eta": r[1], "etd": None, "draft": r[2] or 0} for r in rows]
+            berth_plan = {r[0]: {"berth": r[3], "start_time": r[5], "end_time": r[6]} for r in rows}
+            berth_info = {r[3]: {"depth": r[4] if r[4] is not None else float("inf")} for r in rows}
+            results = list(iter_simulate_schedule(vessels, berth_plan, berth_info, weather, rng, calendar))
+            yield encode_rows(results, fmt, SIMULATION_FIELDS)
+
+@router.get("/schedule")
+async def export_schedule(from_actual_id: int, to_actual_id: Optional[int] = None, format: str = "ndjson"):
+    check_format(format)
+    to_actual_id = from_actual_id if to_actual_id is None else to_actual_id
+    return export_response(schedule_chunks(from_actual_id, to_actual_id, format), format,
+                           f"schedule_{from_actual_id}_{to_actual_id}")
+
+@router.get("/simulation/{actual_id}")
+async def export_simulation(actual_id: int, weather: str = "calm", seed: Optional[int] = None, format: str = "ndjson"):
+    check_format(format)
+    return export_response(simulation_chunks(actual_id, weather.lower(), seed, format), format,
+                           f"simulation_{actual_id}")
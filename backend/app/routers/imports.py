@@ -0,0 +1,25 @@
+from typing import Optional
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from app.db import SessionLocal
+from app.importer import KINDS, import_csv
+from app.plan_cache import plan_cache
+
+router = APIRouter(prefix="/import", tags=["import"])
+
+def run_import(source, kind: str, actual_id: Optional[int]) -> dict:
+    db = SessionLocal()
+    try:
+        return import_csv(source, kind, db, actual_id).to_dict()
+    finally:
+        db.close()
+
+@router.post("/{kind}")
+async def import_file(kind: str, file: UploadFile = File(...), actual_id: Optional[int] = None):
+    if kind not in KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown import kind, expected one of {', '.join(KINDS)}")
+    # parsing and COPY are blocking, run them next to the event loop
+    report = await run_in_threadpool(run_import, file.file, kind, actual_id)
+    if report["loaded"]:
+        plan_cache.invalidate()
+    return report
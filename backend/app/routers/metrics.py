@@ -1,28 +1,29 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.db import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.async_db import async_engine, get_async_db
+from app.db import engine, pool_status
 from app.models import PredictionLog
 from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/metrics", tags=["metrics"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/24h")
-def accuracy_last_24h(db: Session = Depends(get_db)):
+async def accuracy_last_24h(db: AsyncSession = Depends(get_async_db)):
     cutoff = datetime.now() - timedelta(hours=24)
-    logs = db.query(PredictionLog).filter(PredictionLog.timestamp >= cutoff).all()
+    errors = (await db.execute(select(PredictionLog.error).where(PredictionLog.timestamp >= cutoff))).scalars().all()
 
-    if not logs:
+    if not errors:
         return {"errors": []}
 
     return {
-        "errors": [
-            log.error for log in logs
-        ],
+        "errors": list(errors),
+    }
+
+
+@router.get("/pool")
+async def database_pool():
+    return {
+        "sync": pool_status(engine.pool),
+        "async": pool_status(async_engine.pool),
     }
@@ -1,316 +1,293 @@
-from fastapi import APIRouter, Depends, HTTPException
-import copy
-from sqlalchemy.orm import Session
-from app.db import SessionLocal
-from app.models import Vessel, Weather, Berth, PredictionScheduleEntry, HumanFix
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.async_db import get_async_db
+from app.crud import (bulk_insert, bulk_update_by_id, bump_version, existing_ids, fetch_by_ids, latest_version,
+                      load_plan_rows, next_sequence)
+from app.events import publish
+from app.loader import load_berth_calendar, load_planner_inputs, planning_horizon
+from app.plan_diff import PLAN_SEQUENCE, index_rows, plan_differ, plan_row
+from app.plan_cache import etag_matches, plan_cache
+from app.models import Vessel, Berth, PredictionScheduleEntry, HumanFix
 import app.planner as planner
 from app.planner import VesselScheduleEntry
+from app.scenarios import Scenario, run_scenarios
+from app.training import training_worker
+from app.weather_index import WeatherTimeline
 import datetime
+import json
 
 router = APIRouter(prefix="/plan", tags=["plan"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def get_plan(db: Session, actual_id: int):
-    vessels = []
-    for v in db.query(Vessel).filter(Vessel.actual_id == actual_id).all():
-        est_berth_time = datetime.timedelta(minutes=v.ebt)
-        vessels.append(planner.Vessel(
-            id=v.id,
-            actual_id=v.actual_id,
-            name=v.name,
-            type=v.type,
-            loa_m=v.loa_m,
-            beam_m=v.beam_m,
-            draft_m=v.draft_m,
-            eta=v.eta,
-            est_berth_time=est_berth_time,
-            dwt=v.dwt_t,
-        ))
-    weather = []
-    for w in db.query(Weather).all():
-        weather.append(planner.Weather(
-            id = w.id,
-            timestamp=w.timestamp,
-            condition=w.condition,
-            temperature_c=w.temperature_c,
-            wind_speed_knots=w.wind_speed_knots,
-            tide_height_m=w.tide_height_m,
-        ))
-    berths = []
-    for b in db.query(Berth).all():
-        last_maintenance_time = b.last_maintenance
-        berths.append(planner.Berth(
-            id = b.id,
-            name = b.name,
-            depth_m = b.depth_m,
-            max_loa = b.max_loa,
-            max_beam = b.max_beam,
-            max_draft = b.max_draft,
-            max_dwt = b.max_dwt,
-            allowed_types = b.allowed_types,
-            last_maintenance = last_maintenance_time.timestamp if last_maintenance_time else None,
-        ))
-
-
-    planner.model = planner.Model(berths, vessels, weather[0])
-    schedule = planner.model.schedule()
-    
-    schedule_entries = []
-    for entry in schedule.get_schedule():
-        schedule_entries.append(PredictionScheduleEntry(
-            vessel_id=entry.vessel.id,
-            start_time=entry.start_time,
-            end_time=entry.end_time,
-            berth_id=entry.berth.id,
-            actual_arrival_time=entry.start_time - datetime.timedelta(minutes=15),
-            actual_start_time=entry.start_time,
-            actual_end_time=entry.end_time,
-        ))
-
-    return {"schedule": schedule_entries}
+MAX_TIME_BUDGET = 30  # seconds of optimisation a single request may ask for
 
-@router.get("")
-def plan(db: Session = Depends(get_db)):
-    latest_actual_id = db.query(Vessel.actual_id).order_by(Vessel.actual_id.desc()).first()
-    if latest_actual_id is None:
+async def latest_actual_id(db: AsyncSession) -> int:
+    actual_id = await latest_version(db, "vessels")
+    if actual_id is None:
         raise HTTPException(status_code=404, detail="No vessels found")
-    return get_plan(db, latest_actual_id[0])
+    return actual_id
+
+async def get_plan(db: AsyncSession, actual_id: int, strategy: str = "stored", time_budget: float = 1.0):
+    if strategy not in planner.STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Unknown strategy, expected one of {', '.join(planner.STRATEGIES)}")
+    berths, vessels, weather = await load_planner_inputs(db, actual_id)
+    calendar = await load_berth_calendar(db, *planning_horizon(vessels), keys={b.name: b.id for b in berths})
+    planner.model = planner.Model(berths, vessels, WeatherTimeline(weather), actual_id, calendar)
+    # planning is CPU bound, keep it off the event loop
+    schedule = await run_in_threadpool(planner.model.schedule, strategy, time_budget)
+    return schedule.frame()
+
+def parse_time(value):
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    return value
+
+def changes_to_dict(changes):
+    return [
+        {"old": old.to_dict() if old else None, "new": new.to_dict() if new else None}
+        for old, new in changes
+    ]
+
+def delta_from_payload(payload: dict):
+    kind = payload.get("type")
+    if kind == "eta_changed":
+        return planner.EtaChanged(payload["vessel_id"], parse_time(payload["eta"]))
+    if kind == "berth_offline":
+        return planner.BerthOffline(payload["berth_id"])
+    if kind == "entry_fixed":
+        return planner.EntryFixed(payload["vessel_id"], payload["berth_id"],
+                                  parse_time(payload["start_time"]), parse_time(payload["end_time"]))
+    raise HTTPException(status_code=400, detail="Unknown change type, expected eta_changed, berth_offline or entry_fixed")
+
+async def cached_plan(request: Request, db: AsyncSession, actual_id: int, strategy: str, time_budget: float):
+    # a stored plan only changes through the write endpoints below, which invalidate it
+    key = (actual_id, strategy, time_budget)
+    hit = plan_cache.get(key)
+    if hit is None:
+        generation = plan_cache.generation
+        frame = await get_plan(db, actual_id, strategy, time_budget)
+        hit = plan_cache.put(key, frame.plan_json(), generation)
+    etag, body = hit
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+async def publish_plan_update(db: AsyncSession, actual_id: int, base_actual_id, old: dict, new: dict):
+    # stream subscribers get only the changed fields, with a full snapshot now and then;
+    # the sequence is committed with the event by publish()
+    sequence = await next_sequence(db, PLAN_SEQUENCE)
+    if plan_differ.snapshot_due(sequence):
+        message = plan_differ.snapshot(sequence, actual_id, await load_plan_rows(db, actual_id))
+    else:
+        message = plan_differ.delta(sequence, actual_id, base_actual_id, old, new)
+    await publish(db, "plan", json.dumps(message))
+
+async def ensure_model(db: AsyncSession):
+    if not planner.model or planner.model.current is None:
+        await get_plan(db, await latest_actual_id(db))
+
+@router.get("")
+async def plan(request: Request, strategy: str = "stored", time_budget: float = Query(1.0, gt=0, le=MAX_TIME_BUDGET),
+               db: AsyncSession = Depends(get_async_db)):
+    return await cached_plan(request, db, await latest_actual_id(db), strategy, time_budget)
+
+@router.get("/compatibility")
+async def compatibility(db: AsyncSession = Depends(get_async_db)):
+    berths, vessels, _ = await load_planner_inputs(db, await latest_actual_id(db))
+    return planner.CompatibilityMatrix(berths, vessels).to_dict()
+
+@router.post("/scenarios")
+async def plan_scenarios(payload: dict, db: AsyncSession = Depends(get_async_db)):
+    strategy = payload.get("strategy", "fcfs")
+    if strategy not in ("fcfs", "optimized"):
+        raise HTTPException(status_code=400, detail="Scenario strategy must be fcfs or optimized")
+    if not payload.get("scenarios"):
+        raise HTTPException(status_code=400, detail="No scenarios provided")
+    time_budget = payload.get("time_budget", 1.0)
+    if isinstance(time_budget, bool) or not isinstance(time_budget, (int, float)) or not 0 < time_budget <= MAX_TIME_BUDGET:
+        raise HTTPException(status_code=400, detail=f"time_budget must be a number of seconds in (0, {MAX_TIME_BUDGET}]")
+    actual_id = payload.get("actual_id") or await latest_actual_id(db)
+    berths, vessels, weather = await load_planner_inputs(db, actual_id)
+    try:
+        # checked here, before anything goes to the worker processes
+        scenarios = [Scenario.from_dict(s, {b.id for b in berths}) for s in payload["scenarios"]]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # the same tide, maintenance and berth time predictions as GET /plan
+    calendar = await load_berth_calendar(db, *planning_horizon(vessels), keys={b.name: b.id for b in berths})
+    model = planner.Model(berths, vessels, WeatherTimeline(weather), actual_id, calendar)
+    berth_times = await run_in_threadpool(model.predicted_berth_times)
+    results = await run_in_threadpool(run_scenarios, berths, vessels, scenarios, strategy, time_budget,
+                                      weather=model.weather, calendar=calendar, berth_times=berth_times)
+    return {"scenarios": results}
 
 @router.get("/{actual_id}")
-def get_plan_by_id(actual_id: int, db: Session = Depends(get_db)):
-    return get_plan(db, actual_id)
+async def get_plan_by_id(request: Request, actual_id: int, strategy: str = "stored",
+                         time_budget: float = Query(1.0, gt=0, le=MAX_TIME_BUDGET), db: AsyncSession = Depends(get_async_db)):
+    return await cached_plan(request, db, actual_id, strategy, time_budget)
 
 @router.post("")
-def create_plan(payload: dict, db: Session = Depends(get_db)):
-    latest_actual_id = db.query(Vessel.actual_id).order_by(Vessel.actual_id.desc()).first()
-    if latest_actual_id is None:
-        raise HTTPException(status_code=404, detail="No vessels found")
-    next_actual_id = latest_actual_id[0] + 1
-
-    schedule = planner.Schedule()
-    for entry in payload["schedule"]:
-        vessel = db.query(Vessel).filter(Vessel.id == entry["vessel_id"]).first()
-        berth = db.query(Berth).filter(Berth.id == entry["berth_id"]).first()
-        if not vessel or not berth:
-            raise HTTPException(status_code=404, detail="Vessel or Berth not found")
+async def create_plan(payload: dict, db: AsyncSession = Depends(get_async_db)):
+    if not payload.get("schedule"):
+        raise HTTPException(status_code=400, detail="No schedule provided")
+    base_actual_id = await latest_version(db, "schedule")
+    # past both the vessel batch and the last stored plan, so consecutive plans don't share an id
+    next_actual_id = max(await latest_actual_id(db), base_actual_id or 0) + 1
+
+    entries = payload["schedule"]
+    missing_vessels = {e["vessel_id"] for e in entries} - await existing_ids(db, Vessel, (e["vessel_id"] for e in entries))
+    missing_berths = {e["berth_id"] for e in entries} - await existing_ids(db, Berth, (e["berth_id"] for e in entries))
+    if missing_vessels or missing_berths:
+        raise HTTPException(status_code=404, detail=f"Vessels {sorted(missing_vessels)} or Berths {sorted(missing_berths)} not found")
+
+    rows = []
+    for entry in entries:
+        start_time = parse_time(entry["start_time"])
+        end_time = parse_time(entry["end_time"])
+        rows.append({
+            "actual_id": next_actual_id,
+            "vessel_id": entry["vessel_id"],
+            "berth_id": entry["berth_id"],
+            "start_time": start_time,
+            "end_time": end_time,
+            "actual_arrival_time": start_time - datetime.timedelta(minutes=15),
+            "actual_start_time": start_time,
+            "actual_end_time": end_time,
+        })
 
-        schedule.add_entry(planner.VesselScheduleEntry(
-            vessel=planner.Vessel(
-                id=vessel.id,
-                actual_id=vessel.actual_id,
-                name=vessel.name,
-                type=vessel.type,
-                loa_m=vessel.loa_m,
-                beam_m=vessel.beam_m,
-                draft_m=vessel.draft_m,
-                eta=vessel.eta,
-                est_berth_time=vessel.ebt,
-                dwt=vessel.dwt_t,
-            ),
-            start_time=entry["start_time"],
-            end_time=entry["end_time"],
-            berth=planner.Berth(
-                id=berth.id,
-                name=berth.name,
-                depth_m=berth.depth_m,
-                max_loa=berth.max_loa,
-                max_beam=berth.max_beam,
-                max_draft=berth.max_draft,
-                max_dwt=berth.max_dwt,
-                allowed_types=berth.allowed_types,
-                last_maintenance=berth.last_maintenance
-            )
-        ))
-
-    # Save the schedule to the database
-    for entry in schedule.get_schedule():
-        schedule_entry = PredictionScheduleEntry(
-            actual_id=next_actual_id,
-            vessel_id=entry.vessel.id,
-            berth_id=entry.berth.id,
-            start_time=entry.start_time,
-            end_time=entry.end_time,
-            actual_arrival_time=entry.start_time - datetime.timedelta(minutes=15),
-            actual_start_time=entry.start_time,
-            actual_end_time=entry.end_time,
-        )
-        db.add(schedule_entry)
-        db.commit()
-        db.refresh(schedule_entry)
-    return {}
+    # the whole plan and its version pointer land in one transaction
+    count = await bulk_insert(db, PredictionScheduleEntry, rows)
+    await bump_version(db, "schedule", next_actual_id)
+    await db.commit()
+    plan_cache.invalidate()
 
+    old = index_rows(await load_plan_rows(db, base_actual_id)) if base_actual_id is not None else {}
+    new = index_rows(plan_row(r["vessel_id"], r["berth_id"], r["start_time"], r["end_time"]) for r in rows)
+    await publish_plan_update(db, next_actual_id, base_actual_id, old, new)
+    return {"actual_id": next_actual_id, "rows": count}
 
-@router.patch("/human-fix")
-def override_plan_body(payload: dict, db: Session = Depends(get_db)):
-    actual_id = db.query(Vessel.actual_id).order_by(Vessel.actual_id.desc()).first()
-    if not planner.model:
-        latest_actual_id = db.query(Vessel.actual_id).order_by(Vessel.actual_id.desc()).first()
-        if latest_actual_id is None:
-            raise HTTPException(status_code=404, detail="No vessels found")
-        get_plan(db, latest_actual_id[0])
 
+@router.post("/replan")
+async def replan(payload: dict, db: AsyncSession = Depends(get_async_db)):
+    await ensure_model(db)
+    try:
+        changes = planner.model.replan(delta_from_payload(payload))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    # vessels the repair found no berth for are listed rather than left out
+    return {"replanned": changes_to_dict(changes), "unplaced": sorted(planner.model.current.unplaced),
+            "beyond_tide_data": sorted(planner.model.current.beyond_tide)}
+
+async def apply_human_fixes(db: AsyncSession, actual_id: int, planning_changes: list):
+    if not planning_changes:
+        raise HTTPException(status_code=400, detail="No changes provided")
     changes = []
-
-    # # add human fix to db
-    # human_fix = HumanFix(
-    #     fix_batch_id=actual_id,
-    #     vessel_id=payload["vessel_id"],
-    #     berth_id=payload["berth_id"],
-    #     start_time=payload["start_time"],
-    #     end_time=payload["end_time"]
-    # )
-
-    for planning_change in payload["changes"]:
-        entry = db.query(PredictionScheduleEntry).filter(PredictionScheduleEntry.id == planning_change["id"]).first()
-        if not entry:
-            raise HTTPException(status_code=404, detail=f"Planning entry {planning_change['id']} not found")
-
-        old = entry
-        new = copy.deepcopy(entry)
+    replanned = []
+
+    entries = await fetch_by_ids(db, PredictionScheduleEntry, (c["id"] for c in planning_changes))
+    missing = [c["id"] for c in planning_changes if c["id"] not in entries]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Planning entries {missing} not found")
+
+    updates = []
+    for planning_change in planning_changes:
+        old = entries[planning_change["id"]]
+        new = {
+            "id": old.id,
+            "vessel_id": old.vessel_id,
+            "berth_id": old.berth_id,
+            "start_time": old.start_time,
+            "end_time": old.end_time,
+        }
         for key, value in planning_change.items():
-            setattr(new, key, value)
-
-        oldvessel = db.query(Vessel).filter(Vessel.id == old.vessel_id).first()
-        oldberth = db.query(Berth).filter(Berth.id == old.berth_id).first()
-        newvessel = db.query(Vessel).filter(Vessel.id == new.vessel_id).first()
-        newberth = db.query(Berth).filter(Berth.id == new.berth_id).first()
+            if key in new:
+                new[key] = parse_time(value)
+        updates.append(new)
+
+    vessels = await fetch_by_ids(db, Vessel, [entries[u["id"]].vessel_id for u in updates] + [u["vessel_id"] for u in updates])
+    berths = await fetch_by_ids(db, Berth, [entries[u["id"]].berth_id for u in updates] + [u["berth_id"] for u in updates])
+
+    for new in updates:
+        old = entries[new["id"]]
+        oldvessel = vessels.get(old.vessel_id)
+        oldberth = berths.get(old.berth_id)
+        newvessel = vessels.get(new["vessel_id"])
+        newberth = berths.get(new["berth_id"])
         if not oldvessel or not oldberth or not newvessel or not newberth:
             raise HTTPException(status_code=404, detail="Vessel or Berth not found")
+        if new["end_time"] <= new["start_time"]:
+            raise HTTPException(status_code=422, detail=f"Planning entry {new['id']} ends before it starts")
 
-        db.query(PredictionScheduleEntry).filter(PredictionScheduleEntry.id == planning_change["id"]).update({
-            "vessel_id": new.vessel_id,
-            "berth_id": new.berth_id,
-            "start_time": new.start_time,
-            "end_time": new.end_time,
-            "actual_arrival_time": new.start_time - datetime.timedelta(minutes=15),
-            "actual_start_time": new.start_time,
-            "actual_end_time": new.end_time,
-        })
-        db.commit()
         changes.append({
             "old": VesselScheduleEntry(
-                vessel=planner.Vessel(
-                    id=oldvessel.id,
-                    actual_id=oldvessel.actual_id,
-                    name=oldvessel.name,
-                    type=oldvessel.type,
-                    loa_m=oldvessel.loa_m,
-                    beam_m=oldvessel.beam_m,
-                    draft_m=oldvessel.draft_m,
-                    eta=oldvessel.eta,
-                    est_berth_time=oldvessel.ebt,
-                    dwt=oldvessel.dwt_t,
-                ),
+                vessel=planner.vessel_from_row(oldvessel),
                 start_time=old.start_time,
                 end_time=old.end_time,
-                berth=planner.Berth(
-                    id=oldberth.id,
-                    name=oldberth.name,
-                    depth_m=oldberth.depth_m,
-                    max_loa=oldberth.max_loa,
-                    max_beam=oldberth.max_beam,
-                    max_draft=oldberth.max_draft,
-                    max_dwt=oldberth.max_dwt,
-                    allowed_types=oldberth.allowed_types,
-                    last_maintenance=oldberth.last_maintenance
-                )
+                berth=planner.berth_from_row(oldberth),
             ),
             "new": VesselScheduleEntry(
-                vessel=planner.Vessel(
-                    id=newvessel.id,
-                    actual_id=newvessel.actual_id,
-                    name=newvessel.name,
-                    type=newvessel.type,
-                    loa_m=newvessel.loa_m,
-                    beam_m=newvessel.beam_m,
-                    draft_m=newvessel.draft_m,
-                    eta=newvessel.eta,
-                    est_berth_time=newvessel.ebt,
-                    dwt=newvessel.dwt_t,
-                ),
-                start_time=new.start_time,
-                end_time=new.end_time,
-                berth=planner.Berth(
-                    id=newberth.id,
-                    name=newberth.name,
-                    depth_m=newberth.depth_m,
-                    max_loa=newberth.max_loa,
-                    max_beam=newberth.max_beam,
-                    max_draft=newberth.max_draft,
-                    max_dwt=newberth.max_dwt,
-                    allowed_types=newberth.allowed_types,
-                    last_maintenance=newberth.last_maintenance
-                )
+                vessel=planner.vessel_from_row(newvessel),
+                start_time=new["start_time"],
+                end_time=new["end_time"],
+                berth=planner.berth_from_row(newberth),
             )
         })
+        new["actual_arrival_time"] = new["start_time"] - datetime.timedelta(minutes=15)
+        new["actual_start_time"] = new["start_time"]
+        new["actual_end_time"] = new["end_time"]
 
-    planner.model.human_schedule_fix(actual_id, changes)
+    fixes = [planner.EntryFixed(u["vessel_id"], u["berth_id"], u["start_time"], u["end_time"]) for u in updates]
+    if planner.model.actual_id == actual_id:
+        # checked before anything is written, so a fix the plan can't take leaves the tables as they were
+        try:
+            for fix in fixes:
+                planner.model.check(fix)
+        except ValueError as e:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail=str(e))
+
+    plan_id = entries[updates[0]["id"]].actual_id
+    # read before the UPDATE, which refreshes the loaded entries
+    before = index_rows(plan_row(e.vessel_id, e.berth_id, e.start_time, e.end_time) for e in entries.values())
+
+    # the whole batch is one UPDATE, one insert of the fixes (training data) and one commit
+    await bulk_update_by_id(db, PredictionScheduleEntry, updates)
+    await bulk_insert(db, HumanFix, [
+        {"actual_id": actual_id, "vessel_id": u["vessel_id"], "berth_id": u["berth_id"],
+         "start_time": u["start_time"], "end_time": u["end_time"]}
+        for u in updates
+    ])
+    await db.commit()
+    plan_cache.invalidate()
+
+    after = index_rows(plan_row(u["vessel_id"], u["berth_id"], u["start_time"], u["end_time"]) for u in updates)
+    await publish_plan_update(db, plan_id, plan_id, before, after)
+
+    if planner.model.actual_id == actual_id:
+        for fix in fixes:
+            replanned += planner.model.replan(fix)
+
+    # learning from the fixes happens in the background, poll /training/{job_id} for the result
+    job = training_worker.submit(actual_id, planner.model, changes)
+
+    return {"replanned": changes_to_dict(replanned), "unplaced": sorted(planner.model.current.unplaced),
+            "beyond_tide_data": sorted(planner.model.current.beyond_tide), "training_job": job.id}
 
-    return {}
+@router.patch("/human-fix")
+async def override_plan_body(payload: dict, db: AsyncSession = Depends(get_async_db)):
+    actual_id = await latest_actual_id(db)
+    await ensure_model(db)
+    return await apply_human_fixes(db, actual_id, payload.get("changes"))
 
 @router.patch("/{actual_id}/human-fix")
-def override_plan(actual_id: int, payload: dict, db: Session = Depends(get_db)):
-    if not planner.model:
-        latest_actual_id = db.query(Vessel.actual_id).order_by(Vessel.actual_id.desc()).first()
-        if latest_actual_id is None:
-            raise HTTPException(status_code=404, detail="No vessels found")
-        get_plan(db, latest_actual_id[0])
-
-    schedule = db.query(PredictionScheduleEntry).filter(PredictionScheduleEntry.actual_id == actual_id).first()
-    if not schedule:
+async def override_plan(actual_id: int, payload: dict, db: AsyncSession = Depends(get_async_db)):
+    await ensure_model(db)
+
+    schedule = await db.execute(select(PredictionScheduleEntry.id).where(PredictionScheduleEntry.actual_id == actual_id).limit(1))
+    if schedule.scalar() is None:
         raise HTTPException(status_code=404, detail="Schedule not found")
     if "changes" not in payload:
         raise HTTPException(status_code=400, detail="No changes provided")
 
-    changes = []
-
-    # # add human fix to db
-    # human_fix = HumanFix(
-    #     fix_batch_id=actual_id,
-    #     vessel_id=payload["vessel_id"],
-    #     berth_id=payload["berth_id"],
-    #     start_time=payload["start_time"],
-    #     end_time=payload["end_time"]
-    # )
-
-    for planning_change in payload["changes"]:
-        entry = db.query(PredictionScheduleEntry).filter(PredictionScheduleEntry.id == planning_change["id"]).first()
-        if not entry:
-            raise HTTPException(status_code=404, detail=f"Planning entry {planning_change['id']} not found")
-
-        old = entry
-        new = copy.deepcopy(entry)
-        for key, value in planning_change.items():
-            setattr(new, key, value)
-
-        try:
-            db.add(new)
-            db.commit()
-            db.refresh(new)
-        finally:
-            db.close()
-
-        changes.append({
-            "old": VesselScheduleEntry(
-                vessel=old.vessel,
-                start_time=old.start_time,
-                end_time=old.end_time,
-                berth=old.berth
-            ),
-            "new": VesselScheduleEntry(
-                vessel=new.vessel,
-                start_time=new.start_time,
-                end_time=new.end_time,
-                berth=new.berth
-            )
-        })
-
-    planner.model.human_schedule_fix(actual_id, changes)
-
-    return {}
\ No newline at end of file
+    return await apply_human_fixes(db, actual_id, payload.get("changes"))
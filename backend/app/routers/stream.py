@@ -0,0 +1,55 @@
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, Header
+from fastapi.responses import StreamingResponse
+from app.events import STREAM_HEARTBEAT, Subscriber, broker, format_event
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+def parse_cursor(last_event_id: Optional[str]) -> Optional[int]:
+    try:
+        return int(last_event_id) if last_event_id else None
+    except ValueError:
+        return None
+
+async def event_stream(subscriber: Subscriber, resumed: bool):
+    try:
+        # a fresh client gets the current cursor, a resumed one keeps its own
+        ready = json.dumps({"cursor": broker.last_id})
+        yield format_event(0 if resumed else broker.last_id, ready, "ready")
+        reported = 0
+        while True:
+            if subscriber.dropped > reported:
+                yield format_event(0, json.dumps({"dropped": subscriber.dropped - reported}), "gap")
+                reported = subscriber.dropped
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # keeps proxies from closing an idle connection
+                yield ": ping\n\n"
+                continue
+            yield message
+    finally:
+        broker.unsubscribe(subscriber)
+
+def stream_response(channel: str, last_event_id: Optional[str]) -> StreamingResponse:
+    cursor = parse_cursor(last_event_id)
+    subscriber = broker.subscribe(channel, cursor)
+    return StreamingResponse(
+        event_stream(subscriber, cursor is not None),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/vessels")
+async def stream_vessels(last_event_id: Optional[str] = Header(None)):
+    return stream_response("vessels", last_event_id)
+
+@router.get("/plan")
+async def stream_plan(last_event_id: Optional[str] = Header(None)):
+    return stream_response("plan", last_event_id)
+
+@router.get("/status")
+async def stream_status():
+    return {"last_id": broker.last_id, "subscribers": broker.subscriber_count(), "listening": broker.listening}
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException
+from app.training import training_worker
+
+router = APIRouter(prefix="/training", tags=["training"])
+
+@router.get("")
+async def list_jobs(limit: int = 50):
+    jobs = list(training_worker.jobs.values())[-limit:]
+    return {"jobs": [job.to_dict() for job in reversed(jobs)]}
+
+@router.get("/{job_id}")
+async def job_status(job_id: str):
+    job = training_worker.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job.to_dict()
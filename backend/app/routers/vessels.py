@@ -1,32 +1,110 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import and_, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.async_db import get_async_db
+from app.crud import bump_version, latest_version
 from app.models import Vessel
-from datetime import datetime
+import app.planner as planner
+from app.plan_cache import plan_cache
+from app.events import publish
+from fastapi.encoders import jsonable_encoder
+import json
+from datetime import datetime, timezone
+from typing import List, Optional
 
 router = APIRouter(prefix="/vessels", tags=["vessels"])
 
-def get_db():
-    db = SessionLocal()
+VESSEL_FIELDS = [c.name for c in Vessel.__table__.columns]
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return VESSEL_FIELDS
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in VESSEL_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown vessel fields {unknown}, expected any of {', '.join(VESSEL_FIELDS)}")
+    return names
+
+# vessels without an eta sort last; their cursors say so explicitly
+NULL_CURSOR = "null"
+
+def encode_cursor(eta: Optional[datetime], vessel_id: int) -> str:
+    return f"{NULL_CURSOR if eta is None else eta.isoformat()},{vessel_id}"
+
+def decode_cursor(cursor: str):
     try:
-        yield db
-    finally:
-        db.close()
+        eta, vessel_id = cursor.rsplit(",", 1)
+        return None if eta == NULL_CURSOR else datetime.fromisoformat(eta), int(vessel_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def after_cursor(eta: Optional[datetime], vessel_id: int):
+    # rows past (eta, id) in ORDER BY eta NULLS LAST, id
+    if eta is None:
+        return and_(Vessel.eta.is_(None), Vessel.id > vessel_id)
+    return or_(tuple_(Vessel.eta, Vessel.id) > tuple_(eta, vessel_id), Vessel.eta.is_(None))
+
+def parse_eta(value) -> datetime:
+    # ISO 8601; an offset ("Z", "+02:00") is stored as naive UTC, like the CSV importer does
+    try:
+        eta = datetime.fromisoformat(value) if isinstance(value, str) else value
+    except ValueError:
+        eta = None
+    if not isinstance(eta, datetime):
+        raise HTTPException(status_code=400, detail="Invalid eta, expected an ISO 8601 timestamp")
+    if eta.tzinfo is not None:
+        eta = eta.astimezone(timezone.utc).replace(tzinfo=None)
+    return eta
+
+def json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
 
 @router.get("")
-def list_vessels(db: Session = Depends(get_db)):
-    latest_actual_id = db.query(Vessel.actual_id).order_by(Vessel.actual_id.desc()).first()
+async def list_vessels(limit: Optional[int] = Query(None, gt=0, le=10000), after: Optional[str] = None,
+                       fields: Optional[str] = None, format: str = "rows",
+                       db: AsyncSession = Depends(get_async_db)):
+    latest_actual_id = await latest_version(db, "vessels")
     if latest_actual_id is None:
         raise HTTPException(status_code=404, detail="No vessels found")
-    return db.query(Vessel).filter(Vessel.actual_id == latest_actual_id[0]).all()
+    if limit is None and after is None and fields is None and format == "rows":
+        return (await db.execute(select(Vessel).where(Vessel.actual_id == latest_actual_id))).scalars().all()
+    if format not in ("rows", "columns"):
+        raise HTTPException(status_code=400, detail="Unknown format, expected rows or columns")
+
+    # plain tuples of only the requested columns; eta and id ride along for the cursor
+    names = parse_fields(fields)
+    query = (
+        select(*(getattr(Vessel, name) for name in names), Vessel.eta, Vessel.id)
+        .where(Vessel.actual_id == latest_actual_id)
+        .order_by(Vessel.eta.asc().nulls_last(), Vessel.id)
+    )
+    if after:
+        query = query.where(after_cursor(*decode_cursor(after)))
+    if limit:
+        query = query.limit(limit)
+    rows = (await db.execute(query)).all()
+
+    next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1]) if limit and len(rows) == limit else None
+    if format == "columns":
+        columns = list(zip(*rows)) if rows else [()] * len(names)
+        body = {
+            "columns": {name: [json_value(v) for v in columns[i]] for i, name in enumerate(names)},
+            "count": len(rows),
+            "next": next_cursor,
+        }
+        return Response(content=json.dumps(body), media_type="application/json")
+    # one array per row in `fields` order, the tuples straight from the result: no dict per row
+    n = len(names)
+    body = {"fields": names, "items": [row[:n] for row in rows], "next": next_cursor}
+    return Response(content=json.dumps(body, default=datetime.isoformat), media_type="application/json")
 
 @router.get("/{actual_id}")
-def get_vessel(vessel_id: int, db: Session = Depends(get_db)):
-    return db.query(Vessel).filter(Vessel.actual_id == vessel_id).all()
+async def get_vessel(vessel_id: int, db: AsyncSession = Depends(get_async_db)):
+    return (await db.execute(select(Vessel).where(Vessel.actual_id == vessel_id))).scalars().all()
 
 
 @router.post("")
-def create_vessel(payload: dict, db: Session = Depends(get_db)):
+async def create_vessel(payload: dict, db: AsyncSession = Depends(get_async_db)):
     vessel = Vessel(
         actual_id=payload["actual_id"],
         name=payload["name"],
@@ -34,10 +112,16 @@ def create_vessel(payload: dict, db: Session = Depends(get_db)):
         loa_m=payload["loa_m"],
         beam_m=payload["beam_m"],
         draft_m=payload["draft_m"],
-        eta=payload["eta"],
+        eta=parse_eta(payload["eta"]),
         dwt_t=payload["dwt_t"]
     )
     db.add(vessel)
-    db.commit()
-    db.refresh(vessel)
-    return vessel
\ No newline at end of file
+    await bump_version(db, "vessels", vessel.actual_id)
+    await db.commit()
+    await db.refresh(vessel)
+    plan_cache.invalidate(vessel.actual_id)
+    await publish(db, "vessels", json.dumps(jsonable_encoder(vessel)))
+    # repair the live plan in place instead of rebuilding it on the next GET
+    if planner.model and planner.model.current is not None and planner.model.actual_id == vessel.actual_id:
+        planner.model.replan(planner.VesselAdded(planner.vessel_from_row(vessel)))
+    return vessel
@@ -0,0 +1,124 @@
+import datetime
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Collection, Dict, List, Optional
+
+import app.planner as planner
+from app.berth_calendar import BerthCalendar
+from app.planner import Berth, BerthTimes, Schedule, Vessel, replace
+from app.simulator import simulate_arrival
+from app.weather_index import WeatherTimeline
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    # one pool for the whole process, so a batch doesn't pay worker start-up
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=int(os.getenv("SCENARIO_WORKERS", os.cpu_count() or 1)))
+    return _executor
+
+
+class Scenario:
+    def __init__(self, name: str, weather: str = "calm", delay_minutes: int = 0,
+                 berth_outages: Optional[List[int]] = None, seed: int = 0):
+        self.name = name
+        self.weather = weather
+        self.delay_minutes = delay_minutes
+        self.berth_outages = berth_outages or []
+        self.seed = seed
+
+    @classmethod
+    def from_dict(cls, data: dict, berth_ids: Optional[Collection[int]] = None) -> "Scenario":
+        """Build a scenario from a request body, ValueError on a delay or closed berth it can't run.
+
+        `berth_ids` are the berths the scenario may close; unchecked when None.
+        """
+        delay_minutes = data.get("delay_minutes", 0)
+        if isinstance(delay_minutes, bool) or not isinstance(delay_minutes, (int, float)) or delay_minutes < 0:
+            raise ValueError(f"delay_minutes must be a non-negative number of minutes, got {delay_minutes!r}")
+        berth_outages = data.get("berth_outages") or []
+        if not isinstance(berth_outages, list):
+            raise ValueError("berth_outages must be a list of berth ids")
+        if berth_ids is not None:
+            unknown = [b for b in berth_outages if b not in berth_ids]
+            if unknown:
+                raise ValueError(f"Unknown berths {unknown} in berth_outages")
+        return cls(
+            name=data.get("name", ""),
+            weather=data.get("weather", "calm"),
+            delay_minutes=delay_minutes,
+            berth_outages=berth_outages,
+            seed=data.get("seed", 0),
+        )
+
+    def __repr__(self):
+        return f"Scenario(name='{self.name}', weather='{self.weather}', delay_minutes={self.delay_minutes}, berth_outages={self.berth_outages}, seed={self.seed})"
+
+
+def kpis(schedule: Schedule, vessels: List[Vessel], berths: List[Berth],
+         baseline: Dict[int, datetime.datetime], now: datetime.datetime) -> dict:
+    entries = schedule.get_schedule()
+    wait = planner.total_wait(schedule, now)
+    # a slot is missed when the vessel can't start before its baseline slot ends
+    missed = sum(1 for e in entries if e.vessel.id in baseline and e.start_time >= baseline[e.vessel.id])
+    unassigned = len(vessels) - len(entries)
+
+    utilization = {}
+    if entries:
+        horizon_start = min(e.start_time for e in entries)
+        horizon = (max(e.end_time for e in entries) - horizon_start).total_seconds()
+        busy = {b.id: 0.0 for b in berths}
+        for e in entries:
+            busy[e.berth.id] += (e.end_time - e.start_time).total_seconds()
+        utilization = {berth_id: (seconds / horizon if horizon else 0.0) for berth_id, seconds in busy.items()}
+
+    return {
+        "total_wait_minutes": wait.total_seconds() / 60,
+        "berth_utilization": sum(utilization.values()) / len(utilization) if utilization else 0.0,
+        "utilization_by_berth": utilization,
+        "missed_slots": missed + unassigned,
+        "unassigned": unassigned,
+    }
+
+
+def run_scenario(berths: List[Berth], vessels: List[Vessel], scenario: Scenario,
+                 baseline: Dict[int, datetime.datetime], now: datetime.datetime,
+                 strategy: str = "fcfs", time_budget: float = 1.0,
+                 weather: Optional[WeatherTimeline] = None, calendar: Optional[BerthCalendar] = None,
+                 berth_times: Optional[BerthTimes] = None) -> dict:
+    # tide, maintenance and predicted berth times are the plan's own; the scenario only
+    # moves arrivals and takes berths out
+    rng = random.Random(scenario.seed)
+    delayed = []
+    for vessel in vessels:
+        arrival, _ = simulate_arrival(vessel.eta, scenario.weather, rng)
+        delayed.append(replace(vessel, eta=arrival + datetime.timedelta(minutes=scenario.delay_minutes)))
+    open_berths = [b for b in berths if b.id not in scenario.berth_outages]
+
+    if strategy == "optimized":
+        schedule = planner.schedule_optimized(open_berths, delayed, weather, now=now, time_budget=time_budget,
+                                              seed=scenario.seed, calendar=calendar, berth_times=berth_times)
+    else:
+        schedule = planner.schedule_fcfs(open_berths, delayed, weather, now=now, calendar=calendar,
+                                         berth_times=berth_times)
+    return {"scenario": scenario.name, **kpis(schedule, delayed, open_berths, baseline, now)}
+
+
+def run_scenarios(berths: List[Berth], vessels: List[Vessel], scenarios: List[Scenario],
+                  strategy: str = "fcfs", time_budget: float = 1.0,
+                  now: Optional[datetime.datetime] = None, weather: Optional[WeatherTimeline] = None,
+                  calendar: Optional[BerthCalendar] = None, berth_times: Optional[BerthTimes] = None) -> List[dict]:
+    if now is None:
+        now = datetime.datetime.now()
+    # the undisturbed plan every scenario is measured against
+    baseline = {e.vessel.id: e.end_time for e in planner.schedule_fcfs(
+        berths, vessels, weather, now=now, calendar=calendar, berth_times=berth_times).get_schedule()}
+    n = len(scenarios)
+    return list(get_executor().map(
+        run_scenario,
+        [berths] * n, [vessels] * n, scenarios, [baseline] * n, [now] * n,
+        [strategy] * n, [time_budget] * n, [weather] * n, [calendar] * n, [berth_times] * n,
+    ))
@@ -0,0 +1,73 @@
+from typing import Iterable, Sequence
+
+import numpy as np
+
+# get_plan reports the arrival this long before the berth start
+ARRIVAL_LEAD = np.timedelta64(15, "m")
+
+
+def iso_strings(times: np.ndarray) -> np.ndarray:
+    # datetime.isoformat() layout (microseconds only when there are any), NaT -> null
+    whole = times.astype("datetime64[s]") == times
+    text = np.where(whole, np.datetime_as_string(times, unit="s"), np.datetime_as_string(times, unit="us"))
+    return np.where(np.isnat(times), "null", np.char.add(np.char.add('"', text), '"'))
+
+
+class ScheduleFrame:
+    """A schedule as one array per field: int64 ids and datetime64[us] times, no object per entry.
+
+    `unplaced` holds the ids of vessels the planner found no berth, tide or
+    opening for, `beyond_tide` those it could only berth past the last tide
+    reading; neither has a row.
+    """
+
+    def __init__(self, vessel_id, berth_id, start, end, unplaced=(), beyond_tide=()):
+        self.vessel_id = np.asarray(vessel_id, dtype=np.int64)
+        self.berth_id = np.asarray(berth_id, dtype=np.int64)
+        self.start = np.asarray(start, dtype="datetime64[us]")
+        self.end = np.asarray(end, dtype="datetime64[us]")
+        self.unplaced = np.asarray(unplaced, dtype=np.int64)
+        self.beyond_tide = np.asarray(beyond_tide, dtype=np.int64)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence, unplaced: Sequence[int] = (), beyond_tide: Sequence[int] = ()) -> "ScheduleFrame":
+        # (vessel_id, berth_id, start_time, end_time) rows, e.g. straight from a select
+        if not rows:
+            return cls([], [], [], [], unplaced, beyond_tide)
+        return cls(*zip(*rows), unplaced, beyond_tide)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable, unplaced: Sequence[int] = (),
+                     beyond_tide: Sequence[int] = ()) -> "ScheduleFrame":
+        return cls.from_rows([(e.vessel.id, e.berth.id, e.start_time, e.end_time) for e in entries],
+                             unplaced, beyond_tide)
+
+    def __len__(self):
+        return len(self.vessel_id)
+
+    def nbytes(self) -> int:
+        return self.vessel_id.nbytes + self.berth_id.nbytes + self.start.nbytes + self.end.nbytes + self.unplaced.nbytes + self.beyond_tide.nbytes
+
+    def _unplaced_json(self) -> str:
+        # only when there are any, so a complete plan keeps its body
+        return "".join(f', "{key}": [{", ".join(ids.astype(str).tolist())}]'
+                       for key, ids in (("unplaced", self.unplaced), ("beyond_tide_data", self.beyond_tide)) if len(ids))
+
+    def plan_json(self) -> bytes:
+        """The GET /plan body, {"schedule": [...]} plus "unplaced" and "beyond_tide_data" vessel ids if any."""
+        if len(self) == 0:
+            return ('{"schedule": []' + self._unplaced_json() + "}").encode()
+        start, end = iso_strings(self.start), iso_strings(self.end)
+        arrival = iso_strings(self.start - ARRIVAL_LEAD)
+        parts = [
+            '{"vessel_id": ', self.vessel_id.astype(str), ', "start_time": ', start, ', "end_time": ', end,
+            ', "berth_id": ', self.berth_id.astype(str), ', "actual_arrival_time": ', arrival,
+            ', "actual_start_time": ', start, ', "actual_end_time": ', end, '}',
+        ]
+        rows = parts[0]
+        for part in parts[1:]:
+            rows = np.char.add(rows, part)
+        return ('{"schedule": [' + ", ".join(rows.tolist()) + "]" + self._unplaced_json() + "}").encode()
+
+    def __repr__(self):
+        return f"ScheduleFrame(entries={len(self)})"
@@ -1,21 +1,43 @@
 from .models import Vessel, Berth
+from .berth_calendar import BerthAvailability
+from .tide_windows import TideWindows
+from .weather_index import WEATHER_DELAYS, WeatherTimeline
 from datetime import datetime, timedelta
+from itertools import repeat
 import random
+import numpy as np
 
 def parse_time(ts):
     if isinstance(ts, str):
         return datetime.fromisoformat(ts)
     return ts
 
-def simulate_arrival(eta, weather):
+def simulate_arrival(eta, weather, rng=random):
     delay = 0
-    if weather == "storm":
-        delay = random.randint(20, 60)  # minutes
-    elif weather == "wind":
-        delay = random.randint(10, 30)
+    if weather in WEATHER_DELAYS:
+        delay = rng.randint(*WEATHER_DELAYS[weather])
     return parse_time(eta) + timedelta(minutes=delay), delay
 
-def simulate_vessel_event(vessel, berth_plan, berth_info, weather):
+def wait_to_dock(berth, depth, draft, duration, not_before, availability=None):
+    """(docking start, minutes waiting for water, minutes waiting for the berth to reopen, rejection status).
+
+    The stay must fit where the berth is open and the water deep enough, one
+    BerthAvailability lookup. Time until the berth alone could take the stay
+    counts as the maintenance wait, the rest of the wait as the tide's.
+    """
+    if availability is None:
+        return not_before, 0.0, 0.0, None
+    calendar = availability.calendar
+    reopens = calendar.first_fit(berth, not_before, duration) if calendar is not None else not_before
+    if reopens is None:
+        return None, 0.0, 0.0, "berth_unavailable"
+    start = availability.first_fit(berth, depth, draft, not_before, duration)
+    if start is None:
+        return None, 0.0, 0.0, "rejected_depth_too_shallow"
+    closed_wait = (reopens - not_before) / timedelta(minutes=1)
+    return start, (start - not_before) / timedelta(minutes=1) - closed_wait, closed_wait, None
+
+def simulate_vessel_event(vessel, berth_plan, berth_info, weather, rng=random, availability=None):
     vessel_id = vessel["id"]
     eta = parse_time(vessel["eta"])
     etd = parse_time(vessel["etd"])
@@ -34,8 +56,9 @@ def simulate_vessel_event(vessel, berth_plan, berth_info, weather):
     if not berth_data:
         return {"vessel_id": vessel_id, "status": "invalid_berth"}
 
-    # Check berth depth compatibility
-    if draft > berth_data["depth"]:
+    # Check berth depth compatibility; with tide windows that waits for the water instead
+    tide = availability.tide if availability is not None else None
+    if tide is None and draft > berth_data["depth"]:
         return {
             "vessel_id": vessel_id,
             "status": "rejected_depth_too_shallow",
@@ -43,7 +66,7 @@ def simulate_vessel_event(vessel, berth_plan, berth_info, weather):
         }
 
     # Simulate delay due to weather
-    actual_arrival, delay = simulate_arrival(eta, weather)
+    actual_arrival, delay = simulate_arrival(eta, weather, rng)
 
     # Calculate whether vessel is late for slot
     if actual_arrival > plan_end:
@@ -57,11 +80,18 @@ def simulate_vessel_event(vessel, berth_plan, berth_info, weather):
         }
 
     # Adjusted docking start if late
-    docking_start = max(actual_arrival, plan_start)
     docking_duration = (plan_end - plan_start)
+    docking_start, tide_wait, closed_wait, rejected = wait_to_dock(
+        berth, berth_data["depth"], draft, docking_duration, max(actual_arrival, plan_start), availability)
+    if rejected:
+        return {
+            "vessel_id": vessel_id,
+            "status": rejected,
+            "berth": berth
+        }
     docking_end = docking_start + docking_duration
 
-    return {
+    result = {
         "vessel_id": vessel_id,
         "status": "docked",
         "berth": berth,
@@ -71,9 +101,155 @@ def simulate_vessel_event(vessel, berth_plan, berth_info, weather):
         "actual_end": docking_end,
         "delay_minutes": delay
     }
+    if tide is not None:
+        result["tide_wait_minutes"] = tide_wait
+    if availability is not None and availability.calendar is not None:
+        result["maintenance_wait_minutes"] = closed_wait
+    return result
+
+def as_timeline(weather):
+    # `weather` is one condition for every vessel, or a WeatherTimeline / hourly Weather rows
+    if isinstance(weather, str) or weather is None:
+        return None
+    return weather if isinstance(weather, WeatherTimeline) else WeatherTimeline(weather)
+
+def vessel_conditions(vessels, weather):
+    # a timeline is read as-of each vessel's eta, in one lookup
+    timeline = as_timeline(weather)
+    if timeline is None:
+        return vessels, repeat(weather)
+    vessels = list(vessels)
+    return vessels, timeline.delay_conditions([parse_time(v["eta"]) for v in vessels]).tolist()
+
+def berth_availability(timeline, calendar):
+    # None when nothing but the plan decides when a vessel docks
+    if timeline is None and calendar is None:
+        return None
+    return BerthAvailability(TideWindows(timeline) if timeline is not None else None, calendar)
+
+def iter_simulate_schedule(vessels, berth_plan, berth_info, weather="calm", rng=random, calendar=None):
+    # one result at a time, for callers streaming vessels in from a cursor
+    # recorded weather brings its tide along, and a vessel waits for enough water;
+    # with a BerthCalendar keyed by berth name it also waits out maintenance
+    timeline = as_timeline(weather)
+    availability = berth_availability(timeline, calendar)
+    vessels, conditions = vessel_conditions(vessels, timeline if timeline is not None else weather)
+    for v, condition in zip(vessels, conditions):
+        yield simulate_vessel_event(v, berth_plan, berth_info, condition, rng, availability)
+
+def simulate_schedule(vessels, berth_plan, berth_info, weather="calm", calendar=None):
+    return list(iter_simulate_schedule(vessels, berth_plan, berth_info, weather, calendar=calendar))
+
+def _plan_arrays(vessels, berth_plan, berth_info, tide=None):
+    # split vessels into the ones we can simulate and the deterministic outcomes; with
+    # tide windows a vessel is only rejected when no tide from its slot on fits its stay,
+    # as in simulate_vessel_event
+    rows, kept, fixed = [], [], []
+    for i, v in enumerate(vessels):
+        plan = berth_plan.get(v["id"])
+        if not plan:
+            fixed.append({"vessel_id": v["id"], "status": "no_plan"})
+            continue
+        berth_data = berth_info.get(plan["berth"])
+        if not berth_data:
+            fixed.append({"vessel_id": v["id"], "status": "invalid_berth"})
+            continue
+        plan_start, plan_end = parse_time(plan["start_time"]), parse_time(plan["end_time"])
+        if (v["draft"] > berth_data["depth"] if tide is None else
+                tide.next_navigable(berth_data["depth"], v["draft"], plan_start, plan_end - plan_start) is None):
+            fixed.append({"vessel_id": v["id"], "status": "rejected_depth_too_shallow", "berth": plan["berth"]})
+            continue
+        rows.append((v["id"], plan["berth"], parse_time(v["eta"]), plan_start, plan_end))
+        kept.append(i)
+    ids = [r[0] for r in rows]
+    berths = [r[1] for r in rows]
+    eta = np.array([r[2] for r in rows], dtype="datetime64[s]")
+    start = np.array([r[3] for r in rows], dtype="datetime64[s]")
+    end = np.array([r[4] for r in rows], dtype="datetime64[s]")
+    return ids, berths, eta, start, end, kept, fixed
+
+def _delay_bounds(weather, eta, kept):
+    # one weather string for the whole run, a WeatherTimeline read at each eta, or one
+    # condition per input vessel, of which only the simulated ones (`kept`) are used
+    n = len(eta)
+    if isinstance(weather, WeatherTimeline):
+        conditions = weather.delay_conditions(eta).tolist() if n else []
+    elif isinstance(weather, str) or weather is None:
+        conditions = [weather] * n
+    else:
+        weather = list(weather)
+        conditions = [weather[i] for i in kept]
+    bounds = np.array([WEATHER_DELAYS.get(c, (0, 0)) for c in conditions], dtype=np.int64).reshape(n, 2)
+    return bounds[:, 0], bounds[:, 1]
+
+def _quantiles(counts, qs):
+    # per-row quantile indices of a histogram (rows with no mass return 0)
+    cum = np.cumsum(counts, axis=1)
+    total = cum[:, -1:]
+    return {q: (cum >= np.maximum(q * total, 1)).argmax(axis=1) for q in qs}
+
+def simulate_schedule_batch(vessels, berth_plan, berth_info, weather="calm", replications=1000,
+                            seed=None, max_cells=2_000_000):
+    # a WeatherTimeline brings its tide along; docking times are still read off the planned
+    # slots, which the planner already fitted into a tide window
+    tide = TideWindows(weather) if isinstance(weather, WeatherTimeline) else None
+    ids, berths, eta, start, end, kept, fixed = _plan_arrays(vessels, berth_plan, berth_info, tide)
+    n = len(ids)
+    lo, hi = _delay_bounds(weather, eta, kept)
+    span = int((hi - lo).max()) + 1 if n else 1
+
+    # counts[v, d] = replications where vessel v was delayed by lo[v] + d minutes;
+    # docking start is a monotone function of the delay, so this histogram is
+    # the whole distribution and memory stays O(vessels x delay range)
+    counts = np.zeros(n * span, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    chunk = max(1, min(replications, max_cells // max(n, 1)))
+    done = 0
+    while done < replications and n:
+        size = min(chunk, replications - done)
+        offsets = np.floor(rng.random((size, n)) * (hi - lo + 1)).astype(np.int64)
+        counts += np.bincount((np.arange(n) * span + offsets).ravel(), minlength=n * span)
+        done += size
+    counts = counts.reshape(n, span)
+
+    delays = lo[:, None] + np.arange(span)[None, :]
+    valid = delays <= hi[:, None]
+    arrival = eta[:, None] + (delays * 60).astype("timedelta64[s]")
+    missed = (arrival > end[:, None]) & valid
+    docked_counts = np.where(missed | ~valid, 0, counts)
+    docking = np.maximum(arrival, start[:, None])
+
+    miss_rate = (counts * missed).sum(axis=1) / replications
+    docked = docked_counts.sum(axis=1)
+    offset_s = (docking - start[:, None]).astype(np.int64)
+    mean_offset = (docked_counts * offset_s).sum(axis=1) / np.maximum(docked, 1)
+    mean_delay = (counts * delays).sum(axis=1) / replications
+    q = _quantiles(docked_counts, (0.5, 0.9))
+
+    results = []
+    rows = np.arange(n)
+    p50 = docking[rows, q[0.5]].astype(datetime)
+    p90 = docking[rows, q[0.9]].astype(datetime)
+    for i, vessel_id in enumerate(ids):
+        results.append({
+            "vessel_id": vessel_id,
+            "status": "simulated",
+            "berth": berths[i],
+            "scheduled_start": start[i].astype(datetime),
+            "scheduled_end": end[i].astype(datetime),
+            "miss_rate": float(miss_rate[i]),
+            "mean_delay_minutes": float(mean_delay[i]),
+            "docking_start_mean": (start[i] + np.timedelta64(int(round(mean_offset[i])), "s")).astype(datetime) if docked[i] else None,
+            "docking_start_p50": p50[i] if docked[i] else None,
+            "docking_start_p90": p90[i] if docked[i] else None,
+        })
+
+    per_berth = {}
+    for i, berth in enumerate(berths):
+        stats = per_berth.setdefault(berth, {"vessels": 0, "miss_rate": 0.0})
+        stats["vessels"] += 1
+        stats["miss_rate"] += float(miss_rate[i])
+    for stats in per_berth.values():
+        stats["miss_rate"] /= stats["vessels"]
 
-def simulate_schedule(vessels, berth_plan, berth_info, weather="calm"):
-    return [
-        simulate_vessel_event(v, berth_plan, berth_info, weather)
-        for v in vessels
-    ]
+    return {"replications": replications, "vessels": results + fixed, "berths": per_berth}
@@ -0,0 +1,90 @@
+import datetime
+import math
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.intervals import MICROS_PER_SECOND, MICROSECOND, OPEN_END, OPEN_START, IntervalSet
+from app.weather_index import WeatherTimeline
+
+TIDE_SAFETY_MARGIN = float(os.getenv("TIDE_SAFETY_MARGIN_M", "0.5"))  # under-keel clearance kept at any tide
+# required tide is rounded up to this step: each level is one set of windows per berth, so the step bounds them
+TIDE_LEVEL_STEP = float(os.getenv("TIDE_LEVEL_STEP_M", "0.05"))
+
+
+class TideWindows:
+    """When a vessel has enough water at a berth: depth + tide >= draft + margin.
+
+    That is the tide being at least `draft + margin - depth`, so windows are
+    built per required tide level, once, as an IntervalSet, and shared by
+    every vessel/berth pair needing that level. A reading holds until the
+    next one; before the first and from the last reading on the tide is
+    unknown, so only a vessel drawing no more than the depth may berth
+    there, as without a timeline.
+    """
+
+    def __init__(self, timeline: WeatherTimeline, margin: float = TIDE_SAFETY_MARGIN, step: float = TIDE_LEVEL_STEP):
+        self.timestamps = timeline.timestamps * MICROS_PER_SECOND
+        self.tide = timeline.tide
+        self.margin = margin
+        self.step = step
+        self.low = float(self.tide.min()) if len(self.tide) else 0.0
+        self.high = float(self.tide.max()) if len(self.tide) else 0.0
+        # the level a vessel drawing exactly the depth needs: the static check outside the readings
+        self.static = self.required_tide(0.0, 0.0)
+        self.levels: Dict[float, IntervalSet] = {}
+
+    def required_tide(self, depth: float, draft: float) -> float:
+        # rounded up to the step: errs on the safe side and keeps the number of cached levels small
+        return round(math.ceil(round((draft + self.margin - depth) / self.step, 6)) * self.step, 6)
+
+    def level(self, depth: Optional[float], draft: Optional[float]) -> Optional[float]:
+        # None when any tide will do: no depth on record, or enough water at the lowest reading and without one
+        if depth is None or draft is None or not math.isfinite(depth):
+            return None
+        level = self.required_tide(depth, draft)
+        if level <= self.static and (len(self.tide) == 0 or level <= self.low):
+            return None
+        return level
+
+    def windows(self, level: float) -> IntervalSet:
+        cached = self.levels.get(level)
+        if cached is not None:
+            return cached
+        if level > self.high and level > self.static:
+            return IntervalSet()
+        # reading i holds over [t_i, t_i+1); touching stretches are merged by IntervalSet
+        ok = np.flatnonzero(self.tide[:-1] >= level)
+        starts, ends = self.timestamps[ok], self.timestamps[ok + 1]
+        if level <= self.static and len(self.timestamps):
+            starts = np.concatenate([[OPEN_START], starts, self.timestamps[-1:]])
+            ends = np.concatenate([self.timestamps[:1], ends, [OPEN_END]])
+        self.levels[level] = windows = IntervalSet(starts, ends)
+        return windows
+
+    def navigable(self, depth: Optional[float], draft: Optional[float]) -> IntervalSet:
+        level = self.level(depth, draft)
+        return IntervalSet.everything() if level is None else self.windows(level)
+
+    def ever_navigable(self, depth: Optional[float], draft: Optional[float],
+                       duration: datetime.timedelta = datetime.timedelta()) -> bool:
+        # somewhere in (or outside) the readings there is enough water for `duration`
+        level = self.level(depth, draft)
+        return level is None or self.windows(level).first_at_least(0, duration // MICROSECOND) is not None
+
+    def needs_readings(self, depth: Optional[float], draft: Optional[float]) -> bool:
+        # more water than the depth alone gives: only a reading can allow it, so none can past the last one
+        level = self.level(depth, draft)
+        return level is not None and level > self.static
+
+    def next_navigable(self, depth: Optional[float], draft: Optional[float], not_before: datetime.datetime,
+                       duration: datetime.timedelta = datetime.timedelta()) -> Optional[datetime.datetime]:
+        """Earliest time from `not_before` on with enough water for `duration`, None if the tide never allows it."""
+        level = self.level(depth, draft)
+        if level is None:
+            return not_before
+        return self.windows(level).next_fit(not_before, duration)
+
+    def __repr__(self):
+        return f"TideWindows(readings={len(self.tide)}, margin={self.margin}, levels={len(self.levels)})"
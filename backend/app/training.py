@@ -0,0 +1,136 @@
+import asyncio
+import datetime
+import os
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.async_db import AsyncSessionLocal
+from app.models import PredictionLog
+from app.plan_cache import plan_cache
+
+TRAINING_WINDOW = float(os.getenv("TRAINING_WINDOW", "2"))  # seconds of fixes folded into one retrain
+TRAINING_JOBS_KEPT = int(os.getenv("TRAINING_JOBS_KEPT", "1000"))  # finished jobs kept for status lookups
+
+
+class TrainingJob:
+    def __init__(self, actual_id: int, model, fixes: list):
+        self.id = uuid.uuid4().hex
+        self.actual_id = actual_id
+        self.model = model
+        self.fixes = fixes
+        self.fix_count = len(fixes)
+        self.status = "queued"
+        self.mse: Optional[float] = None
+        self.error: Optional[str] = None
+        self.batch_size = 0
+        self.created_at = datetime.datetime.now()
+        self.finished_at: Optional[datetime.datetime] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "actual_id": self.actual_id,
+            "status": self.status,
+            "fixes": self.fix_count,
+            "batch_size": self.batch_size,
+            "mse": self.mse,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    def __repr__(self):
+        return f"TrainingJob(id='{self.id}', actual_id={self.actual_id}, status='{self.status}')"
+
+
+async def write_logs(actual_ids: List[int], mse: float):
+    # one session for the whole batch
+    async with AsyncSessionLocal() as db:
+        now = datetime.datetime.now()
+        for actual_id in actual_ids:
+            db.add(PredictionLog(error=mse, actual_id=actual_id, timestamp=now))
+        await db.commit()
+
+
+class TrainingWorker:
+    """Retrains planner models off the request path, one fit per window of fixes."""
+
+    def __init__(self, window: float = TRAINING_WINDOW, jobs_kept: int = TRAINING_JOBS_KEPT, log=write_logs,
+                 invalidate=plan_cache.invalidate):
+        self.window = window
+        self.log = log
+        # planned strategies use the learned berth times, so cached plans go stale with every fit
+        self.invalidate = invalidate
+        self.jobs_kept = jobs_kept
+        self.jobs: Dict[str, TrainingJob] = OrderedDict()
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def submit(self, actual_id: int, model, fixes: list) -> TrainingJob:
+        # called from a request handler, so there is a running loop to start on
+        if self.task is None or self.task.done():
+            self.queue = asyncio.Queue()
+            self.task = asyncio.get_running_loop().create_task(self.run())
+        job = TrainingJob(actual_id, model, fixes)
+        self.jobs[job.id] = job
+        while len(self.jobs) > self.jobs_kept:
+            self.jobs.popitem(last=False)
+        self.queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self.jobs.get(job_id)
+
+    async def next_batch(self) -> List[TrainingJob]:
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.next_batch()
+            for job in batch:
+                job.status = "running"
+                job.batch_size = len(batch)
+            # fixes against the same planner model share one fit
+            by_model = OrderedDict()
+            for job in batch:
+                by_model.setdefault(id(job.model), []).append(job)
+            for jobs in by_model.values():
+                await self.train(loop, jobs)
+
+    async def train(self, loop, jobs: List[TrainingJob]):
+        fixes = [fix for job in jobs for fix in job.fixes]
+        try:
+            mse = await loop.run_in_executor(None, jobs[0].model.retrain, fixes)
+            # right after the swap: this also moves the cache generation on, so a plan
+            # built with the old model while we trained is served but not cached
+            self.invalidate()
+            await self.log(list(dict.fromkeys(job.actual_id for job in jobs)), mse)
+        except Exception as e:
+            for job in jobs:
+                job.status, job.error = "failed", str(e)
+        else:
+            for job in jobs:
+                job.status, job.mse = "done", mse
+        for job in jobs:
+            # the status outlives the job, the planner objects don't need to
+            job.finished_at = datetime.datetime.now()
+            job.model, job.fixes = None, []
+
+    def __repr__(self):
+        return f"TrainingWorker(window={self.window}, jobs={len(self.jobs)})"
+
+
+training_worker = TrainingWorker()
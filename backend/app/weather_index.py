@@ -0,0 +1,70 @@
+from typing import Sequence
+
+import numpy as np
+
+from app.intervals import as_seconds
+
+# arrival delay range in minutes per weather condition
+WEATHER_DELAYS = {
+    "storm": (20, 60),
+    "wind": (10, 30),
+}
+# wind strong enough to slow an approach even without a storm
+WIND_DELAY_KNOTS = 20
+
+
+class WeatherTimeline:
+    """Weather readings as sorted arrays; every lookup is as-of, for a whole batch of timestamps at once.
+
+    A timestamp before the first reading gets the first reading. With no
+    readings at all, conditions are "" (no delay), wind and tide are 0.
+    """
+
+    def __init__(self, rows: Sequence = ()):
+        rows = sorted(rows, key=lambda r: r.timestamp)
+        self.timestamps = as_seconds([r.timestamp for r in rows]) if rows else np.zeros(0, dtype=np.int64)
+        # a reading without wind or tide (None, or not recorded by the feed) counts as 0
+        self.wind = np.nan_to_num(np.array([getattr(r, "wind_speed_knots", None) for r in rows], dtype=float))
+        self.tide = np.nan_to_num(np.array([getattr(r, "tide_height_m", None) for r in rows], dtype=float))
+        # one small label table, one int code per reading
+        labels, self.codes = np.unique(np.array([(r.condition or "").upper() for r in rows], dtype=object),
+                                       return_inverse=True)
+        self.labels = labels.astype(str) if len(labels) else np.array([""])
+        # the delay condition only depends on the reading, so it is worked out once here
+        lowered = np.char.lower(self.labels)[self.codes]
+        windy = ~np.isin(lowered, list(WEATHER_DELAYS)) & (self.wind >= WIND_DELAY_KNOTS)
+        self.delays = np.where(windy, "wind", lowered)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def index(self, ts) -> np.ndarray:
+        i = np.searchsorted(self.timestamps, as_seconds(ts), side="right") - 1
+        return np.clip(i, 0, None)
+
+    def conditions(self, ts) -> np.ndarray:
+        if len(self) == 0:
+            return np.full(len(as_seconds(ts)), "", dtype=object)
+        return self.labels[self.codes[self.index(ts)]]
+
+    def wind_at(self, ts) -> np.ndarray:
+        if len(self) == 0:
+            return np.zeros(len(as_seconds(ts)))
+        return self.wind[self.index(ts)]
+
+    def tide_at(self, ts) -> np.ndarray:
+        if len(self) == 0:
+            return np.zeros(len(as_seconds(ts)))
+        return self.tide[self.index(ts)]
+
+    def delay_conditions(self, ts) -> np.ndarray:
+        # keys of WEATHER_DELAYS (anything else means no delay) at each timestamp
+        if len(self) == 0:
+            return np.full(len(as_seconds(ts)), "")
+        return self.delays[self.index(ts)]
+
+    def condition_at(self, ts) -> str:
+        return str(self.delay_conditions(ts)[0]) if len(self) else "calm"
+
+    def __repr__(self):
+        return f"WeatherTimeline(readings={len(self)})"
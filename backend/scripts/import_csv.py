@@ -0,0 +1,22 @@
+import argparse
+import json
+import time
+from app.db import SessionLocal
+from app.importer import IMPORT_CHUNK, KINDS, import_csv
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk load a MOCK_VESSEL / MOCK_BERTH / MOCK_PLAN style csv")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("path")
+    parser.add_argument("--actual-id", type=int, default=None, help="batch to load vessels or a plan into")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK)
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    started = time.time()
+    try:
+        report = import_csv(args.path, args.kind, session, args.actual_id, args.chunk_size)
+    finally:
+        session.close()
+    print(json.dumps(report.to_dict(), indent=2))
+    print(f"✅ Loaded {report.loaded} {args.kind}, rejected {report.rejected} in {time.time() - started:.1f}s")
@@ -1,7 +1,8 @@
 import random
 from datetime import datetime, timedelta
 from app.db import SessionLocal
-from app.models import Weather, Berth, MaintenanceLog, Vessel, PredictionScheduleEntry
+from app.models import Weather, Berth, MaintenanceLog, Vessel, PredictionScheduleEntry, PlanVersion
+from app.crud import set_version
 
 VESSEL_TYPES = ["CONTAINER", "BULK", "RORO", "TANKER"]
 BERTH_NAMES = ["A2", "B3", "C4", "D5"]
@@ -130,5 +131,9 @@ if __name__ == "__main__":
     seed_schedule_entries(session, vessel_berth_pairs)
     session.commit()
 
+    for name in ("vessels", "schedule"):
+        set_version(session, session.get(PlanVersion, name), name, 1000)
+    session.commit()
+
     session.close()
     print("✅ All tables seeded with realistic and consistent data.")
\ No newline at end of file
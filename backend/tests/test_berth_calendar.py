@@ -0,0 +1,129 @@
+import datetime
+
+from app import planner
+from app.berth_calendar import BerthCalendar
+from app.discrete_event import simulate_schedule_events
+from app.intervals import OPEN_END, OPEN_START, IntervalSet
+from app.simulator import simulate_schedule
+from tests.test_planner import NOW, assert_no_overlaps, make_berth, make_vessel
+
+HOUR = datetime.timedelta(hours=1)
+
+
+def hours(*pairs):
+    return IntervalSet.from_times((NOW + a * HOUR, NOW + b * HOUR) for a, b in pairs)
+
+
+def test_interval_sets_merge_and_combine():
+    merged = hours((4, 6), (0, 2), (1, 3), (6, 7))
+    assert list(merged) == list(hours((0, 3), (4, 7)))
+    assert list(merged.union(hours((3, 4)))) == list(hours((0, 7)))
+    assert list(merged.subtract(hours((1, 5)))) == list(hours((0, 1), (5, 7)))
+    assert list(merged.intersect(hours((2, 5)))) == list(hours((2, 3), (4, 5)))
+    assert merged.subtract(IntervalSet()) is merged
+    assert len(IntervalSet.everything().subtract(IntervalSet.everything())) == 0
+
+    # open ends stay open
+    outage = IntervalSet.from_times([(NOW, None)])
+    assert outage.ends.tolist() == [OPEN_END]
+    assert list(IntervalSet.everything().subtract(outage)) == [(None, NOW)]
+    assert IntervalSet.everything().starts.tolist() == [OPEN_START]
+
+
+def test_first_fit_finds_the_first_long_enough_stretch():
+    available = hours((0, 1), (2, 3.5), (5, 9))
+    micros = HOUR // datetime.timedelta(microseconds=1)
+    t0 = available.starts[0]
+    assert available.first_fit(t0, micros) == t0
+    # 30 min into the first stretch only half an hour is left; the next one is long enough
+    assert available.first_fit(t0 + micros // 2, micros) == t0 + 2 * micros
+    assert available.first_fit(t0, 3 * micros) == t0 + 5 * micros
+    assert available.first_fit(t0, 5 * micros) is None
+    assert available.covers(t0 + 2 * micros, t0 + 3 * micros)
+    assert not available.covers(t0, t0 + 2 * micros)
+
+
+def test_calendar_merges_maintenance_outages_and_bookings():
+    calendar = BerthCalendar()
+    calendar.add_maintenance([(1, NOW + 2 * HOUR), (1, NOW + 6 * HOUR), (2, None)], duration=2 * HOUR)
+    calendar.add_outage(1, since=NOW + 12 * HOUR)
+
+    assert list(calendar.busy(1)) == list(hours((2, 4), (6, 8))) + [(NOW + 12 * HOUR, None)]
+    assert calendar.first_fit(1, NOW, 2 * HOUR) == NOW
+    assert calendar.first_fit(1, NOW + HOUR, 2 * HOUR) == NOW + 4 * HOUR
+    # with a booking from 4 to 5, the next two free hours are 8-10
+    assert calendar.first_fit(1, NOW + HOUR, 2 * HOUR, [(NOW + 4 * HOUR, NOW + 5 * HOUR)]) == NOW + 8 * HOUR
+    assert calendar.first_fit(1, NOW + 11 * HOUR, 2 * HOUR) is None
+    assert not calendar.is_open(1, NOW + 3 * HOUR, NOW + 5 * HOUR)
+    assert calendar.is_open(1, NOW + 4 * HOUR, NOW + 6 * HOUR)
+    # a berth without closures is always open
+    assert calendar.first_fit(2, NOW, 100 * HOUR) == NOW and calendar.is_open(3, NOW, NOW + HOUR)
+
+
+def test_planner_books_around_maintenance_and_outages():
+    berths = [make_berth(1), make_berth(2)]
+    calendar = BerthCalendar()
+    calendar.add_maintenance([(1, NOW + HOUR)], duration=3 * HOUR)
+    calendar.add_outage(2, until=NOW + 5 * HOUR)
+    vessels = [make_vessel(1, 0), make_vessel(2, 0), make_vessel(3, 0)]
+
+    schedule = planner.schedule_fcfs(berths, vessels, None, now=NOW, calendar=calendar)
+    starts = sorted((e.berth.id, e.start_time) for e in schedule.get_schedule())
+    # berth 1 is down 1-4, too soon for a 2 h call at 0; berth 2 opens at 5
+    assert starts == [(1, NOW + 4 * HOUR), (1, NOW + 6 * HOUR), (2, NOW + 5 * HOUR)]
+    assert_no_overlaps(schedule)
+
+    model = planner.Model(berths, vessels, None, calendar=calendar)
+    model.current = schedule
+    model.replan(planner.BerthOffline(1), now=NOW)
+    assert calendar.first_fit(1, NOW, HOUR) is None
+    assert all(e.berth.id == 2 for e in model.current.get_schedule())
+    assert_no_overlaps(model.current)
+
+
+def test_simulators_wait_for_the_berth_to_reopen():
+    calendar = BerthCalendar()
+    calendar.add_maintenance([("A", NOW + HOUR)], duration=2 * HOUR)
+    calendar.add_outage("B", since=NOW)
+    vessels = [{"id": 1, "eta": NOW, "etd": None, "draft": 10}, {"id": 2, "eta": NOW, "etd": None, "draft": 10}]
+    berth_plan = {1: {"berth": "A", "start_time": NOW, "end_time": NOW + 2 * HOUR},
+                  2: {"berth": "B", "start_time": NOW, "end_time": NOW + 2 * HOUR}}
+    berth_info = {"A": {"depth": 12}, "B": {"depth": 12}}
+
+    for results in (simulate_schedule(vessels, berth_plan, berth_info, calendar=calendar),
+                    simulate_schedule_events(vessels, berth_plan, berth_info, calendar=calendar)):
+        docked, closed = results
+        assert docked["status"] == "docked" and docked["actual_start"] == NOW + 3 * HOUR
+        assert docked["maintenance_wait_minutes"] == 180
+        assert closed["status"] == "berth_unavailable"
+    assert simulate_schedule_events(vessels, berth_plan, berth_info, calendar=calendar)[0]["knock_on_minutes"] == 0
+
+
+def test_availability_intersects_calendar_and_tide_for_the_whole_stay():
+    from types import SimpleNamespace
+    from app.berth_calendar import BerthAvailability
+    from app.tide_windows import TideWindows
+    from app.weather_index import WeatherTimeline
+
+    # 16 m deep berth, a 17 m draft needs 1.5 m of tide: there until 3, and unknown before the first reading
+    weather = WeatherTimeline([SimpleNamespace(timestamp=NOW + i * HOUR, condition="CLEAR", wind_speed_knots=5,
+                                               tide_height_m=h) for i, h in enumerate((1.6, 1.6, 1.6, 0.2))])
+    calendar = BerthCalendar()
+    calendar.add_maintenance([(1, NOW)], duration=HOUR)
+    availability = BerthAvailability(TideWindows(weather), calendar)
+
+    assert list(availability.periods(1, 16, 17)) == list(hours((1, 3)))
+    assert availability.periods(1, 16, 12) is calendar.open_periods(1)
+    assert availability.periods(2, 16, 12) is None
+    assert availability.first_fit(1, 16, 17, NOW, 2 * HOUR) == NOW + HOUR
+    # the water is gone before a 3 hour stay would end
+    assert availability.first_fit(1, 16, 17, NOW, 3 * HOUR) is None
+
+    deep = planner.Vessel(id=1, actual_id=1000, name="V1", type="CONTAINER", loa_m=300, beam_m=40, draft_m=17,
+                          eta=NOW, est_berth_time=2 * HOUR, dwt=80000)
+    schedule = planner.Schedule(availability=availability)
+    assert schedule.place(deep, [make_berth(1)], NOW).start_time == NOW + HOUR
+    assert schedule.place(deep, [make_berth(1)], NOW) is None
+    # a new outage is seen by the shared availability
+    calendar.add_outage(1, since=NOW)
+    assert availability.first_fit(1, 16, 12, NOW, HOUR) is None
@@ -0,0 +1,24 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.crud import bump_version, latest_version
+from app.models import Base
+
+
+def test_bump_version_upserts_and_only_moves_forward():
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine)() as db:
+            # the first write inserts the pointer, later ones update it in the same statement
+            await bump_version(db, "schedule", 3)
+            await bump_version(db, "schedule", 5)
+            await bump_version(db, "schedule", 4)
+            await db.commit()
+            version = await latest_version(db, "schedule")
+        await engine.dispose()
+        return version
+
+    assert asyncio.run(run()) == 5
@@ -0,0 +1,72 @@
+import asyncio
+
+from app.events import EventBroker
+
+
+def drain(subscriber):
+    messages = []
+    while not subscriber.queue.empty():
+        messages.append(subscriber.queue.get_nowait())
+    return messages
+
+
+def test_fan_out_to_every_subscriber_with_drop_oldest():
+    async def run():
+        broker = EventBroker()
+        first, second = broker.subscribe("vessels"), broker.subscribe("vessels")
+        other = broker.subscribe("plan")
+        for i in range(105):
+            broker.publish_local("vessels", f'{{"n": {i}}}')
+
+        assert drain(other) == []
+        for subscriber in (first, second):
+            messages = drain(subscriber)
+            assert len(messages) == 100 and subscriber.dropped == 5
+            assert messages[0] == 'data: {"n": 5}\nid: 6\n\n'
+        broker.unsubscribe(first)
+        assert broker.subscriber_count() == 2
+
+    asyncio.run(run())
+
+
+def test_resume_from_last_event_id():
+    async def run():
+        broker = EventBroker(history=3)
+        for i in range(5):
+            broker.publish_local("vessels", str(i))
+
+        resumed = broker.subscribe("vessels", last_event_id=3)
+        assert drain(resumed) == ["data: 3\nid: 4\n\n", "data: 4\nid: 5\n\n"]
+        assert resumed.dropped == 0
+        # events 2 and 3 fell out of the history
+        stale = broker.subscribe("vessels", last_event_id=1)
+        assert stale.dropped == 1 and len(drain(stale)) == 3
+
+    asyncio.run(run())
+
+
+def test_listener_reads_notified_events_from_the_table():
+    from sqlalchemy import insert
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.models import Base, StreamEvent
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            # a plan far past the ~8000 byte NOTIFY limit; only its id is ever notified
+            big = '{"entries": "' + "x" * 20000 + '"}'
+            await conn.execute(insert(StreamEvent), [{"channel": "plan", "data": big},
+                                                     {"channel": "vessels", "data": "{}"}])
+        broker = EventBroker()
+        subscriber = broker.subscribe("plan")
+        broker._on_notify(None, 0, "port_events", '{"id": 2}')
+        broker._on_notify(None, 0, "port_events", '{"id": 1}')
+        assert broker.wakeup.is_set()
+        async with engine.connect() as conn:
+            await broker.load(conn, StreamEvent.id.in_(broker.notified))
+        await engine.dispose()
+        return broker, drain(subscriber), big
+
+    broker, messages, big = asyncio.run(run())
+    assert messages == [f"data: {big}\nid: 1\n\n"] and broker.last_id == 2
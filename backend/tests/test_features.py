@@ -0,0 +1,85 @@
+import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+from app import features, planner
+
+NOW = datetime.datetime(2025, 5, 18, 0, 0)
+HOUR = datetime.timedelta(hours=1)
+
+
+def weather(hours, condition, wind, tide):
+    return SimpleNamespace(timestamp=NOW + hours * HOUR, condition=condition, wind_speed_knots=wind, tide_height_m=tide)
+
+
+def make_berth(id, depth_m=16, last_maintenance=None):
+    return planner.Berth(id=id, name=f"B{id}", depth_m=depth_m, max_loa=350, max_beam=50, max_draft=15,
+                         max_dwt=120000, allowed_types=("CONTAINER", "BULK"), last_maintenance=last_maintenance)
+
+
+def make_vessel(id, eta_hours, loa_m=300, type="CONTAINER"):
+    return planner.Vessel(id=id, actual_id=1000, name=f"V{id}", type=type, loa_m=loa_m, beam_m=40,
+                          draft_m=12, eta=NOW + eta_hours * HOUR,
+                          est_berth_time=datetime.timedelta(minutes=120), dwt=80000)
+
+
+def test_maintenance_age_uses_the_latest_record_of_that_berth():
+    maintenance = features.MaintenanceArrays([
+        ("B1", NOW - datetime.timedelta(days=10)),
+        ("B1", NOW - datetime.timedelta(days=2)),
+        ("B2", NOW - datetime.timedelta(days=1)),
+        ("B3", None),
+    ])
+    ts = features.as_seconds([NOW, NOW - datetime.timedelta(days=5), NOW, NOW, NOW - datetime.timedelta(days=3)])
+    ages = maintenance.age_days(["B1", "B1", "B2", "B3", "B2"], ts)
+
+    unknown = features.MAINTENANCE_AGE_UNKNOWN
+    # B2's only record is after the last timestamp, B1's records must not leak into it
+    assert ages.tolist() == [2, 5, 1, unknown, unknown]
+
+
+def test_berth_times_come_back_per_vessel_and_berth():
+    vessels = [make_vessel(1, 0, loa_m=200), make_vessel(2, 1, loa_m=300), make_vessel(3, 2, loa_m=250)]
+    berths = [make_berth(1, depth_m=12), make_berth(2, depth_m=18)]
+
+    # berth time grows with the vessel length and shrinks with the depth of the berth
+    rng = np.random.default_rng(0)
+    loa, depth = rng.uniform(150, 350, 200), rng.uniform(10, 20, 200)
+    X = np.zeros((200, len(features.FEATURE_NAMES)))
+    X[:, features.FEATURE_NAMES.index("loa_m")] = loa
+    X[:, features.FEATURE_NAMES.index("depth_m")] = depth
+    model = features.BerthTimeModel()
+    assert model.fit(X, 2 * loa - 10 * depth) < 1e-6
+
+    times = features.predict_berth_times(model, vessels, berths, [weather(0, "CLEAR", 10, 0.5)])
+    assert times.shape == (3, 2)
+    np.testing.assert_allclose(times, [[280, 220], [480, 420], [380, 320]], atol=1e-6)
+    assert planner.predict_berth_time(model, berths[1], vessels[0]) == times[0, 1]
+    assert features.predict_berth_times(model, [], berths).shape == (0, 2)
+
+
+def test_fcfs_books_each_vessel_for_its_predicted_berth_time():
+    vessels = [make_vessel(1, 0), make_vessel(2, 0)]
+    berths = [make_berth(1), make_berth(2)]
+    # vessel 1 is quicker at berth 2; vessel 2 has no usable prediction there, so it
+    # would wait an hour for it and stay its own 2 hour estimate: berth 1 sees it off sooner
+    minutes = np.array([[180.0, 60.0], [90.0, 0.0]])
+    berth_times = planner.BerthTimes(minutes, vessels, berths)
+
+    schedule = planner.schedule_fcfs(berths, vessels, None, now=NOW, berth_times=berth_times)
+    spans = {e.vessel.id: (e.berth.id, e.start_time, e.end_time - e.start_time) for e in schedule.get_schedule()}
+    assert spans[1] == (2, NOW, datetime.timedelta(minutes=60))
+    assert spans[2] == (1, NOW, datetime.timedelta(minutes=90))
+
+    # berth 2 is free at once, but vessel 2 leaves sooner by waiting for the quick berth 1
+    quick = planner.BerthTimes(np.array([[60.0, 120.0], [30.0, 120.0]]), vessels, berths)
+    schedule = planner.schedule_fcfs(berths, vessels, None, now=NOW, berth_times=quick)
+    assert schedule.entry_for(2).berth.id == 1
+    assert schedule.entry_for(2).start_time == NOW + datetime.timedelta(minutes=60)
+
+
+def test_a_fitted_berth_time_model_outlives_the_planner_model(monkeypatch):
+    fitted = features.BerthTimeModel()
+    monkeypatch.setattr(planner, "berth_time_model", fitted)
+    assert planner.Model([make_berth(1)], [make_vessel(1, 0)], None).berth_time_model is fitted
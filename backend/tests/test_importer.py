@@ -0,0 +1,102 @@
+import datetime
+import io
+
+import pandas as pd
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.importer import first_failure, import_csv, timestamps
+from app.models import Base, PlanVersion, PredictionScheduleEntry, Vessel
+
+
+def test_timestamps_accept_feed_formats():
+    parsed = timestamps(pd.Series(["2025-03-30T09:30:43Z", "2024-12-02 05:09:51", "4/22/2025", "soon", None]),
+                        "%m/%d/%Y")
+    assert parsed[0] == pd.Timestamp("2025-03-30 09:30:43")
+    assert parsed[1] == pd.Timestamp("2024-12-02 05:09:51")
+    assert parsed[2] == pd.Timestamp("2025-04-22")
+    assert parsed[3:].isna().all()
+
+
+def test_first_failure_reports_earliest_check():
+    values = pd.Series([1.0, -2.0, None, 5.0])
+    reasons = first_failure(values.index, [
+        (values.isna(), "missing"),
+        (values < 0, "negative"),
+        (values > 4, "too large"),
+    ])
+    assert reasons.tolist()[1:] == ["negative", "missing", "too large"]
+    assert pd.isna(reasons[0])
+
+
+VESSELS_CSV = """id,imo,type,loa_m,beam_m,draft_m,eta
+1,7483128,container,200,32,11.5,2025-03-30T09:30:43Z
+2,9191786,BULK,-5,30,10,2025-03-31 10:00:00
+3,,TANKER,180,28,9.8,2025-04-01 12:00:00
+"""
+
+BERTHS_CSV = """berthId,depth_m,maxLOA_m,maxBeam_m,maxDraft_m,maxDWT_t,allowedTypes,lastMaintenance
+A1,15,350,50,14,120000,CONTAINER,4/22/2025
+"""
+
+PLAN_CSV = """vesselId,berthId,start,end
+1,A1,2025-03-30 10:00:00,2025-03-30 14:00:00
+3,Z9,2025-04-01 12:00:00,2025-04-01 16:00:00
+"""
+
+
+def test_import_csv_loads_good_rows_and_reports_bad_ones():
+    # sqlite takes the executemany path; Postgres would COPY the same frames
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        vessels = import_csv(io.StringIO(VESSELS_CSV), "vessels", session, chunk_size=2)
+        assert (vessels.loaded, vessels.rejected, vessels.actual_id) == (2, 1, 1)
+        assert vessels.errors == [{"line": 3, "reason": "invalid loa_m"}]
+
+        stored = session.execute(select(Vessel.source_id, Vessel.name, Vessel.type, Vessel.eta).order_by(Vessel.id)).all()
+        assert [tuple(row) for row in stored] == [
+            (1, "IMO 7483128", "CONTAINER", datetime.datetime(2025, 3, 30, 9, 30, 43)),
+            (3, "", "TANKER", datetime.datetime(2025, 4, 1, 12, 0)),
+        ]
+        assert session.get(PlanVersion, "vessels").actual_id == 1
+
+        berths = import_csv(io.StringIO(BERTHS_CSV), "berths", session)
+        assert (berths.loaded, berths.rejected) == (1, 0)
+        plan = import_csv(io.StringIO(PLAN_CSV), "plan", session)
+        assert (plan.loaded, plan.rejected) == (1, 1)
+        assert plan.errors == [{"line": 3, "reason": "unknown berthId"}]
+        assert session.execute(select(func.count()).select_from(PredictionScheduleEntry)).scalar() == 1
+        assert session.get(PlanVersion, "schedule").actual_id == plan.actual_id == 2
+
+
+VESSELS_WITH_EXTRAS_CSV = """id,imo,type,loa_m,beam_m,draft_m,dwt_t,ebt,eta
+1,7483128,container,200,32,11.5,52000,240,2025-03-30T09:30:43Z
+2,9191786,BULK,190,30,10,heavy,300,2025-03-31 10:00:00
+3,,TANKER,180,28,9.8,,90.5,2025-04-01 12:00:00
+4,,TANKER,180,28,9.8,,,2025-04-01 13:00:00
+"""
+
+
+def test_reimporting_a_feed_makes_a_new_batch_and_plans_follow_it():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        first = import_csv(io.StringIO(VESSELS_WITH_EXTRAS_CSV), "vessels", session)
+        assert (first.loaded, first.rejected) == (2, 2)
+        assert first.errors == [{"line": 3, "reason": "invalid dwt_t"}, {"line": 4, "reason": "invalid ebt"}]
+        stored = session.execute(select(Vessel.source_id, Vessel.dwt_t, Vessel.ebt).order_by(Vessel.id)).all()
+        assert [tuple(row) for row in stored] == [(1, 52000.0, 240), (4, None, None)]
+
+        # the same file ids again: a second batch, with ids of its own
+        second = import_csv(io.StringIO(VESSELS_WITH_EXTRAS_CSV), "vessels", session)
+        assert (second.loaded, second.actual_id) == (2, 2)
+        assert session.execute(select(func.count()).select_from(Vessel)).scalar() == 4
+
+        import_csv(io.StringIO(BERTHS_CSV), "berths", session)
+        plan = import_csv(io.StringIO(PLAN_CSV.replace("Z9", "A1")), "plan", session)
+        assert (plan.loaded, plan.rejected) == (1, 1)
+        assert plan.errors == [{"line": 3, "reason": "unknown vesselId"}]
+        planned = session.execute(select(PredictionScheduleEntry.vessel_id)).scalar_one()
+        assert session.get(Vessel, planned).actual_id == second.actual_id
+        assert session.get(Vessel, planned).source_id == 1
@@ -0,0 +1,15 @@
+import datetime
+
+from app.loader import WEATHER_HORIZON_PAD, planning_horizon
+from tests.test_planner import NOW, make_vessel
+
+
+def test_horizon_spans_the_etas_still_ahead():
+    vessels = [make_vessel(1, 5), make_vessel(2, 30)]
+    assert planning_horizon(vessels, now=NOW) == (NOW + datetime.timedelta(hours=5),
+                                                  NOW + datetime.timedelta(hours=30) + WEATHER_HORIZON_PAD)
+
+    # vessels already due are planned from now on
+    later = NOW + datetime.timedelta(hours=10)
+    assert planning_horizon(vessels, now=later)[0] == later
+    assert planning_horizon([], now=NOW) == (NOW, NOW + WEATHER_HORIZON_PAD)
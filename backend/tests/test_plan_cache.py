@@ -0,0 +1,44 @@
+import time
+
+from app.plan_cache import PlanCache, etag_matches
+
+
+def test_lru_eviction_and_invalidation():
+    cache = PlanCache(max_size=2)
+    etag, _ = cache.put((1, "stored", 1.0), b'{"schedule": []}')
+    cache.put((2, "fcfs", 1.0), b"{}")
+    assert cache.get((1, "stored", 1.0)) == (etag, b'{"schedule": []}')
+    cache.put((3, "fcfs", 1.0), b"{}")
+    # (2, ...) was least recently used
+    assert cache.get((2, "fcfs", 1.0)) is None
+    assert len(cache) == 2
+
+    cache.invalidate(1)
+    assert cache.get((1, "stored", 1.0)) is None
+    assert cache.get((3, "fcfs", 1.0)) is not None
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_put_skipped_when_invalidated_while_computing():
+    cache = PlanCache()
+    generation = cache.generation
+    cache.invalidate()
+    etag, body = cache.put((1, "stored", 1.0), b"{}", generation)
+    assert body == b"{}"
+    assert cache.get((1, "stored", 1.0)) is None
+
+
+def test_ttl_expiry():
+    cache = PlanCache(ttl=0.01)
+    cache.put((1, "stored", 1.0), b"{}")
+    assert cache.get((1, "stored", 1.0)) is not None
+    time.sleep(0.02)
+    assert cache.get((1, "stored", 1.0)) is None
+
+
+def test_etag_matching():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"c"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
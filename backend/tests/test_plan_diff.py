@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from app.plan_diff import PlanDiffer, diff_plans, index_rows, plan_row
+
+T0 = datetime(2025, 5, 18, 8, 0)
+
+
+def test_diff_sends_only_changed_fields():
+    old = index_rows([plan_row(1, 1, T0, T0 + timedelta(hours=2)),
+                      plan_row(2, 2, T0, T0 + timedelta(hours=3)),
+                      plan_row(3, 1, T0, T0 + timedelta(hours=1))])
+    new = index_rows([plan_row(1, 1, T0, T0 + timedelta(hours=2)),
+                      plan_row(2, 4, T0, T0 + timedelta(hours=3)),
+                      plan_row(4, 2, T0, T0 + timedelta(hours=1))])
+
+    diff = diff_plans(old, new)
+    assert diff["changed"] == [{"vessel_id": 2, "berth_id": 4}]
+    assert diff["added"] == [new[4]]
+    assert diff["removed"] == [3]
+
+
+def test_differ_interleaves_snapshots():
+    differ = PlanDiffer(snapshot_every=3)
+    kinds = []
+    # the persisted sequence decides, so any process numbering update 4 sends the same snapshot
+    for sequence in range(1, 8):
+        if differ.snapshot_due(sequence):
+            kinds.append(differ.snapshot(sequence, 1, [])["type"])
+        else:
+            kinds.append(differ.delta(sequence, 1, 1, {}, {})["type"])
+    assert kinds == ["snapshot", "delta", "delta", "snapshot", "delta", "delta", "snapshot"]
+    assert differ.delta(5, 1, 1, {}, {})["sequence"] == 5
@@ -0,0 +1,199 @@
+import datetime
+import random
+
+from app import planner
+from app.occupancy import BerthTimeline
+
+NOW = datetime.datetime(2025, 5, 18, 0, 0)
+
+
+def make_berth(id, allowed_types=("CONTAINER", "BULK")):
+    return planner.Berth(id=id, name=f"B{id}", depth_m=16, max_loa=350, max_beam=50, max_draft=15,
+                         max_dwt=120000, allowed_types=allowed_types, last_maintenance=None)
+
+
+def make_vessel(id, eta_hours, ebt_minutes=120, type="CONTAINER", draft_m=12):
+    return planner.Vessel(id=id, actual_id=1000, name=f"V{id}", type=type, loa_m=300, beam_m=40,
+                          draft_m=draft_m, eta=NOW + datetime.timedelta(hours=eta_hours),
+                          est_berth_time=datetime.timedelta(minutes=ebt_minutes), dwt=80000)
+
+
+def assert_no_overlaps(schedule):
+    by_berth = {}
+    for entry in schedule.get_schedule():
+        by_berth.setdefault(entry.berth.id, []).append(entry)
+    for entries in by_berth.values():
+        entries.sort(key=lambda e: e.start_time)
+        for a, b in zip(entries, entries[1:]):
+            assert a.end_time <= b.start_time
+
+
+def test_timeline_earliest_free_skips_busy_blocks():
+    timeline = BerthTimeline()
+    hour = datetime.timedelta(hours=1)
+    timeline.add(NOW, NOW + 2 * hour, "a")
+    timeline.add(NOW + 3 * hour, NOW + 4 * hour, "b")
+
+    assert timeline.earliest_free(NOW, hour) == NOW + 2 * hour
+    assert timeline.earliest_free(NOW, 2 * hour) == NOW + 4 * hour
+    assert timeline.overlaps(NOW + hour, NOW + 3 * hour)
+    assert not timeline.overlaps(NOW + 2 * hour, NOW + 3 * hour)
+
+    # overlapping bookings merge and split back apart on removal
+    timeline.add(NOW + hour, NOW + 3 * hour + hour // 2, "c")
+    assert timeline.earliest_free(NOW, hour) == NOW + 4 * hour
+    assert timeline.remove(NOW + hour, "c")
+    assert timeline.earliest_free(NOW, hour) == NOW + 2 * hour
+    assert len(timeline) == 2
+
+
+def test_fcfs_queues_vessels_on_shared_berth():
+    berths = [make_berth(1)]
+    vessels = [make_vessel(1, 0), make_vessel(2, 1), make_vessel(3, 10)]
+    schedule = planner.schedule_fcfs(berths, vessels, None, now=NOW)
+
+    starts = {e.vessel.id: e.start_time for e in schedule.get_schedule()}
+    assert starts[1] == NOW
+    assert starts[2] == NOW + datetime.timedelta(hours=2)
+    assert starts[3] == NOW + datetime.timedelta(hours=10)
+
+
+def test_fcfs_spreads_over_berths_without_overlap():
+    rng = random.Random(7)
+    berths = [make_berth(i) for i in range(1, 5)]
+    vessels = [make_vessel(i, rng.randint(0, 200), rng.randint(60, 360)) for i in range(500)]
+    schedule = planner.schedule_fcfs(berths, vessels, None, now=NOW)
+
+    assert len(schedule.get_schedule()) == len(vessels)
+    assert_no_overlaps(schedule)
+    for entry in schedule.get_schedule():
+        assert entry.start_time >= entry.vessel.eta
+
+
+def test_compatibility_matrix_matches_pairwise_check():
+    from app.compatibility import CompatibilityMatrix
+
+    berths = [make_berth(1, ("CONTAINER",)), make_berth(2, "BULK,RORO"), make_berth(3, ())]
+    vessels = [make_vessel(1, 0, type="CONTAINER"), make_vessel(2, 0, type="BULK", draft_m=16),
+               make_vessel(3, 0, type="RORO"), make_vessel(4, 0, type="CRUISE")]
+    matrix = CompatibilityMatrix(berths, vessels)
+
+    assert matrix.matrix.shape == (4, 3)
+    for vi, vessel in enumerate(vessels):
+        for bi, berth in enumerate(berths):
+            assert matrix.matrix[vi, bi] == berth.is_suitable_for_vessel(vessel)
+    assert [b.id for b in matrix.suitable_berths(vessels[2])] == [2]
+    # "BULK" is no longer substring-matched against the comma string
+    assert not make_berth(4, "BULKER").is_suitable_for_vessel(make_vessel(5, 0, type="BULK"))
+
+
+def test_missing_limits_mean_the_same_to_both_checks():
+    from app.compatibility import CompatibilityMatrix
+
+    # nullable berth limits and vessel measures: None constrains nothing
+    berths = [planner.replace(make_berth(1), max_loa=None, max_beam=None, max_draft=None, max_dwt=None),
+              planner.replace(make_berth(2), max_draft=None), make_berth(3)]
+    vessels = [planner.replace(make_vessel(1, 0), loa_m=500, draft_m=None, dwt_t=None),
+               planner.replace(make_vessel(2, 0), draft_m=20), make_vessel(3, 0)]
+    matrix = CompatibilityMatrix(berths, vessels)
+
+    for vi, vessel in enumerate(vessels):
+        for bi, berth in enumerate(berths):
+            assert matrix.matrix[vi, bi] == berth.is_suitable_for_vessel(vessel)
+    assert [b.id for b in matrix.suitable_berths(vessels[0])] == [1]
+    assert [b.id for b in matrix.suitable_berths(vessels[1])] == [1, 2]
+
+
+def test_optimized_beats_fcfs_when_reordering_helps():
+    berths = [make_berth(1)]
+    long_call = make_vessel(1, 0, ebt_minutes=600)
+    short_call = make_vessel(2, 0.5, ebt_minutes=60)
+    fcfs = planner.schedule_fcfs(berths, [long_call, short_call], None, now=NOW)
+    optimized = planner.schedule_optimized(berths, [long_call, short_call], None, now=NOW, time_budget=0.2)
+
+    assert planner.total_wait(fcfs, NOW) == datetime.timedelta(hours=9.5)
+    assert planner.total_wait(optimized, NOW) == datetime.timedelta(hours=1.5)
+    assert_no_overlaps(optimized)
+
+
+def make_model(berths, vessels):
+    model = planner.Model(berths, vessels, None, actual_id=1000)
+    model.current = planner.schedule_fcfs(berths, vessels, None, now=NOW)
+    return model
+
+
+def test_replan_eta_change_pulls_followers_forward():
+    vessels = [make_vessel(1, 0), make_vessel(2, 0), make_vessel(3, 0)]
+    model = make_model([make_berth(1)], vessels)
+    assert model.current.entry_for(3).start_time == NOW + datetime.timedelta(hours=4)
+
+    changes = model.replan(planner.EtaChanged(1, NOW + datetime.timedelta(hours=20)), now=NOW)
+
+    moved = {old.vessel.id: new.start_time for old, new in changes}
+    assert moved == {1: NOW + datetime.timedelta(hours=20), 2: NOW, 3: NOW + datetime.timedelta(hours=2)}
+    assert_no_overlaps(model.current)
+
+
+def test_replan_berth_offline_and_human_fix():
+    berths = [make_berth(1), make_berth(2, ("CONTAINER",)), make_berth(3, ("TANKER",))]
+    vessels = [make_vessel(1, 0), make_vessel(2, 0), make_vessel(3, 1, type="BULK")]
+    model = make_model(berths, vessels)
+
+    changes = model.replan(planner.BerthOffline(1), now=NOW)
+    assert {old.vessel.id: new and new.berth.id for old, new in changes} == {1: 2, 3: None}
+    assert model.current.entry_for(3) is None
+
+    # pinning vessel 1 over vessel 2's slot moves vessel 2 out of the way
+    fixed = planner.EntryFixed(1, 2, NOW + datetime.timedelta(hours=1), NOW + datetime.timedelta(hours=3))
+    changes = model.replan(fixed, now=NOW)
+    assert changes[0][1].start_time == NOW + datetime.timedelta(hours=1)
+    assert model.current.entry_for(2).start_time == NOW + datetime.timedelta(hours=3)
+    assert_no_overlaps(model.current)
+
+    added = model.replan(planner.VesselAdded(make_vessel(4, 0)), now=NOW)
+    assert added[0][0] is None and added[0][1].start_time == NOW + datetime.timedelta(hours=5)
+
+
+def test_check_rejects_a_fix_without_touching_the_plan():
+    model = make_model([make_berth(1)], [make_vessel(1, 0), make_vessel(2, 0)])
+    before = [e.to_dict() for e in model.current.get_schedule()]
+
+    for fix in (planner.EntryFixed(9, 1, NOW, NOW + datetime.timedelta(hours=1)),
+                planner.EntryFixed(1, 9, NOW, NOW + datetime.timedelta(hours=1)),
+                planner.EntryFixed(1, 1, NOW + datetime.timedelta(hours=1), NOW)):
+        try:
+            model.replan(fix, now=NOW)
+            assert False, f"{fix} was applied"
+        except ValueError:
+            pass
+    assert [e.to_dict() for e in model.current.get_schedule()] == before and not model.pinned
+
+
+def test_records_are_read_only_and_copied_with_replace():
+    import pickle
+
+    vessel = make_vessel(1, 0)
+    try:
+        vessel.eta = NOW
+        assert False, "planner records are read-only"
+    except AttributeError:
+        pass
+    later = planner.replace(vessel, eta=NOW + datetime.timedelta(hours=5))
+    assert later.eta == NOW + datetime.timedelta(hours=5) and vessel.eta == NOW
+    assert later.id == 1 and not hasattr(later, "__dict__")
+    assert pickle.loads(pickle.dumps(later)).eta == later.eta
+
+
+def test_schedule_from_frame_matches_the_entries_it_came_from():
+    berths = [make_berth(1), make_berth(2)]
+    vessels = [make_vessel(i, i % 3) for i in range(1, 7)]
+    built = planner.schedule_fcfs(berths, vessels, None, now=NOW)
+
+    frame = built.frame()
+    stored = planner.Schedule.from_frame(frame, {v.id: v for v in vessels}, {b.id: b for b in berths})
+    assert len(stored) == 6 and stored.frame() is frame
+    assert [e.to_dict() for e in stored.get_schedule()] == [e.to_dict() for e in built.get_schedule()]
+
+    # a change drops the frame and the next one reflects it
+    stored.remove_entry(stored.entry_for(6))
+    assert len(stored.frame()) == 5
@@ -0,0 +1,42 @@
+from app.planner import replace
+from app.scenarios import Scenario, run_scenarios
+from tests.test_planner import NOW, make_berth, make_vessel
+
+
+def test_scenarios_report_kpis_per_variant():
+    berths = [make_berth(1), make_berth(2)]
+    vessels = [make_vessel(i, i, ebt_minutes=90) for i in range(10)]
+    scenarios = [
+        Scenario("baseline"),
+        Scenario("late", delay_minutes=120),
+        Scenario("outage", berth_outages=[2]),
+        Scenario("storm", weather="storm", seed=3),
+    ]
+    results = run_scenarios(berths, vessels, scenarios, now=NOW)
+
+    by_name = {r["scenario"]: r for r in results}
+    assert [r["scenario"] for r in results] == ["baseline", "late", "outage", "storm"]
+    assert by_name["baseline"]["total_wait_minutes"] == 0
+    assert by_name["baseline"]["missed_slots"] == 0
+    assert by_name["late"]["missed_slots"] == len(vessels)
+    assert by_name["outage"]["total_wait_minutes"] > 0
+    assert set(by_name["outage"]["utilization_by_berth"]) == {1}
+    assert 0 < by_name["storm"]["berth_utilization"] <= 1
+
+
+def test_scenarios_plan_with_the_tide_and_reject_bad_input():
+    from tests.test_tide_windows import HOUR, tides
+
+    berths = [replace(make_berth(1), max_draft=18)]
+    deep = make_vessel(1, 0, ebt_minutes=60, draft_m=17)
+    # high water only from the second hour: without the tide the call would start at once
+    result = run_scenarios(berths, [deep], [Scenario("baseline")], now=NOW, weather=tides(0.2, 0.2, 1.6, 1.6, 0.2))[0]
+    assert result["total_wait_minutes"] == 2 * HOUR.total_seconds() / 60
+
+    for bad in ({"delay_minutes": -5}, {"delay_minutes": "soon"}, {"berth_outages": [9]}, {"berth_outages": 1}):
+        try:
+            Scenario.from_dict(bad, berth_ids={1})
+            assert False, f"{bad} was accepted"
+        except ValueError:
+            pass
+    assert Scenario.from_dict({"berth_outages": [1], "delay_minutes": 30}, berth_ids={1}).berth_outages == [1]
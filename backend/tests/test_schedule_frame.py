@@ -0,0 +1,32 @@
+import datetime
+import json
+
+import numpy as np
+
+from app.schedule_frame import ScheduleFrame
+
+NOW = datetime.datetime(2025, 5, 18, 0, 0)
+
+
+def test_plan_json_matches_the_isoformat_encoding():
+    start = NOW + datetime.timedelta(hours=1, microseconds=250)
+    rows = [(1, 2, NOW, NOW + datetime.timedelta(hours=2)), (3, 4, start, None)]
+    body = json.loads(ScheduleFrame.from_rows(rows).plan_json())
+
+    assert body["schedule"] == [
+        {"vessel_id": 1, "start_time": "2025-05-18T00:00:00", "end_time": "2025-05-18T02:00:00", "berth_id": 2,
+         "actual_arrival_time": "2025-05-17T23:45:00", "actual_start_time": "2025-05-18T00:00:00",
+         "actual_end_time": "2025-05-18T02:00:00"},
+        {"vessel_id": 3, "start_time": start.isoformat(), "end_time": None, "berth_id": 4,
+         "actual_arrival_time": (start - datetime.timedelta(minutes=15)).isoformat(),
+         "actual_start_time": start.isoformat(), "actual_end_time": None},
+    ]
+    assert ScheduleFrame.from_rows([]).plan_json() == b'{"schedule": []}'
+    assert ScheduleFrame.from_rows([], unplaced=[5, 6]).plan_json() == b'{"schedule": [], "unplaced": [5, 6]}'
+    assert json.loads(ScheduleFrame.from_rows(rows, unplaced=[5]).plan_json())["unplaced"] == [5]
+
+
+def test_frame_is_columns():
+    frame = ScheduleFrame.from_rows([(1, 2, NOW, NOW), (3, 4, NOW, NOW)])
+    assert frame.start.dtype == np.dtype("datetime64[us]") and frame.vessel_id.dtype == np.int64
+    assert len(frame) == 2 and frame.nbytes() == 2 * 4 * 8
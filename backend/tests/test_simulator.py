@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+from app.simulator import simulate_schedule, simulate_schedule_batch
+
+T0 = datetime(2025, 5, 18, 8, 0)
+
+
+def make_inputs():
+    vessels = [
+        {"id": 1, "eta": T0, "etd": T0 + timedelta(hours=4), "draft": 10},
+        # slot ends 40 minutes after ETA: a storm delay of 20-60 misses it 20/41 of the time
+        {"id": 2, "eta": T0, "etd": T0 + timedelta(hours=4), "draft": 10},
+        {"id": 3, "eta": T0, "etd": T0 + timedelta(hours=4), "draft": 14},
+        {"id": 4, "eta": T0, "etd": T0 + timedelta(hours=4), "draft": 10},
+    ]
+    berth_plan = {
+        1: {"berth": "A", "start_time": T0 + timedelta(hours=1), "end_time": T0 + timedelta(hours=3)},
+        2: {"berth": "B", "start_time": T0 - timedelta(hours=1), "end_time": T0 + timedelta(minutes=40)},
+        3: {"berth": "A", "start_time": T0, "end_time": T0 + timedelta(hours=2)},
+    }
+    berth_info = {"A": {"depth": 12}, "B": {"depth": 12}}
+    return vessels, berth_plan, berth_info
+
+
+def test_batch_matches_scalar_simulator_in_calm_weather():
+    vessels, berth_plan, berth_info = make_inputs()
+    batch = simulate_schedule_batch(vessels, berth_plan, berth_info, replications=50, seed=1)
+    scalar = {r["vessel_id"]: r for r in simulate_schedule(vessels, berth_plan, berth_info)}
+
+    by_id = {r["vessel_id"]: r for r in batch["vessels"]}
+    for vessel_id in (1, 2):
+        assert by_id[vessel_id]["miss_rate"] == 0
+        assert by_id[vessel_id]["docking_start_p50"] == scalar[vessel_id]["actual_start"]
+    assert by_id[3]["status"] == scalar[3]["status"] == "rejected_depth_too_shallow"
+    assert by_id[4]["status"] == "no_plan"
+
+
+def test_batch_storm_miss_rates_and_chunking():
+    vessels, berth_plan, berth_info = make_inputs()
+    batch = simulate_schedule_batch(vessels, berth_plan, berth_info, weather="storm",
+                                    replications=20000, seed=7, max_cells=1000)
+
+    by_id = {r["vessel_id"]: r for r in batch["vessels"]}
+    assert by_id[1]["miss_rate"] == 0
+    assert by_id[1]["docking_start_p90"] == T0 + timedelta(hours=1)
+    assert abs(by_id[2]["miss_rate"] - 20 / 41) < 0.02
+    assert abs(by_id[2]["mean_delay_minutes"] - 40) < 0.5
+    assert T0 + timedelta(minutes=20) <= by_id[2]["docking_start_mean"] <= T0 + timedelta(minutes=40)
+    assert batch["berths"]["B"]["miss_rate"] == by_id[2]["miss_rate"]
+
+
+def test_event_engine_propagates_knock_on_delays():
+    from types import SimpleNamespace
+    from app.discrete_event import simulate_schedule_events
+
+    vessels = [{"id": i, "eta": T0 + timedelta(hours=2 * i), "etd": None, "draft": 10} for i in range(3)]
+    vessels[0]["eta"] = T0 + timedelta(minutes=30)
+    berth_plan = {i: {"berth": "A", "start_time": T0 + timedelta(hours=2 * i),
+                      "end_time": T0 + timedelta(hours=2 * i + 2)} for i in range(3)}
+    # storm only in the first hour: vessel 0 is delayed and everyone behind it waits
+    weather = [SimpleNamespace(timestamp=T0, condition="STORM", wind_speed_knots=5),
+               SimpleNamespace(timestamp=T0 + timedelta(hours=1), condition="CLEAR", wind_speed_knots=5)]
+    results = simulate_schedule_events(vessels, berth_plan, {"A": {"depth": 12}}, weather, seed=1)
+
+    first, second, third = results
+    delay = timedelta(minutes=first["delay_minutes"])
+    assert 20 <= first["delay_minutes"] <= 60
+    assert first["actual_start"] == T0 + timedelta(minutes=30) + delay
+    assert second["actual_start"] == first["actual_end"]
+    assert second["knock_on_minutes"] == (30 + first["delay_minutes"])
+    assert third["actual_start"] == second["actual_end"]
+    assert second["delay_minutes"] == third["delay_minutes"] == 0
+
+
+def test_batch_per_vessel_weather_skips_filtered_vessels():
+    vessels, berth_plan, berth_info = make_inputs()
+    # vessels 3 (too deep) and 4 (no plan) are filtered out; vessel 2's storm must stay with vessel 2
+    batch = simulate_schedule_batch(vessels, berth_plan, berth_info, weather=["calm", "storm", "calm", "calm"],
+                                    replications=5000, seed=3)
+
+    by_id = {r["vessel_id"]: r for r in batch["vessels"]}
+    assert by_id[1]["mean_delay_minutes"] == 0 and by_id[1]["miss_rate"] == 0
+    assert abs(by_id[2]["miss_rate"] - 20 / 41) < 0.03
+    assert by_id[3]["status"] == "rejected_depth_too_shallow" and by_id[4]["status"] == "no_plan"
+
+
+def test_batch_lets_the_tide_decide_with_recorded_weather():
+    from types import SimpleNamespace
+    from app.weather_index import WeatherTimeline
+
+    vessels, berth_plan, berth_info = make_inputs()
+
+    def tides(height):
+        return WeatherTimeline([SimpleNamespace(timestamp=T0 + timedelta(hours=h), condition="CLEAR",
+                                                wind_speed_knots=5, tide_height_m=height) for h in range(-1, 4)])
+
+    # vessel 3 draws 14 m at a 12 m berth: 3 m of water over its slot lets it in, 1 m does not
+    high = {r["vessel_id"]: r for r in simulate_schedule_batch(vessels, berth_plan, berth_info, tides(3.0),
+                                                               replications=10, seed=1)["vessels"]}
+    assert high[3]["status"] == "simulated" and high[3]["docking_start_p50"] == T0
+    low = {r["vessel_id"]: r for r in simulate_schedule_batch(vessels, berth_plan, berth_info, tides(1.0),
+                                                              replications=10, seed=1)["vessels"]}
+    assert low[3]["status"] == "rejected_depth_too_shallow" and low[1]["status"] == "simulated"
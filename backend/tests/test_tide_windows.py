@@ -0,0 +1,100 @@
+import datetime
+import json
+from types import SimpleNamespace
+
+from app import planner
+from app.simulator import simulate_schedule
+from app.tide_windows import TideWindows
+from app.weather_index import WeatherTimeline
+from tests.test_planner import NOW, make_berth, make_vessel
+
+HOUR = datetime.timedelta(hours=1)
+
+
+def tides(*heights):
+    # one reading an hour from NOW
+    return WeatherTimeline([SimpleNamespace(timestamp=NOW + i * HOUR, condition="CLEAR", wind_speed_knots=5,
+                                            tide_height_m=h) for i, h in enumerate(heights)])
+
+
+def test_windows_are_runs_of_enough_tide():
+    windows = TideWindows(tides(0.2, 1.5, 1.8, 0.4, 1.6, 0.3), margin=0.5)
+    # depth 15 + tide >= draft 16 + 0.5 needs a 1.5 m tide: hours 1-3 and 4-5
+    assert windows.required_tide(15, 16) == 1.5
+    assert windows.next_navigable(15, 16, NOW) == NOW + HOUR
+    assert windows.next_navigable(15, 16, NOW + 2.5 * HOUR) == NOW + 2.5 * HOUR
+    assert windows.next_navigable(15, 16, NOW + 3 * HOUR) == NOW + 4 * HOUR
+    # past the last reading the tide is unknown: a 16 m draft needs more than the 15 m depth
+    assert windows.next_navigable(15, 16, NOW + 10 * HOUR) is None
+    assert windows.next_navigable(15, 14, NOW + 10 * HOUR) == NOW + 10 * HOUR
+    assert windows.next_navigable(15, 17, NOW) is None and not windows.ever_navigable(15, 17)
+    # enough water at any tide, and no depth on record, are never held back
+    assert windows.next_navigable(18, 16, NOW + 3 * HOUR) == NOW + 3 * HOUR
+    assert windows.next_navigable(None, 16, NOW) == NOW
+    assert len(windows.levels) == 1
+
+
+def test_planner_starts_deep_vessels_inside_a_tide_window():
+    # 16 m deep; the draft limit of the berth is checked by CompatibilityMatrix, not here
+    berths = [make_berth(1)]
+    deep = make_vessel(1, 0, ebt_minutes=60, draft_m=17)
+    shallow = make_vessel(2, 0, ebt_minutes=60, draft_m=12)
+    weather = tides(0.2, 0.3, 1.6, 1.7, 0.2)
+
+    windows = TideWindows(weather)
+    timed = planner.Schedule(windows)
+    entry = timed.place(deep, berths, NOW)
+    assert entry.start_time == NOW + 2 * HOUR
+    # the next free slot (3h) is still in the window; after it the tide is low, then unknown
+    assert timed.place(deep, berths, NOW).start_time == NOW + 3 * HOUR
+    assert timed.place(deep, berths, NOW) is None
+    assert timed.place(shallow, berths, NOW).start_time == NOW
+    # the vessel that found no tide within the readings is reported with the plan, not dropped,
+    # and apart from those no tide takes at all
+    assert list(timed.beyond_tide) == [deep.id] and not timed.unplaced
+    too_deep = make_vessel(3, 0, ebt_minutes=60, draft_m=18)
+    assert timed.place(too_deep, berths, NOW) is None and list(timed.unplaced) == [too_deep.id]
+    plan = json.loads(timed.frame().plan_json())
+    assert plan["unplaced"] == [too_deep.id] and plan["beyond_tide_data"] == [deep.id]
+    assert planner.schedule_fcfs(berths, [shallow], weather, now=NOW).tide is not None
+
+
+def test_the_tide_is_unknown_outside_the_readings():
+    windows = TideWindows(tides(1.6, 1.6), margin=0.5)
+    # a 17 m draft at a 16 m berth needs the readings; the 1 hour they cover is all there is
+    assert list(windows.navigable(16, 17)) == [(NOW, NOW + HOUR)]
+    assert windows.next_navigable(16, 17, NOW - HOUR) == NOW
+    assert windows.next_navigable(16, 17, NOW, 2 * HOUR) is None
+    # drawing no more than the depth is the static check, fine before and after them
+    assert list(windows.navigable(16, 16)) == [(None, None)]
+    assert windows.level(16, 15.8) is None
+    assert not TideWindows(tides(), margin=0.5).ever_navigable(16, 17)
+
+
+def test_simulator_waits_for_the_tide():
+    weather = tides(0.2, 0.2, 1.6, 1.7, 0.2)
+    vessels = [{"id": 1, "eta": NOW, "etd": None, "draft": 17}]
+    # high water from 2 to 4 is just long enough for the 2 hour call
+    berth_plan = {1: {"berth": "A", "start_time": NOW, "end_time": NOW + 2 * HOUR}}
+
+    static = simulate_schedule(vessels, berth_plan, {"A": {"depth": 16}})[0]
+    assert static["status"] == "rejected_depth_too_shallow"
+
+    result = simulate_schedule(vessels, berth_plan, {"A": {"depth": 16}}, weather)[0]
+    assert result["status"] == "docked"
+    assert result["actual_start"] == NOW + 2 * HOUR and result["tide_wait_minutes"] == 120
+
+
+def test_optimizer_never_serves_fewer_vessels_than_fcfs():
+    berths = [planner.replace(make_berth(1), max_draft=18)]
+    # only a 2 hour window of high water; putting the shallow call first would wait nobody
+    # but leave the deep one without enough tide, which must not count as better
+    deep = make_vessel(1, 0, ebt_minutes=120, draft_m=17)
+    shallow = make_vessel(2, 1 / 60, ebt_minutes=60, draft_m=12)
+    weather = tides(1.6, 1.6, 1.6, 0.2)
+
+    fcfs = planner.schedule_fcfs(berths, [deep, shallow], weather, now=NOW)
+    optimized = planner.schedule_optimized(berths, [deep, shallow], weather, now=NOW, time_budget=0.2)
+    assert not fcfs.unplaced and len(fcfs) == 2
+    assert not optimized.unplaced and len(optimized) >= len(fcfs)
+    assert planner.plan_cost(optimized, NOW) <= planner.plan_cost(fcfs, NOW)
@@ -0,0 +1,42 @@
+import asyncio
+
+from app.training import TrainingWorker
+
+
+class CountingModel:
+    def __init__(self):
+        self.fits = []
+
+    def retrain(self, fixes):
+        self.fits.append(len(fixes))
+        return 1.5
+
+
+def test_fixes_in_one_window_share_a_retrain():
+    async def run():
+        logged = []
+
+        async def log(actual_ids, mse):
+            logged.append((actual_ids, mse))
+
+        invalidated = []
+        worker = TrainingWorker(window=0.05, log=log, invalidate=lambda: invalidated.append(len(logged)))
+        model = CountingModel()
+        jobs = [worker.submit(1000, model, ["fix"] * 2) for _ in range(3)]
+        jobs.append(worker.submit(1001, model, ["fix"]))
+        while any(job.status != "done" for job in jobs):
+            await asyncio.sleep(0.01)
+
+        later = worker.submit(1000, model, ["fix"])
+        while later.status != "done":
+            await asyncio.sleep(0.01)
+        worker.task.cancel()
+        return model, jobs, logged, invalidated
+
+    model, jobs, logged, invalidated = asyncio.run(run())
+    assert model.fits == [7, 1]
+    # cached plans are dropped after each fit, before its log is written
+    assert invalidated == [0, 1]
+    assert logged == [([1000, 1001], 1.5), ([1000], 1.5)]
+    assert all(job.mse == 1.5 and job.batch_size == 4 for job in jobs)
+    assert jobs[0].to_dict()["fixes"] == 2
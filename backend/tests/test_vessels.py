@@ -21,3 +21,39 @@ def test_create_and_get():
     assert r.status_code == 200
     payload = r.json()
     assert payload["imo"] == 9387422
+
+
+def test_post_vessel_parses_eta():
+    authed = TestClient(app, headers={"X-API-KEY": "hackathon42"})
+    data = {"actual_id": 424242, "name": "Posted Ship", "type": "BULK", "loa_m": 200, "beam_m": 32,
+            "draft_m": 11.1, "eta": "2025-05-18T10:00:00+02:00", "dwt_t": 50000}
+    r = authed.post("/vessels", json=data)
+    assert r.status_code == 200
+    # stored as naive UTC
+    assert r.json()["eta"] == "2025-05-18T08:00:00"
+    assert authed.post("/vessels", json={**data, "eta": "next tuesday"}).status_code == 400
+
+
+def test_keyset_pages_cover_the_batch_once_and_name_null_etas():
+    from app.routers.vessels import after_cursor, decode_cursor, encode_cursor
+
+    authed = TestClient(app, headers={"X-API-KEY": "hackathon42"})
+    base = {"actual_id": 515151, "name": "Paged Ship", "type": "BULK", "loa_m": 200, "beam_m": 32,
+            "draft_m": 11.1, "dwt_t": 50000}
+    for eta in ("2025-05-18T10:00:00", "2025-05-18T09:00:00", "2025-05-18T09:00:00"):
+        assert authed.post("/vessels", json={**base, "eta": eta}).status_code == 200
+
+    seen, after = [], None
+    while True:
+        page = authed.get("/vessels", params={"limit": 2, "fields": "id,eta", **({"after": after} if after else {})}).json()
+        assert page["fields"] == ["id", "eta"]
+        seen += page["items"]
+        after = page["next"]
+        if after is None:
+            break
+    assert [eta for _, eta in seen] == ["2025-05-18T09:00:00", "2025-05-18T09:00:00", "2025-05-18T10:00:00"]
+    assert len({vessel_id for vessel_id, _ in seen}) == 3
+
+    # a vessel without an eta sorts last and its cursor says so
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+    assert "eta IS NULL" in str(after_cursor(None, 7))
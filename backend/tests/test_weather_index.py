@@ -0,0 +1,51 @@
+import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.simulator import simulate_schedule, simulate_schedule_batch
+from app.weather_index import WeatherTimeline
+
+NOW = datetime.datetime(2025, 5, 18, 0, 0)
+HOUR = datetime.timedelta(hours=1)
+
+
+def weather(hours, condition, wind, tide):
+    return SimpleNamespace(timestamp=NOW + hours * HOUR, condition=condition, wind_speed_knots=wind, tide_height_m=tide)
+
+
+def test_lookups_are_as_of_each_timestamp():
+    timeline = WeatherTimeline([weather(2, "STORM", 40, 1.5), weather(0, "CLEAR", 10, 0.5), weather(3, "rain", 25, None)])
+    ts = [NOW - HOUR, NOW + HOUR, NOW + 2 * HOUR, NOW + 5 * HOUR]
+
+    # before the first reading the first one is used
+    assert timeline.conditions(ts).tolist() == ["CLEAR", "CLEAR", "STORM", "RAIN"]
+    assert timeline.wind_at(ts).tolist() == [10, 10, 40, 25]
+    assert timeline.tide_at(ts).tolist() == [0.5, 0.5, 1.5, 0]
+    # rain with 25 knots delays an approach like wind does
+    assert timeline.delay_conditions(ts).tolist() == ["clear", "clear", "storm", "wind"]
+    assert timeline.condition_at(NOW + 2 * HOUR) == "storm"
+    # datetime64 and epoch seconds work too
+    assert timeline.conditions(np.array([NOW + 2 * HOUR], dtype="datetime64[us]")).tolist() == ["STORM"]
+
+
+def test_empty_timeline_means_no_weather():
+    timeline = WeatherTimeline([])
+    assert timeline.conditions([NOW]).tolist() == [""]
+    assert timeline.wind_at([NOW, NOW]).tolist() == [0, 0]
+    assert timeline.condition_at(NOW) == "calm"
+
+
+def test_simulators_read_weather_at_each_eta():
+    timeline = WeatherTimeline([weather(0, "STORM", 5, 1), weather(3, "CLEAR", 5, 1)])
+    vessels = [{"id": i, "eta": NOW + 4 * i * HOUR, "etd": None, "draft": 10} for i in range(2)]
+    berth_plan = {i: {"berth": "A", "start_time": NOW + 4 * i * HOUR, "end_time": NOW + (4 * i + 3) * HOUR}
+                  for i in range(2)}
+    berth_info = {"A": {"depth": 12}}
+
+    delays = [r["delay_minutes"] for r in simulate_schedule(vessels, berth_plan, berth_info, timeline)]
+    assert 20 <= delays[0] <= 60 and delays[1] == 0
+
+    batch = simulate_schedule_batch(vessels, berth_plan, berth_info, timeline, replications=200, seed=1)
+    mean_delays = [r["mean_delay_minutes"] for r in batch["vessels"]]
+    assert 20 <= mean_delays[0] <= 60 and mean_delays[1] == 0